@@ -1,18 +1,43 @@
 # agents/analysis_agent.py
 
-from typing import List, Optional
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import TimeoutError as FuturesTimeout, wait
+from typing import List, Optional, Tuple
+from pydantic import BaseModel, Field
 from langchain_core.messages import AIMessage, HumanMessage, BaseMessage
+from langchain_core.runnables import RunnableConfig
+from langchain_core.runnables.config import ContextThreadPoolExecutor
 from langgraph.types import Command
-from llm_config import llm
-from tools.tools import get_tools 
+from budgets import BUDGET_LABELS, BudgetExceeded, PhaseBudget
+from llm_client import EXPECTED_OUTPUT_TOKENS, call_deadline
+from llm_config import get_llm
+from llm_cache import cache_bypass
+from agents.context_builder import abuild_context, build_context, count_tokens
+from streaming import user_facing
+from tools.compress import research_scope
+from tools.tools import get_tools
+from tracing import VERBOSE
 
-# Optional tool-agent support
-try:
-    from langchain.agents import AgentExecutor, create_tool_calling_agent
-    from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-    AGENT_IMPORTS_OK = True
-except Exception:
-    AGENT_IMPORTS_OK = False
+logger = logging.getLogger(__name__)
+
+# Optional tool-agent support, imported on first use: langchain.agents is slow to
+# import and only the "agent" analysis mode (or its fallback) needs it.
+_AGENT_IMPORTS = None
+
+def _agent_imports():
+    """(AgentExecutor, create_tool_calling_agent), or None when langchain.agents is unavailable."""
+    global _AGENT_IMPORTS
+    if _AGENT_IMPORTS is None:
+        try:
+            from langchain.agents import AgentExecutor, create_tool_calling_agent
+            _AGENT_IMPORTS = (AgentExecutor, create_tool_calling_agent)
+        except Exception:
+            _AGENT_IMPORTS = ()
+    return _AGENT_IMPORTS or None
 
 def _load_tools():
     try:
@@ -28,111 +53,404 @@ def _load_tools():
     return []
 
 
-CONTROL_TOKENS = {"yes", "no", "new", "end"}
-
-SUP_CONFIRM_MARKERS = [
-    "Do you want to proceed to the **Architecture** phase?",
-    "Do you want to proceed to the **Analysis/Research** phase?",
-    "The analysis phase is complete with research insights.",
-    "Please reply with 'yes' to proceed, 'no' to revise",
-    "Let's start fresh. What new solution or requirement do you have?",
-]
-
-def _extract_real_user_query(msgs: List[BaseMessage]) -> Optional[str]:
-    for i in range(len(msgs) - 1, -1, -1):
-        m = msgs[i]
-        if isinstance(m, HumanMessage):
-            txt = (m.content or "").strip()
-            low = txt.lower()
-            if low in CONTROL_TOKENS:
-                continue
-            if i > 0 and isinstance(msgs[i - 1], AIMessage):
-                prev_c = str(msgs[i - 1].content)
-                if any(marker in prev_c for marker in SUP_CONFIRM_MARKERS) and len(txt) <= 8:
-                    continue
-            return txt
-    return None
-
-def _collect_context_from_ai(msgs: List[BaseMessage], max_chars: int = 2000) -> str:
-    chunks: List[str] = []
-    for m in msgs:
-        if isinstance(m, AIMessage):
-            c = str(m.content)
-            if any(marker in c for marker in SUP_CONFIRM_MARKERS):
-                continue
-            chunks.append(c)
-
-    # take last 3 AI chunks
-    trimmed = "\n\n".join(chunks[-3:])
-    # hard trim to avoid token bloat
-    return trimmed[-max_chars:]
-
-def _run_tool_agent(user_query: str, context_text: str) -> str:
-    tools = _load_tools()
-    if not (AGENT_IMPORTS_OK and tools):
-        # Fallback: direct LLM with structured markdown
-        prompt = (
-            "You are an analysis & research agent.\n"
-            "Respond **concisely** and **structurally** in Markdown using headings and bullet points.\n"
-            "Only include relevant, high-signal information.\n\n"
-            f"# Context\n{context_text}\n\n"
-            f"# User Query\n{user_query}\n\n"
-            "Provide a short, structured analysis with key findings, options, and risks."
+_AGENT_SYSTEM_MSG = (
+    "You are a senior analysis & research agent. "
+    "Use tools to verify facts and gather evidence. "
+    "Reply concisely, in Markdown, with headings, bullet points, and short paragraphs."
+)
+
+# Compiled tool-calling executors, keyed by the identity of the tool set they were built for.
+_EXECUTORS = {}
+
+def _get_executor(tools):
+    key = tuple(id(t) for t in tools)
+    executor = _EXECUTORS.get(key)
+    if executor is None:
+        from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+        AgentExecutor, create_tool_calling_agent = _agent_imports()
+        prompt = ChatPromptTemplate.from_messages(
+            [
+                ("system", _AGENT_SYSTEM_MSG),
+                ("system", "Context:\n{context_text}"),
+                ("human", "{input}"),
+                MessagesPlaceholder("agent_scratchpad"),
+            ]
+        )
+        agent = create_tool_calling_agent(get_llm("generate"), tools, prompt)
+        executor = _EXECUTORS[key] = AgentExecutor(
+            agent=agent,
+            tools=tools,
+            verbose=VERBOSE,
+            handle_parsing_errors=True,
+            return_intermediate_steps=True,
         )
-        return llm.invoke(prompt).content  # type: ignore
+    return executor
 
-    system_msg = (
-        "You are a senior analysis & research agent. "
-        "Use tools to verify facts and gather evidence. "
-        "Reply concisely, in Markdown, with headings, bullet points, and short paragraphs."
-    )
-    prompt = ChatPromptTemplate.from_messages(
-        [
-            ("system", system_msg),
-            ("system", "Context:\n{context_text}"),
-            ("human", "{input}"),
-            MessagesPlaceholder("agent_scratchpad"),
-        ]
-    )
-    agent = create_tool_calling_agent(llm, tools, prompt)
-    executor = AgentExecutor(
-        agent=agent,
-        tools=tools,
-        verbose=True,
-        handle_parsing_errors=True,
-        return_intermediate_steps=True,
+def _fallback_prompt(user_query: str, context_text: str) -> str:
+    # Direct LLM with structured markdown, for when no tools are available
+    return (
+        "You are an analysis & research agent.\n"
+        "Respond **concisely** and **structurally** in Markdown using headings and bullet points.\n"
+        "Only include relevant, high-signal information.\n\n"
+        f"# Context\n{context_text}\n\n"
+        f"# User Query\n{user_query}\n\n"
+        "Provide a short, structured analysis with key findings, options, and risks."
     )
-    result = executor.invoke({"input": user_query, "context_text": context_text})
 
-    # Optional: print intermediate steps to make CLI non-empty
+def _budget_evidence(budget: PhaseBudget) -> List[Tuple["ResearchQuery", str]]:
+    return [(ResearchQuery(tool=tool, query=query), output) for tool, query, output in budget.evidence]
+
+def _run_tool_agent(user_query: str, context_text: str, config: Optional[RunnableConfig] = None,
+                    budget: Optional[PhaseBudget] = None) -> str:
+    budget = budget or PhaseBudget("analysis")
+    tools = _load_tools()
+    if not (tools and _agent_imports()):
+        response = get_llm("generate").invoke(_fallback_prompt(user_query, context_text),
+                                              config=user_facing(budget.attach(config)))
+        return response.content  # type: ignore
+
+    executor = _get_executor(tools)
+    # The loop runs in a worker so that a hanging step can't hold the phase past its time
+    # budget; once a budget is spent, its next model/tool call raises and the loop ends.
+    future = _submit_phase_work(budget, executor.invoke, {"input": user_query, "context_text": context_text},
+                                user_facing(budget.attach(config)))
+    try:
+        return _agent_output(future.result(timeout=budget.remaining_s()))
+    except FuturesTimeout:
+        budget.stop("time")
+        _abandon(future, "tool agent loop")
+    except BudgetExceeded:
+        pass
+    evidence = _fit_evidence(user_query, context_text, _budget_evidence(budget), budget)
+    return _synthesize(user_query, context_text, evidence, config, budget)
+
+async def _arun_tool_agent(user_query: str, context_text: str, config: Optional[RunnableConfig] = None,
+                           budget: Optional[PhaseBudget] = None) -> str:
+    budget = budget or PhaseBudget("analysis")
+    tools = _load_tools()
+    if not (tools and _agent_imports()):
+        response = await get_llm("generate").ainvoke(_fallback_prompt(user_query, context_text),
+                                                     config=user_facing(budget.attach(config)))
+        return response.content  # type: ignore
+
+    executor = _get_executor(tools)
+    try:
+        result = await asyncio.wait_for(
+            executor.ainvoke({"input": user_query, "context_text": context_text}, config=user_facing(budget.attach(config))),
+            timeout=budget.remaining_s(),
+        )
+        return _agent_output(result)
+    except asyncio.TimeoutError:
+        budget.stop("time")
+    except BudgetExceeded:
+        pass
+    evidence = _fit_evidence(user_query, context_text, _budget_evidence(budget), budget)
+    return await _asynthesize(user_query, context_text, evidence, config, budget)
+
+def _agent_output(result) -> str:
     inter = result.get("intermediate_steps", []) if isinstance(result, dict) else []
-    if inter:
-        print("\n--- DEBUG: Intermediate tool steps ---")
-        for i, step in enumerate(inter, 1):
-            print(f"[{i}] {step}")
-        print("--------------------------------------\n")
+    for i, step in enumerate(inter, 1):
+        logger.debug("Intermediate tool step [%d] %s", i, step)
 
     if isinstance(result, dict) and "output" in result:
         return result["output"]
     return str(result)
 
-def analysis_agent(state):
-    print("\n--- DEBUG: Entering analysis_agent ---")
+# ---------- Parallel research: plan once, fan out tool calls, synthesize once ----------
+
+# "parallel" (default) or "agent" for the sequential tool-calling AgentExecutor loop.
+ANALYSIS_MODE = os.getenv("ANALYSIS_MODE", "parallel").lower()
+RESEARCH_MAX_WORKERS = int(os.getenv("RESEARCH_MAX_WORKERS", "6"))
+RESEARCH_DEADLINE_S = float(os.getenv("RESEARCH_DEADLINE_S", "20"))
+RESEARCH_MAX_QUERIES = int(os.getenv("RESEARCH_MAX_QUERIES", "6"))
+
+# Shared, bounded pool; copies contextvars so tool runs stay attached to the graph's callbacks.
+_RESEARCH_POOL = ContextThreadPoolExecutor(max_workers=RESEARCH_MAX_WORKERS, thread_name_prefix="research")
+# Planner calls and agent loops run here, under the phase's time budget; kept apart from
+# the tool fan-out so they never queue behind (or starve) tool calls.
+ANALYSIS_MAX_CONCURRENT = int(os.getenv("ANALYSIS_MAX_CONCURRENT", "32"))
+_PHASE_POOL = ContextThreadPoolExecutor(max_workers=ANALYSIS_MAX_CONCURRENT, thread_name_prefix="analysis")
+# Phase work whose caller gave up on it but which still holds a _PHASE_POOL worker.
+_ABANDONED: set = set()
+_ABANDONED_LOCK = threading.Lock()
+
+def _submit_phase_work(budget: PhaseBudget, fn, *args):
+    # The pool copies the context at submit, so the work's model calls carry the deadline:
+    # a call in flight when the budget runs out ends then instead of after LLM_TIMEOUT_S.
+    with call_deadline(budget.remaining_s()):
+        return _PHASE_POOL.submit(fn, *args)
+
+def _abandon(future, what: str) -> None:
+    """Drop phase work past its deadline: cancel it if queued, else count it until it ends."""
+    if future.cancel():
+        return
+    with _ABANDONED_LOCK:
+        _ABANDONED.add(future)
+        running = len(_ABANDONED)
+    future.add_done_callback(_release_abandoned)
+    logger.warning("Analysis %s is past its time budget; left running (%d of %d analysis workers held).",
+                   what, running, ANALYSIS_MAX_CONCURRENT)
+
+def _release_abandoned(future) -> None:
+    with _ABANDONED_LOCK:
+        _ABANDONED.discard(future)
+
+class ResearchQuery(BaseModel):
+    tool: str = Field(..., description="Name of the tool to call")
+    query: str = Field(..., description="Search query for that tool")
+
+class ResearchPlan(BaseModel):
+    queries: List[ResearchQuery] = Field(default_factory=list)
+
+_planner = None
+
+def _get_planner():
+    global _planner
+    if _planner is None:
+        _planner = get_llm("research").with_structured_output(ResearchPlan)
+    return _planner
+
+def _plan_prompt(user_query: str, context_text: str, tools) -> str:
+    tool_lines = "\n".join(f"- {t.name}: {t.description}" for t in tools)
+    return (
+        "You plan research for a solution architecture review.\n"
+        f"Available tools:\n{tool_lines}\n\n"
+        f"# Context\n{context_text}\n\n"
+        f"# User Query\n{user_query}\n\n"
+        f"Return up to {RESEARCH_MAX_QUERIES} short, specific search queries, each assigned to the most suitable tool. "
+        "Prefer independent queries that together verify the key claims and technologies."
+    )
+
+def _checked_plan(plan: Optional[ResearchPlan], user_query: str, tools) -> List[ResearchQuery]:
+    names = {t.name for t in tools}
+    queries = [q for q in plan.queries if q.tool in names and q.query.strip()] if plan else []
+    if not queries:
+        queries = [ResearchQuery(tool=t.name, query=user_query[:300]) for t in tools]
+    return queries[:RESEARCH_MAX_QUERIES]
+
+def _plan_research(user_query: str, context_text: str, tools,
+                   config: Optional[RunnableConfig] = None) -> List[ResearchQuery]:
+    try:
+        plan = _get_planner().invoke(_plan_prompt(user_query, context_text, tools), config=config)
+    except Exception as e:
+        logger.warning("Research planning failed (%s); falling back to one query per tool.", e)
+        plan = None
+    return _checked_plan(plan, user_query, tools)
+
+async def _aplan_research(user_query: str, context_text: str, tools,
+                          config: Optional[RunnableConfig] = None) -> List[ResearchQuery]:
+    try:
+        plan = await _get_planner().ainvoke(_plan_prompt(user_query, context_text, tools), config=config)
+    except Exception as e:
+        logger.warning("Research planning failed (%s); falling back to one query per tool.", e)
+        plan = None
+    return _checked_plan(plan, user_query, tools)
+
+def _gather_evidence(queries: List[ResearchQuery], tools, deadline_s: float,
+                     config: Optional[RunnableConfig] = None) -> List[Tuple[ResearchQuery, str]]:
+    """Run all queries concurrently; keep whatever finished before the deadline."""
+    by_name = {t.name: t for t in tools}
+    futures = {_RESEARCH_POOL.submit(by_name[q.tool].invoke, q.query, config): q for q in queries}
+    done, not_done = wait(futures, timeout=deadline_s)
+    for f in not_done:
+        # Queued calls are dropped; calls already on the wire finish in the background and are ignored.
+        f.cancel()
+    evidence = []
+    for f, q in futures.items():
+        if f not in done:
+            continue
+        try:
+            evidence.append((q, str(f.result())))
+        except BudgetExceeded:
+            continue
+        except Exception as e:
+            evidence.append((q, f"Tool error: {e}"))
+    if not_done:
+        logger.warning("Research deadline (%ss) hit: %d of %d tool calls dropped.", deadline_s, len(not_done), len(futures))
+    return evidence
+
+async def _agather_evidence(queries: List[ResearchQuery], tools, deadline_s: float,
+                            config: Optional[RunnableConfig] = None) -> List[Tuple[ResearchQuery, str]]:
+    """Async `_gather_evidence`: one task per query on the event loop, same deadline semantics."""
+    by_name = {t.name: t for t in tools}
+    tasks = {asyncio.ensure_future(by_name[q.tool].ainvoke(q.query, config)): q for q in queries}
+    done, not_done = await asyncio.wait(tasks, timeout=deadline_s)
+    for t in not_done:
+        t.cancel()
+    evidence = []
+    for t, q in tasks.items():
+        if t not in done:
+            continue
+        try:
+            evidence.append((q, str(t.result())))
+        except BudgetExceeded:
+            continue
+        except Exception as e:
+            evidence.append((q, f"Tool error: {e}"))
+    if not_done:
+        logger.warning("Research deadline (%ss) hit: %d of %d tool calls dropped.", deadline_s, len(not_done), len(tasks))
+    return evidence
+
+def _evidence_item(q: ResearchQuery, result: str) -> str:
+    return f"## [{q.tool}] {q.query}\n{result}"
+
+def _synthesis_prompt(user_query: str, context_text: str, evidence: List[Tuple[ResearchQuery, str]],
+                      stopped: Optional[str] = None) -> str:
+    evidence_text = "\n\n".join(
+        _evidence_item(q, result) for q, result in evidence
+    ) or "No external evidence could be gathered in time."
+    partial = (
+        f"Research was cut short by the {BUDGET_LABELS.get(stopped, stopped)} budget, so the evidence is incomplete; "
+        "say which points could not be verified.\n"
+    ) if stopped else ""
+    return (
+        "You are a senior analysis & research agent.\n"
+        "Verify the proposed solution/architecture against the evidence and refine it where needed.\n"
+        "Reply concisely, in Markdown, with headings, bullet points, and short paragraphs. "
+        "Cite the tool a finding came from in brackets.\n"
+        f"{partial}\n"
+        f"# Context\n{context_text}\n\n"
+        f"# Evidence\n{evidence_text}\n\n"
+        f"# User Query\n{user_query}\n\n"
+        "Provide key findings, validated/refined recommendations, risks, and a short conclusion."
+    )
+
+def _fit_evidence(user_query: str, context_text: str, evidence: List[Tuple[ResearchQuery, str]],
+                  budget: PhaseBudget) -> List[Tuple[ResearchQuery, str]]:
+    """Keep the evidence (in order) that the synthesis can read without overrunning the token budget."""
+    left = budget.tokens_left()
+    if left is None:
+        return evidence
+    room = left - count_tokens(_synthesis_prompt(user_query, context_text, [])) - EXPECTED_OUTPUT_TOKENS
+    kept = []
+    for q, result in evidence:
+        cost = count_tokens(_evidence_item(q, result))
+        if cost > room:
+            budget.stop("tokens")
+            break
+        kept.append((q, result))
+        room -= cost
+    return kept
+
+def _synthesis_call(user_query: str, context_text: str, evidence: List[Tuple[ResearchQuery, str]],
+                    config: Optional[RunnableConfig], budget: Optional[PhaseBudget]) -> Tuple[str, RunnableConfig]:
+    stopped = None
+    if budget is not None:
+        # The synthesis always runs; the budget only counts its tokens.
+        stopped = budget.hit
+        config = budget.attach(config, enforce=False)
+    return _synthesis_prompt(user_query, context_text, evidence, stopped), user_facing(config)
+
+def _synthesize(user_query: str, context_text: str, evidence: List[Tuple[ResearchQuery, str]],
+                config: Optional[RunnableConfig] = None, budget: Optional[PhaseBudget] = None) -> str:
+    prompt, config = _synthesis_call(user_query, context_text, evidence, config, budget)
+    return get_llm("generate").invoke(prompt, config=config).content  # type: ignore
+
+async def _asynthesize(user_query: str, context_text: str, evidence: List[Tuple[ResearchQuery, str]],
+                       config: Optional[RunnableConfig] = None, budget: Optional[PhaseBudget] = None) -> str:
+    prompt, config = _synthesis_call(user_query, context_text, evidence, config, budget)
+    return (await get_llm("generate").ainvoke(prompt, config=config)).content  # type: ignore
+
+def _within_tool_budget(queries: List[ResearchQuery], budget: PhaseBudget) -> Tuple[List[ResearchQuery], bool]:
+    left = budget.tool_calls_left()
+    if left is not None and len(queries) > left:
+        return queries[:left], True
+    return queries, False
+
+def _gather_deadline(budget: PhaseBudget) -> Tuple[float, bool]:
+    """The fan-out deadline, and whether it is the phase's time budget rather than RESEARCH_DEADLINE_S."""
+    remaining = budget.remaining_s()
+    if remaining is not None and remaining < RESEARCH_DEADLINE_S:
+        return remaining, True
+    return RESEARCH_DEADLINE_S, False
+
+def _settle_research(user_query: str, context_text: str, queries: List[ResearchQuery], evidence,
+                     truncated: bool, budget_deadline: bool, budget: PhaseBudget):
+    # Recorded only now: a spent budget makes further tool calls raise.
+    if truncated:
+        budget.stop("tool_calls")
+    if budget_deadline and len(evidence) < len(queries):
+        budget.stop("time")
+    return _fit_evidence(user_query, context_text, evidence, budget)
+
+def _run_parallel_research(user_query: str, context_text: str, config: Optional[RunnableConfig] = None,
+                           budget: Optional[PhaseBudget] = None) -> str:
+    budget = budget or PhaseBudget("analysis")
+    tools = _load_tools()
+    if not tools:
+        return _run_tool_agent(user_query, context_text, config, budget)
+    start = time.perf_counter()
+    run_config = budget.attach(config)
+    # Planned in a worker as well, so a slow planner can't hold the phase past its time budget.
+    future = _submit_phase_work(budget, _plan_research, user_query, context_text, tools, run_config)
+    try:
+        queries = future.result(timeout=budget.remaining_s())
+    except FuturesTimeout:
+        budget.stop("time")
+        _abandon(future, "research planner")
+        queries = []
+    queries, truncated = _within_tool_budget(queries, budget)
+    deadline, budget_deadline = _gather_deadline(budget)
+    evidence = _gather_evidence(queries, tools, deadline, run_config) if queries else []
+    logger.debug("Research: %d/%d tool results in %.2fs", len(evidence), len(queries), time.perf_counter() - start)
+    evidence = _settle_research(user_query, context_text, queries, evidence, truncated, budget_deadline, budget)
+    return _synthesize(user_query, context_text, evidence, config, budget)
+
+async def _arun_parallel_research(user_query: str, context_text: str, config: Optional[RunnableConfig] = None,
+                                  budget: Optional[PhaseBudget] = None) -> str:
+    budget = budget or PhaseBudget("analysis")
+    tools = _load_tools()
+    if not tools:
+        return await _arun_tool_agent(user_query, context_text, config, budget)
+    start = time.perf_counter()
+    run_config = budget.attach(config)
+    try:
+        queries = await asyncio.wait_for(_aplan_research(user_query, context_text, tools, run_config),
+                                         timeout=budget.remaining_s())
+    except asyncio.TimeoutError:
+        budget.stop("time")
+        queries = []
+    queries, truncated = _within_tool_budget(queries, budget)
+    deadline, budget_deadline = _gather_deadline(budget)
+    evidence = await _agather_evidence(queries, tools, deadline, run_config) if queries else []
+    logger.debug("Research: %d/%d tool results in %.2fs", len(evidence), len(queries), time.perf_counter() - start)
+    evidence = _settle_research(user_query, context_text, queries, evidence, truncated, budget_deadline, budget)
+    return await _asynthesize(user_query, context_text, evidence, config, budget)
+
+def analysis_agent(state, config: RunnableConfig = None):
     msgs: List[BaseMessage] = state.get("messages", [])
     phase: str = state.get("phase") or "analysis"
     awaiting: bool = state.get("awaiting_confirm", False)
-    print(f"  Phase: {phase}, Awaiting Confirm: {awaiting}, Route: analysis_agent")
-    print(f"  Total messages in state: {len(msgs)}")
+    logger.debug("analysis_agent: phase=%s awaiting=%s messages=%d", phase, awaiting, len(msgs))
 
-    user_query = _extract_real_user_query(msgs) or \
-        next((m.content for m in msgs if isinstance(m, HumanMessage)), "Please continue the analysis.")
-    context_text = _collect_context_from_ai(msgs)
+    budget = PhaseBudget.for_phase("analysis")
+    user_query = state.get("last_question") or state.get("requirement") or "Please continue the analysis."
+    context_text, context_update = build_context(state, "analysis", sections=("solution", "architecture"))
 
-    print("\n> Entering AgentExecutor chain...\n")
-    final_output = _run_tool_agent(user_query, context_text)
-    print("\n> Finished chain.\n")
+    with cache_bypass(state.get("bypass_cache", False)), research_scope():
+        if ANALYSIS_MODE == "agent":
+            final_output = _run_tool_agent(user_query, context_text, config, budget)
+        else:
+            final_output = _run_parallel_research(user_query, context_text, config, budget)
 
     analysis_msg = AIMessage(content=final_output)
-    new_msgs = msgs + [analysis_msg]
 
-    return Command(update={"messages": new_msgs})
+    return Command(update={"messages": [analysis_msg], "analysis_output": final_output,
+                           "budget_usage": budget.report(), **context_update})
+
+
+async def aanalysis_agent(state, config: RunnableConfig = None):
+    """Async twin of analysis_agent (ainvoke/astream)."""
+    budget = PhaseBudget.for_phase("analysis")
+    user_query = state.get("last_question") or state.get("requirement") or "Please continue the analysis."
+    context_text, context_update = await abuild_context(state, "analysis", sections=("solution", "architecture"))
+
+    with cache_bypass(state.get("bypass_cache", False)), research_scope():
+        if ANALYSIS_MODE == "agent":
+            final_output = await _arun_tool_agent(user_query, context_text, config, budget)
+        else:
+            final_output = await _arun_parallel_research(user_query, context_text, config, budget)
+
+    analysis_msg = AIMessage(content=final_output)
+    return Command(update={"messages": [analysis_msg], "analysis_output": final_output,
+                           "budget_usage": budget.report(), **context_update})
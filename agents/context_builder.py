@@ -0,0 +1,226 @@
+# agents/context_builder.py
+"""
+Token-budgeted prompt context shared by the worker agents.
+
+Each phase gets a budget of model tokens, filled in priority order:
+requirement (always counted, rendered by the agent's own prompt), latest solution,
+latest architecture, the rolling summary of older turns, then the most recent turns.
+Turns that fall out of the recent window are folded into `state['history_summary']`
+a batch at a time, so the summary is updated incrementally instead of re-reading
+the whole transcript.
+"""
+
+import logging
+import os
+from typing import Dict, List, Sequence, Tuple
+
+from langchain_core.messages import BaseMessage, HumanMessage
+
+from llm_config import get_llm
+from agents.supervisor_agent import SUPERVISOR_TEXTS
+
+logger = logging.getLogger(__name__)
+
+_ENCODING = None
+_ENCODING_LOADED = False
+
+
+def _encoding():
+    """The tokenizer, loaded on first use (reading the BPE ranks is a noticeable part of startup)."""
+    global _ENCODING, _ENCODING_LOADED
+    if not _ENCODING_LOADED:
+        try:
+            import tiktoken
+            _ENCODING = tiktoken.get_encoding(os.getenv("CONTEXT_TOKEN_ENCODING", "o200k_base"))  # gpt-4o family
+        except Exception:  # tiktoken missing or encoding not downloadable: estimate instead
+            _ENCODING = None
+        _ENCODING_LOADED = True
+    return _ENCODING
+
+PHASE_BUDGETS: Dict[str, int] = {
+    "solution": int(os.getenv("CONTEXT_BUDGET_SOLUTION", "1500")),
+    "architect": int(os.getenv("CONTEXT_BUDGET_ARCHITECT", "4000")),
+    "analysis": int(os.getenv("CONTEXT_BUDGET_ANALYSIS", "4000")),
+}
+RECENT_MESSAGES = int(os.getenv("CONTEXT_RECENT_MESSAGES", "6"))
+RECENT_MESSAGE_MAX_TOKENS = 400
+SUMMARY_BATCH = int(os.getenv("CONTEXT_SUMMARY_BATCH", "4"))
+SUMMARY_MAX_TOKENS = 400
+
+CONTROL_TOKENS = {"yes", "no", "new", "end"}
+
+SECTION_TITLES = {
+    "solution": "Solution Outline",
+    "architecture": "Architecture",
+}
+_SECTION_FIELDS = {
+    "solution": "solution_output",
+    "architecture": "architecture_output",
+}
+
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    encoding = _encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """Keep the head of `text` within `max_tokens` (headings and summaries come first in our outputs)."""
+    if max_tokens <= 0:
+        return ""
+    if count_tokens(text) <= max_tokens:
+        return text
+    marker = "\n…(truncated)"
+    keep = max(0, max_tokens - count_tokens(marker))
+    encoding = _encoding()
+    if encoding is not None:
+        head = encoding.decode(encoding.encode(text, disallowed_special=())[:keep])
+    else:
+        head = text[: keep * 4]
+    return head + marker
+
+
+def _is_boilerplate(msg: BaseMessage) -> bool:
+    content = str(msg.content or "").strip()
+    if isinstance(msg, HumanMessage):
+        return not content or content.lower() in CONTROL_TOKENS
+    return content in SUPERVISOR_TEXTS
+
+
+def _render_turn(msg: BaseMessage, max_tokens: int) -> str:
+    role = "User" if isinstance(msg, HumanMessage) else "Assistant"
+    return f"- **{role}:** {truncate_tokens(str(msg.content), max_tokens)}"
+
+
+def _split_history(state) -> Tuple[List[BaseMessage], List[BaseMessage]]:
+    """
+    Walk back from the newest message: the first RECENT_MESSAGES relevant messages are
+    the recent window; relevant messages older than that and newer than the summary
+    cut-off are returned as not-yet-summarized (oldest first). When the cut-off message
+    has been archived (transcript_archive.py), every message still in the state is newer.
+    """
+    msgs: Sequence[BaseMessage] = state.get("messages", [])
+    skip = {state.get("requirement"), state.get("solution_output"), state.get("architecture_output"),
+            state.get("analysis_output")}
+    upto_id = state.get("summary_upto_id")
+    recent: List[BaseMessage] = []
+    pending: List[BaseMessage] = []
+    for msg in reversed(msgs):
+        if upto_id is not None and msg.id == upto_id:
+            break
+        if _is_boilerplate(msg) or str(msg.content) in skip:
+            continue
+        if len(recent) < RECENT_MESSAGES:
+            recent.append(msg)
+        else:
+            pending.append(msg)
+    recent.reverse()
+    pending.reverse()
+    return recent, pending
+
+
+def archivable(state, limit: int) -> int:
+    """
+    How many of the oldest `limit` messages can leave the state without losing context:
+    those up to the summary cut-off, then any that never enter a prompt.
+    """
+    msgs: Sequence[BaseMessage] = state.get("messages", [])
+    limit = min(limit, len(msgs))
+    skip = {state.get("requirement"), state.get("solution_output"), state.get("architecture_output"),
+            state.get("analysis_output")}
+    upto_id = state.get("summary_upto_id")
+    cut = 0
+    if upto_id is not None:
+        cut = next((i + 1 for i, msg in enumerate(msgs[:limit]) if msg.id == upto_id), 0)
+    while cut < limit and (_is_boilerplate(msgs[cut]) or str(msgs[cut].content) in skip):
+        cut += 1
+    return cut
+
+
+def _summary_prompt(summary: str, turns: List[BaseMessage]) -> str:
+    transcript = "\n".join(_render_turn(m, RECENT_MESSAGE_MAX_TOKENS) for m in turns)
+    return (
+        "You maintain a running summary of a solution-design conversation.\n"
+        f"Keep it under {SUMMARY_MAX_TOKENS // 2} words; keep decisions, constraints and open questions.\n\n"
+        f"# Current summary\n{summary or '(empty)'}\n\n"
+        f"# New turns\n{transcript}\n\n"
+        "Return only the updated summary."
+    )
+
+
+def _summarize(summary: str, turns: List[BaseMessage]) -> str:
+    return truncate_tokens(str(get_llm("rewrite").invoke(_summary_prompt(summary, turns)).content), SUMMARY_MAX_TOKENS)
+
+
+async def _asummarize(summary: str, turns: List[BaseMessage]) -> str:
+    response = await get_llm("rewrite").ainvoke(_summary_prompt(summary, turns))
+    return truncate_tokens(str(response.content), SUMMARY_MAX_TOKENS)
+
+
+def _assemble(state, phase: str, sections: Sequence[str], recent: List[BaseMessage], summary: str) -> str:
+    budget = PHASE_BUDGETS.get(phase, 3000)
+    budget -= count_tokens(state.get("requirement") or "")
+    parts: List[str] = []
+
+    for name in sections:
+        text = state.get(_SECTION_FIELDS[name])
+        if not text or budget <= 0:
+            continue
+        block = truncate_tokens(text, budget)
+        budget -= count_tokens(block)
+        parts.append(f"## {SECTION_TITLES[name]}\n{block}")
+
+    if summary and budget > 0:
+        block = truncate_tokens(summary, min(budget, SUMMARY_MAX_TOKENS))
+        budget -= count_tokens(block)
+        parts.append(f"## Earlier conversation (summary)\n{block}")
+
+    # Newest turns first until the budget runs out, rendered oldest first.
+    lines: List[str] = []
+    for msg in reversed(recent):
+        line = _render_turn(msg, RECENT_MESSAGE_MAX_TOKENS)
+        cost = count_tokens(line)
+        if cost > budget:
+            break
+        budget -= cost
+        lines.append(line)
+    if lines:
+        parts.append("## Recent turns\n" + "\n".join(reversed(lines)))
+
+    return "\n\n".join(parts)
+
+
+def build_context(state, phase: str, sections: Sequence[str] = ()) -> Tuple[str, dict]:
+    """
+    Assemble the context block for `phase`.
+    Returns (markdown context, state update) — the update carries the refreshed
+    rolling summary when older turns were folded in, and is empty otherwise.
+    """
+    recent, pending = _split_history(state)
+    summary = state.get("history_summary") or ""
+    update: dict = {}
+    if len(pending) >= SUMMARY_BATCH:
+        try:
+            summary = _summarize(summary, pending)
+            update = {"history_summary": summary, "summary_upto_id": pending[-1].id}
+        except Exception as e:
+            logger.warning("Context summary update failed (%s); keeping the previous summary.", e)
+    return _assemble(state, phase, sections, recent, summary), update
+
+
+async def abuild_context(state, phase: str, sections: Sequence[str] = ()) -> Tuple[str, dict]:
+    """Async `build_context`: the summary update, when one is due, is awaited."""
+    recent, pending = _split_history(state)
+    summary = state.get("history_summary") or ""
+    update: dict = {}
+    if len(pending) >= SUMMARY_BATCH:
+        try:
+            summary = await _asummarize(summary, pending)
+            update = {"history_summary": summary, "summary_upto_id": pending[-1].id}
+        except Exception as e:
+            logger.warning("Context summary update failed (%s); keeping the previous summary.", e)
+    return _assemble(state, phase, sections, recent, summary), update
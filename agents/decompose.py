@@ -0,0 +1,239 @@
+# agents/decompose.py
+"""
+Map-reduce mode for large requirements (build_graph(decompose=True) or DECOMPOSE_REQUIREMENTS=1).
+
+The solution phase starts in `solution_map`: a small-model call splits the
+requirement into independent sub-problems (once per requirement, kept in
+`state['subproblems']`). With more than one, the map node fans out one
+`solution_part` branch per sub-problem with LangGraph `Send`; the branches run
+in the same step, in parallel, and `solution_reduce` merges their outputs into
+one document. The architecture phase does the same (`architect_map` ->
+`architect_part` -> `architect_reduce`), each branch designing its part from
+that part's solution. A requirement that doesn't split goes to the regular
+single-call agent, so the phase takes as long as its largest sub-problem.
+
+Branches don't stream tokens (interleaved streams would be unreadable); the
+merged document is shown when the reduce node finishes.
+"""
+
+import logging
+import os
+import re
+from typing import Dict, List, Optional
+
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.types import Command, Send
+from pydantic import BaseModel, Field
+
+from llm_config import get_llm
+from llm_cache import cache_bypass
+from agents.architect_agent import ARCHITECT_PROMPT, asanitize_query, sanitize_query
+from agents.context_builder import abuild_context, build_context
+from agents.solution_agent import SOLUTION_PROMPT
+
+logger = logging.getLogger(__name__)
+
+DECOMPOSE_REQUIREMENTS = os.getenv("DECOMPOSE_REQUIREMENTS", "0").lower() in ("1", "true", "on")
+DECOMPOSE_MAX_PARTS = int(os.getenv("DECOMPOSE_MAX_PARTS", "5"))
+# Shorter requirements are designed in one call without asking the model to split them.
+DECOMPOSE_MIN_WORDS = int(os.getenv("DECOMPOSE_MIN_WORDS", "12"))
+
+
+class SubProblem(BaseModel):
+    title: str = Field(..., description="Short name of the sub-problem, e.g. 'Ingestion'")
+    scope: str = Field(..., description="One or two sentences on what this part covers")
+
+
+class Decomposition(BaseModel):
+    subproblems: List[SubProblem] = Field(default_factory=list)
+
+
+DECOMPOSE_PROMPT = (
+    "You split software requirements into parts that can be designed independently.\n"
+    f"Return at most {DECOMPOSE_MAX_PARTS} sub-problems (for example ingestion, serving, analytics) "
+    "that together cover the whole requirement with little overlap. "
+    "Return a single sub-problem if the requirement is small or its parts are tightly coupled.\n\n"
+    "# Requirement\n{requirement}"
+)
+
+_decomposer = None
+
+
+def _get_decomposer():
+    global _decomposer
+    if _decomposer is None:
+        _decomposer = get_llm("rewrite").with_structured_output(Decomposition)
+    return _decomposer
+
+
+def _checked(plan: Optional[Decomposition]) -> List[dict]:
+    parts = [p for p in (plan.subproblems if plan else []) if p.title.strip()][:DECOMPOSE_MAX_PARTS]
+    return [p.model_dump() for p in parts] if len(parts) > 1 else []
+
+
+def _needs_split(state) -> bool:
+    return state.get("subproblems") is None and len((state.get("requirement") or "").split()) >= DECOMPOSE_MIN_WORDS
+
+
+def decompose(requirement: str) -> List[dict]:
+    """The requirement's sub-problems as {"title", "scope"} dicts; [] when it should stay whole."""
+    try:
+        return _checked(_get_decomposer().invoke(DECOMPOSE_PROMPT.format(requirement=requirement)))
+    except Exception as e:
+        logger.warning("Requirement decomposition failed (%s); designing it in one piece.", e)
+        return []
+
+
+async def adecompose(requirement: str) -> List[dict]:
+    try:
+        return _checked(await _get_decomposer().ainvoke(DECOMPOSE_PROMPT.format(requirement=requirement)))
+    except Exception as e:
+        logger.warning("Requirement decomposition failed (%s); designing it in one piece.", e)
+        return []
+
+
+def _part_requirement(requirement: str, subproblems: List[dict], index: int) -> str:
+    part = subproblems[index]
+    others = "; ".join(p["title"] for i, p in enumerate(subproblems) if i != index)
+    return (
+        f"{part['title']}: {part['scope']}\n\n"
+        f"This is part {index + 1} of {len(subproblems)} of the overall requirement:\n{requirement}\n"
+        f"The other parts ({others}) are designed separately; cover only this part and its interfaces to them."
+    )
+
+
+# ---------- map: decide, then fan out ----------
+
+def _solution_sends(state, subproblems: List[dict], context: str) -> List[Send]:
+    return [Send("solution_part", {
+        "index": i,
+        "requirement": _part_requirement(state["requirement"], subproblems, i),
+        "context": context,
+        "bypass_cache": state.get("bypass_cache", False),
+    }) for i in range(len(subproblems))]
+
+
+def _architect_sends(state, subproblems: List[dict], clean_query: str, context: str) -> List[Send]:
+    solution_parts = state.get("solution_parts") or []
+    return [Send("architect_part", {
+        "index": i,
+        "requirement": _part_requirement(clean_query, subproblems, i),
+        # Each part's own solution; the shared context carries the rest of the conversation.
+        "context": "\n\n".join(filter(None, [
+            f"## Solution Outline (this part)\n{solution_parts[i]}" if i < len(solution_parts) else "", context])) or "(none)",
+        "bypass_cache": state.get("bypass_cache", False),
+    }) for i in range(len(subproblems))]
+
+
+def _solution_fan_out(state, subproblems: List[dict], context_update: Optional[dict] = None, context: str = ""):
+    if not subproblems:
+        return Command(update={"subproblems": subproblems}, goto="solution_agent")
+    logger.debug("solution_map: %d sub-problems", len(subproblems))
+    return Command(update={"subproblems": subproblems, **(context_update or {})},
+                   goto=_solution_sends(state, subproblems, context))
+
+
+def solution_map(state):
+    subproblems = decompose(state["requirement"]) if _needs_split(state) else state.get("subproblems") or []
+    if not subproblems:
+        return _solution_fan_out(state, subproblems)
+    context, context_update = build_context(state, "solution")
+    return _solution_fan_out(state, subproblems, context_update, context or "(none)")
+
+
+async def asolution_map(state):
+    subproblems = await adecompose(state["requirement"]) if _needs_split(state) else state.get("subproblems") or []
+    if not subproblems:
+        return _solution_fan_out(state, subproblems)
+    context, context_update = await abuild_context(state, "solution")
+    return _solution_fan_out(state, subproblems, context_update, context or "(none)")
+
+
+def architect_map(state):
+    subproblems = state.get("subproblems") or []
+    if not subproblems:
+        return Command(goto="architect_agent")
+    clean_query = state.get("clean_requirement") or sanitize_query(state["requirement"])
+    context, context_update = build_context(state, "architect")
+    return Command(update={"clean_requirement": clean_query, **context_update},
+                   goto=_architect_sends(state, subproblems, clean_query, context))
+
+
+async def aarchitect_map(state):
+    subproblems = state.get("subproblems") or []
+    if not subproblems:
+        return Command(goto="architect_agent")
+    clean_query = state.get("clean_requirement") or await asanitize_query(state["requirement"])
+    context, context_update = await abuild_context(state, "architect")
+    return Command(update={"clean_requirement": clean_query, **context_update},
+                   goto=_architect_sends(state, subproblems, clean_query, context))
+
+
+# ---------- branches: one sub-problem each ----------
+
+def _part_messages(kind: str, part: dict):
+    if kind == "solution":
+        return SOLUTION_PROMPT.format_messages(requirement=part["requirement"], context=part["context"])
+    return ARCHITECT_PROMPT.format_messages(clean_query=part["requirement"], context=part["context"])
+
+
+def _part_node(kind: str):
+    label = "Solution" if kind == "solution" else "Architect"
+
+    def node(part, config: RunnableConfig = None):
+        try:
+            with cache_bypass(part.get("bypass_cache", False)):
+                text = get_llm("generate").invoke(_part_messages(kind, part), config=config).content
+        except Exception as e:
+            text = f"{label} Agent Error: {e}"
+        return {"part_outputs": {str(part["index"]): text}}
+
+    async def anode(part, config: RunnableConfig = None):
+        try:
+            with cache_bypass(part.get("bypass_cache", False)):
+                text = (await get_llm("generate").ainvoke(_part_messages(kind, part), config=config)).content
+        except Exception as e:
+            text = f"{label} Agent Error: {e}"
+        return {"part_outputs": {str(part["index"]): text}}
+
+    return node, anode
+
+
+solution_part, asolution_part = _part_node("solution")
+architect_part, aarchitect_part = _part_node("architecture")
+
+
+# ---------- reduce: one document ----------
+
+_HEADING = re.compile(r"^(#{1,4})(\s)", re.MULTILINE)
+_FENCE = re.compile(r"(```.*?```)", re.DOTALL)
+
+
+def _demote(markdown: str, levels: int = 2) -> str:
+    """Push a part's headings below the merged document's own (code blocks untouched)."""
+    pieces = _FENCE.split(markdown)
+    return "".join(p if p.startswith("```") else _HEADING.sub(lambda m: "#" * levels + m.group(1) + m.group(2), p)
+                   for p in pieces)
+
+
+def merge_parts(title: str, subproblems: List[dict], outputs: Dict[str, str]) -> str:
+    sections = [f"# {title}", "Designed in parts:\n" + "\n".join(
+        f"{i + 1}. **{p['title']}**: {p['scope']}" for i, p in enumerate(subproblems))]
+    for i, p in enumerate(subproblems):
+        sections.append(f"## {i + 1}. {p['title']}\n{_demote(str(outputs.get(str(i), '(no output)')).strip())}")
+    return "\n\n".join(sections)
+
+
+def solution_reduce(state):
+    subproblems = state.get("subproblems") or []
+    outputs = state.get("part_outputs") or {}
+    document = merge_parts("Solution", subproblems, outputs)
+    return {"messages": [AIMessage(content=document)], "solution_output": document,
+            "solution_parts": [str(outputs.get(str(i), "")) for i in range(len(subproblems))], "part_outputs": None}
+
+
+def architect_reduce(state):
+    subproblems = state.get("subproblems") or []
+    document = merge_parts("Architecture", subproblems, state.get("part_outputs") or {})
+    return {"messages": [AIMessage(content=document)], "architecture_output": document, "part_outputs": None}
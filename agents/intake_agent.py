@@ -0,0 +1,63 @@
+# agents/intake_agent.py
+"""
+Requirement intake: the first node of every graph run.
+
+Looks only at the newest message, so its cost doesn't grow with the transcript.
+When a new request arrives it becomes `state['requirement']` and the phase
+outputs of the previous request are cleared; `last_user_text` carries the latest
+human reply for the supervisor. The sanitized requirement is produced once, on
+the first architect run, and kept in `state['clean_requirement']`. A new request
+also restarts the worker context (agents/context_builder.py) at its message.
+`last_question` is the latest human message that is a question rather than a
+control reply (intake and await_reply both record it); analysis researches it.
+Intake (and await_reply, for confirmation replies) also keeps the transcript to its
+window: past it, the oldest messages move to the session archive (transcript_archive.py).
+"""
+
+from langchain_core.messages import HumanMessage
+from langchain_core.runnables import RunnableConfig
+
+from transcript_archive import aarchive_update, archive_update
+
+CONTROL_TOKENS = {"yes", "no", "new", "end"}
+# Replies to a confirmation prompt this short are acknowledgements ("ok", "sure"), not questions.
+MAX_ACK_CHARS = 8
+
+def question_update(text: str, after_prompt: bool = False) -> dict:
+    """{"last_question": text} when `text` is a real question, else nothing."""
+    if not text or text.lower() in CONTROL_TOKENS or (after_prompt and len(text) <= MAX_ACK_CHARS):
+        return {}
+    return {"last_question": text}
+
+def intake_agent(state, config: RunnableConfig = None):
+    return {**_intake(state), **archive_update(state, config)}
+
+async def aintake_agent(state, config: RunnableConfig = None):
+    """Async twin: only the (occasional) archive write leaves the event loop."""
+    return {**_intake(state), **await aarchive_update(state, config)}
+
+def _intake(state):
+    msgs = state.get("messages", [])
+    last = msgs[-1] if msgs else None
+    if not isinstance(last, HumanMessage):
+        return {"last_user_text": None}
+
+    text = str(last.content or "").strip()
+    update = {"last_user_text": text, **question_update(text)}
+    phase = state.get("phase") or "start"
+    if phase == "start":
+        is_request = bool(text) and text.lower() not in CONTROL_TOKENS
+        update.update({
+            "requirement": text if is_request else None,
+            "last_question": text if is_request else None,
+            "clean_requirement": None,
+            "solution_output": None,
+            "architecture_output": None,
+            "analysis_output": None,
+            "subproblems": None,
+            "solution_parts": None,
+            # Context for the new request starts at it: earlier turns are neither recent nor summarized.
+            "history_summary": None,
+            "summary_upto_id": msgs[-2].id if len(msgs) > 1 else None,
+        })
+    return update
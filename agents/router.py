@@ -0,0 +1,150 @@
+# agents/router.py
+"""
+Local routing engine for confirmation replies.
+
+Control tokens and common phrasings are resolved from a rule table with no
+network call. Anything else is handed to an LLM fallback, and its decision is
+cached by normalized text so a repeated ambiguous reply is only classified once.
+"""
+
+import re
+import threading
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+PROCEED = "proceed_to_next_phase"
+REVISE = "revise_current_phase"
+NEW = "start_new_query"
+END_SESSION = "end_session"
+CLARIFY = "clarify"
+
+DECISIONS = (PROCEED, REVISE, NEW, END_SESSION, CLARIFY)
+
+_RULES: Dict[str, str] = {}
+for _decision, _phrases in {
+    PROCEED: [
+        "yes", "y", "yep", "yeah", "yup", "sure", "ok", "okay", "k", "go", "go ahead",
+        "go on", "proceed", "continue", "next", "next phase", "move on", "do it",
+        "sounds good", "looks good", "lgtm", "confirm", "confirmed", "approved", "yes proceed",
+        "yes go ahead", "yes continue", "ok proceed", "okay proceed", "lets go", "let's go",
+    ],
+    REVISE: [
+        "no", "n", "nope", "nah", "redo", "revise", "retry", "try again", "again",
+        "regenerate", "rework", "rewrite", "redo it", "revise it", "do it again",
+        "not good", "no revise", "no redo", "no try again",
+    ],
+    NEW: [
+        "new", "new request", "new query", "new question", "new one", "new solution",
+        "start over", "start again", "restart", "start fresh", "fresh start", "reset",
+        "something else",
+    ],
+    END_SESSION: [
+        "end", "stop", "quit", "exit", "done", "finish", "finished", "bye", "goodbye",
+        "end session", "that's all", "thats all", "that is all", "cancel", "i'm done", "im done",
+    ],
+}.items():
+    for _p in _phrases:
+        _RULES[_p] = _decision
+
+# Politeness words that never change the intent of a short reply.
+_FILLER = {"please", "pls", "thanks", "thank", "you", "thx", "now", "then"}
+
+_PUNCT_RE = re.compile(r"[^\w\s']+")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_reply(text: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace."""
+    text = _PUNCT_RE.sub(" ", (text or "").lower())
+    return _SPACE_RE.sub(" ", text).strip()
+
+
+def match_rules(text: str) -> Optional[str]:
+    """Return a decision for a known phrasing, or None if the reply is ambiguous."""
+    norm = normalize_reply(text)
+    if norm in _RULES:
+        return _RULES[norm]
+    words = norm.split()
+    while words and words[-1] in _FILLER:
+        words.pop()
+    while words and words[0] in _FILLER:
+        words.pop(0)
+    return _RULES.get(" ".join(words))
+
+
+class RouteCache:
+    """Thread-safe LRU of LLM routing decisions keyed by normalized reply text."""
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            decision = self._data.get(key)
+            if decision is not None:
+                self._data.move_to_end(key)
+            return decision
+
+    def put(self, key: str, decision: str) -> None:
+        with self._lock:
+            self._data[key] = decision
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+ROUTE_CACHE = RouteCache()
+
+# How each decision was reached; "llm" / total is the LLM-call ratio.
+ROUTER_STATS: Dict[str, int] = {"rule": 0, "cache": 0, "llm": 0}
+
+
+def _classify_local(text: str) -> Tuple[Optional[str], str]:
+    """(decision, source) from the rules or the cache, else (None, normalized key for the LLM)."""
+    decision = match_rules(text)
+    if decision is not None:
+        ROUTER_STATS["rule"] += 1
+        return decision, "rule"
+
+    key = normalize_reply(text)
+    decision = ROUTE_CACHE.get(key)
+    if decision is not None:
+        ROUTER_STATS["cache"] += 1
+        return decision, "cache"
+    return None, key
+
+
+def _record_llm_decision(key: str, decision: str) -> str:
+    if decision not in DECISIONS:
+        decision = CLARIFY
+    ROUTER_STATS["llm"] += 1
+    # Don't pin a "clarify" answer: the same text may be classifiable on a retry.
+    if decision != CLARIFY:
+        ROUTE_CACHE.put(key, decision)
+    return decision
+
+
+def classify_reply(text: str, llm_fallback: Callable[[str], str]) -> Tuple[str, str]:
+    """
+    Classify a confirmation reply.
+    Returns (decision, source) where source is 'rule', 'cache' or 'llm'.
+    `llm_fallback` is only called for replies that no rule matches and that are not cached.
+    """
+    decision, source = _classify_local(text)
+    if decision is not None:
+        return decision, source
+    return _record_llm_decision(source, llm_fallback(source)), "llm"
+
+
+async def aclassify_reply(text: str, llm_fallback: Callable[[str], Awaitable[str]]) -> Tuple[str, str]:
+    """Async `classify_reply`; `llm_fallback` is a coroutine function."""
+    decision, source = _classify_local(text)
+    if decision is not None:
+        return decision, source
+    return _record_llm_decision(source, await llm_fallback(source)), "llm"
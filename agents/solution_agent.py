@@ -1,46 +1,71 @@
 # agents/solution_agent.py
+import logging
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.messages import HumanMessage, AIMessage, BaseMessage
-from llm_config import llm
-
-def solution_agent(state):
-    print("\n--- DEBUG: Entering solution_agent ---")
-    print(f"  Phase: {state.get('phase')}, Awaiting Confirm: {state.get('awaiting_confirm')}, Route: {state.get('route')}")
-    print(f"  Total messages in state: {len(state['messages'])}")
-
-    messages = state["messages"]
-
-    # Find core requirement
-    core_query = ""
-    for msg in messages:
-        if isinstance(msg, HumanMessage) and not (msg.content.lower().strip() in ["yes", "no", "new", "end", ""] or len(msg.content.split()) < 5):
-            core_query = msg.content
-            break
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableConfig
+from llm_config import get_llm
+from llm_cache import cache_bypass
+from agents.context_builder import abuild_context, build_context
+from streaming import user_facing
+
+logger = logging.getLogger(__name__)
+
+SOLUTION_PROMPT = ChatPromptTemplate.from_messages(
+    [
+        ("system",
+         "You are a Solution Architect Agent.\n"
+         "Respond concisely in **Markdown**.\n"
+         "Structure as: 1) Summary, 2) Step-by-step plan, 3) Trade-offs, 4) Risks/assumptions."),
+        ("system", "Conversation context:\n{context}"),
+        ("user", "Requirement: {requirement}")
+    ]
+)
+
+NO_REQUIREMENT_TEXT = "I need a clear requirement to provide a solution."
+
+def solution_agent(state, config: RunnableConfig = None):
+    logger.debug("solution_agent: phase=%s awaiting=%s route=%s messages=%d", state.get("phase"),
+                 state.get("awaiting_confirm"), state.get("route"), len(state["messages"]))
+
+    # Requirement is extracted once by the intake node
+    core_query = state.get("requirement") or ""
+
     if not core_query:
-        for msg in reversed(messages):
-            if isinstance(msg, HumanMessage):
-                core_query = msg.content
-                break
+        return {"messages": [AIMessage(content=NO_REQUIREMENT_TEXT)]}
+
+    context, context_update = build_context(state, "solution")
+
+    try:
+        with cache_bypass(state.get("bypass_cache", False)):
+            response = get_llm("generate").invoke(
+                SOLUTION_PROMPT.format_messages(requirement=core_query, context=context or "(none)"),
+                config=user_facing(config),
+            )
+        return _solution_update(response, context_update)
+    except Exception as e:
+        error_message = f"Solution Agent Error: {str(e)}"
+        return {"messages": [AIMessage(content=error_message)]}
+
+async def asolution_agent(state, config: RunnableConfig = None):
+    """Async twin of solution_agent (ainvoke/astream)."""
+    core_query = state.get("requirement") or ""
 
     if not core_query:
-        return {"messages": messages + [AIMessage(content="I need a clear requirement to provide a solution.")]}
-
-    prompt_template = ChatPromptTemplate.from_messages(
-        [
-            ("system",
-             "You are a Solution Architect Agent.\n"
-             "Respond concisely in **Markdown**.\n"
-             "Structure as: 1) Summary, 2) Step-by-step plan, 3) Trade-offs, 4) Risks/assumptions."),
-            ("user", "Requirement: {requirement}")
-        ]
-    )
+        return {"messages": [AIMessage(content=NO_REQUIREMENT_TEXT)]}
+
+    context, context_update = await abuild_context(state, "solution")
 
     try:
-        response_content = llm.invoke(
-            prompt_template.format_messages(requirement=core_query)
-        ).content
-        final_message = AIMessage(content=response_content)
-        return {"messages": messages + [final_message]}
+        with cache_bypass(state.get("bypass_cache", False)):
+            response = await get_llm("generate").ainvoke(
+                SOLUTION_PROMPT.format_messages(requirement=core_query, context=context or "(none)"),
+                config=user_facing(config),
+            )
+        return _solution_update(response, context_update)
     except Exception as e:
         error_message = f"Solution Agent Error: {str(e)}"
-        return {"messages": messages + [AIMessage(content=error_message)]}
+        return {"messages": [AIMessage(content=error_message)]}
+
+def _solution_update(response, context_update: dict) -> dict:
+    final_message = AIMessage(content=response.content, id=response.id)
+    return {"messages": [final_message], "solution_output": response.content, **context_update}
@@ -1,11 +1,15 @@
 # agents/supervisor_agent.py
 
-from typing import Optional, List
+import logging
+from typing import Optional, List, Tuple
 from langchain_core.messages import AIMessage, HumanMessage, BaseMessage
 from langchain_core.prompts import ChatPromptTemplate
 from pydantic import BaseModel, Field
-from llm_config import llm
+from llm_config import get_llm
 from langgraph.types import Command
+from agents.router import aclassify_reply, classify_reply
+
+logger = logging.getLogger(__name__)
 
 # --- Confirmation texts (keep these exact; used to detect confirmation flow) ---
 CONFIRM_SOL_TEXT = (
@@ -27,6 +31,9 @@ CLARIFICATION_TEXT = (
 )
 ASK_NEW_QUERY_TEXT = "Okay, let's start fresh. What new solution or requirement do you have?"
 
+# Everything the supervisor itself says; never worth sending back to a model as context.
+SUPERVISOR_TEXTS = {CONFIRM_SOL_TEXT, CONFIRM_ARCH_TEXT, CONFIRM_ANALYSIS_TEXT, CLARIFICATION_TEXT, ASK_NEW_QUERY_TEXT}
+
 CONTROL_TOKENS = {"yes", "no", "new", "end"}
 
 class RouteDecision(BaseModel):
@@ -35,42 +42,58 @@ class RouteDecision(BaseModel):
         description="One of: 'proceed_to_next_phase', 'revise_current_phase', 'start_new_query', 'end_session', 'clarify'",
     )
 
-def _latest_human_after_confirm(msgs: List[BaseMessage]) -> Optional[HumanMessage]:
-    for i in range(len(msgs) - 1, 0, -1):
-        m = msgs[i]
-        if isinstance(m, HumanMessage):
-            prev = msgs[i - 1]
-            if isinstance(prev, AIMessage):
-                prev_c = str(prev.content)
-                if (
-                    CONFIRM_SOL_TEXT in prev_c
-                    or CONFIRM_ARCH_TEXT in prev_c
-                    or CONFIRM_ANALYSIS_TEXT in prev_c
-                    or CLARIFICATION_TEXT in prev_c
-                ):
-                    return m
+ROUTE_PROMPT = ChatPromptTemplate.from_template(
+    "Classify message: {message}\n"
+    "Options: proceed_to_next_phase, revise_current_phase, start_new_query, end_session, clarify"
+)
+
+_decision_chain = None
+
+def _get_decision_chain():
+    """Build the structured-output classifier chain once and reuse it."""
+    global _decision_chain
+    if _decision_chain is None:
+        _decision_chain = ROUTE_PROMPT | get_llm("router").with_structured_output(RouteDecision)
+    return _decision_chain
+
+def _llm_route(message: str) -> str:
+    """Fallback classifier for replies the local rules can't resolve."""
+    return _get_decision_chain().invoke({"message": message}).decision
+
+async def _allm_route(message: str) -> str:
+    return (await _get_decision_chain().ainvoke({"message": message})).decision
+
+def _pending_reply(state) -> Optional[str]:
+    """The confirmation reply this run will classify, if any (the awaiting branch below)."""
+    reply = state.get("last_user_text")
+    if (state.get("phase") or "start") != "start" and state.get("awaiting_confirm") and reply:
+        return reply.lower().strip()
     return None
 
 def supervisor_agent(state):
-    print("\n--- DEBUG SUPERVISOR ENTERED ---")
+    return _supervise(state)
+
+async def asupervisor_agent(state):
+    """Async twin: only the (rare) LLM fallback for an unclear reply is awaited."""
+    reply = _pending_reply(state)
+    decided = await aclassify_reply(reply, _allm_route) if reply else None
+    return _supervise(state, decided)
 
-    msgs: List[BaseMessage] = state.get("messages", [])
+def _supervise(state, decided: Optional[Tuple[str, str]] = None):
     phase: str = state.get("phase") or "start"
     awaiting: bool = state.get("awaiting_confirm", False)
 
     # ---------- INITIAL ROUTE ----------
     if phase == "start":
-        last_h = next((m for m in reversed(msgs) if isinstance(m, HumanMessage)), None)
-        if last_h:
-            txt = (last_h.content or "").lower().strip()
-            if txt not in CONTROL_TOKENS:
-                return Command(update={
-                    "phase": "solution",
-                    "route": "solution_agent",
-                    "awaiting_confirm": False,
-                })
+        if state.get("requirement"):
+            return Command(update={
+                "phase": "solution",
+                "route": "solution_agent",
+                "awaiting_confirm": False,
+                "bypass_cache": False,
+            })
         return Command(update={
-            "messages": msgs + [AIMessage(content=ASK_NEW_QUERY_TEXT)],
+            "messages": [AIMessage(content=ASK_NEW_QUERY_TEXT)],
             "awaiting_confirm": False,
             "route": "END",
         })
@@ -84,30 +107,22 @@ def supervisor_agent(state):
         else:
             confirm_text = CONFIRM_ANALYSIS_TEXT
 
-        print(f"  Supervisor: Worker finished phase '{phase}'. Asking for confirmation.")
+        logger.debug("Supervisor: worker finished phase '%s'; asking for confirmation.", phase)
         return Command(update={
-            "messages": msgs + [AIMessage(content=confirm_text)],
+            "messages": [AIMessage(content=confirm_text)],
             "awaiting_confirm": True,
-            "route": "END",
+            "route": "await_reply",
         })
 
     # ---------- HANDLE CONFIRMATION REPLY ----------
     if awaiting:
-        reply_msg = _latest_human_after_confirm(msgs)
-        if not reply_msg:
-            print("  Supervisor: Awaiting confirmation, no new human input yet. Ending run.")
+        user_text = _pending_reply(state)
+        if not user_text:
+            logger.debug("Supervisor: awaiting confirmation, no new human input yet; ending run.")
             return Command(update={"route": "END"})
 
-        user_text = (reply_msg.content or "").lower().strip()
-        decision_chain = (
-            ChatPromptTemplate.from_template(
-                "Classify message: {message}\n"
-                "Options: proceed_to_next_phase, revise_current_phase, start_new_query, end_session, clarify"
-            )
-            | llm.with_structured_output(RouteDecision)
-        )
-        decision = decision_chain.invoke({"message": user_text}).decision
-        print(f"  Supervisor: User replied '{user_text}' → interpreted as '{decision}'.")
+        decision, source = decided or classify_reply(user_text, _llm_route)
+        logger.debug("Supervisor: user replied %r -> %s (via %s).", user_text, decision, source)
 
         if decision == "proceed_to_next_phase":
             if phase == "solution":
@@ -115,12 +130,14 @@ def supervisor_agent(state):
                     "phase": "architect",
                     "route": "architect_agent",
                     "awaiting_confirm": False,
+                    "bypass_cache": False,
                 })
             elif phase == "architect":
                 return Command(update={
                     "phase": "analysis",
                     "route": "analysis_agent",
                     "awaiting_confirm": False,
+                    "bypass_cache": False,
                 })
             else:
                 return Command(update={
@@ -130,10 +147,12 @@ def supervisor_agent(state):
                 })
 
         elif decision == "revise_current_phase":
+            # An explicit revision must produce a fresh answer, not the cached one.
             return Command(update={
                 "phase": phase,
                 "route": f"{phase}_agent",
                 "awaiting_confirm": False,
+                "bypass_cache": True,
             })
 
         elif decision == "start_new_query":
@@ -141,7 +160,7 @@ def supervisor_agent(state):
                 "phase": "start",
                 "route": "END",
                 "awaiting_confirm": False,
-                "messages": msgs + [AIMessage(content=ASK_NEW_QUERY_TEXT)],
+                "messages": [AIMessage(content=ASK_NEW_QUERY_TEXT)],
             })
 
         elif decision == "end_session":
@@ -153,9 +172,9 @@ def supervisor_agent(state):
 
         else:  # clarify
             return Command(update={
-                "messages": msgs + [AIMessage(content=CLARIFICATION_TEXT)],
+                "messages": [AIMessage(content=CLARIFICATION_TEXT)],
                 "awaiting_confirm": True,
-                "route": "END",
+                "route": "await_reply",
             })
 
     return Command(update={"route": "END"})
@@ -1,39 +1,86 @@
 # app.py
+import sys
+import uuid
 import streamlit as st
-from graph_builder import build_graph
-from state import ChatState
-from langchain_core.messages import HumanMessage, AIMessage
-from langgraph.errors import GraphRecursionError
+from graph_builder import PREWARM, build_graph, prewarm, thread_config, turn_input, session_values
+from checkpointing import make_checkpointer
+from chat_view import Transcript, render
+import profiling
+from streaming import stream_turn
+from tracing import configure_logging
+
+configure_logging()
+# `streamlit run app.py -- --profile` (or PROFILE_TURNS=1) profiles each turn.
+if "--profile" in sys.argv[1:]:
+    profiling.PROFILE_TURNS = True
+
+
+@st.cache_resource
+def shared_graph():
+    """One compiled graph (and checkpointer) per server process, shared by every browser session."""
+    graph = build_graph(checkpointer=make_checkpointer())
+    if PREWARM:
+        prewarm()
+    return graph
+
 
 st.set_page_config(page_title="Solution Architect", layout="centered", page_icon="💡")
 
 # --- Init ---
+# The session is a checkpointed graph thread; its id lives in the URL so the
+# conversation survives a server restart or a move to another worker
+# (with CHECKPOINT_BACKEND=sqlite).
+if "thread_id" not in st.session_state:
+    st.session_state.thread_id = st.query_params.get("thread") or uuid.uuid4().hex
+    st.query_params["thread"] = st.session_state.thread_id
 if "graph" not in st.session_state:
-    st.session_state.graph = build_graph()
-if "chat_state" not in st.session_state:
-    st.session_state.chat_state = ChatState(messages=[], phase="start", awaiting_confirm=False, route=None)
+    st.session_state.graph = shared_graph()
+config = thread_config(st.session_state.thread_id)
+if "transcript" not in st.session_state:
+    values = session_values(st.session_state.graph, config) or {}
+    st.session_state.transcript = Transcript(values.get("messages", []), st.session_state.thread_id,
+                                             values.get("archived_messages") or 0)
 
 st.markdown(
     "<h2 style='text-align:center;'>💡 Solution Architect</h2>",
     unsafe_allow_html=True
 )
 
-# --- Chat history ---
-for m in st.session_state.chat_state["messages"]:
-    role = "user" if isinstance(m, HumanMessage) else "assistant"
-    with st.chat_message(role):
-        st.markdown(m.content)
+# --- Chat history (recent turns; older ones collapsed, see chat_view.py) ---
+render(st.session_state.transcript)
+if st.session_state.get("last_profile"):
+    st.caption(f"⏱ Profiled {st.session_state.last_profile}")
 
 # --- Run Graph Helper ---
-def run_graph():
-    try:
-        result = st.session_state.graph.invoke(st.session_state.chat_state)
-        st.session_state.chat_state.update(result)
-    except GraphRecursionError:
-        st.error("⚠️ Paused: waiting for confirmation.")
+def run_graph(user_input: str):
+    # Render answer tokens into a live placeholder as they stream in; the transcript
+    # picks up the turn's new messages and is re-rendered on the next rerun.
+    graph = st.session_state.graph
+    placeholder = None
+    current_id = None
+    text = ""
+    result = None
+    with profiling.profile_turn(st.session_state.thread_id, user_input) as profile:
+        for kind, payload in stream_turn(graph, turn_input(graph, config, user_input), config):
+            if kind == "token":
+                msg_id, token = payload
+                if msg_id != current_id:
+                    placeholder = st.chat_message("assistant").empty()
+                    current_id, text = msg_id, ""
+                text += token
+                placeholder.markdown(text + "▌")
+            else:
+                result = payload
+    if profile:
+        st.session_state.last_profile = profile["summary"]
+    if placeholder is not None:
+        placeholder.markdown(text)
+    if result:
+        st.session_state.transcript.sync(result.get("messages", []), result.get("archived_messages") or 0)
 
 # --- User input ---
 if user_input := st.chat_input("Type here..."):
-    st.session_state.chat_state["messages"].append(HumanMessage(content=user_input))
-    run_graph()
+    with st.chat_message("user"):
+        st.markdown(user_input)
+    run_graph(user_input)
     st.rerun()
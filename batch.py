@@ -0,0 +1,205 @@
+# batch.py
+"""
+Batch mode: run many requirements through solution -> architecture -> analysis
+without a human in the loop.
+
+Input is JSONL, one requirement per line, as {"id": ..., "requirement": ...}
+("request_id" / "body" / "text" are accepted too, so a backlog file like
+requests.jsonl works as is). Every confirmation prompt is answered "yes".
+Sessions run concurrently over one compiled graph, each on its own thread_id;
+results are appended to the output JSONL as each session finishes.
+
+Resuming: records already in the output with status "done" are skipped, and
+sessions are checkpointed (SQLite by default) under a thread_id derived from
+the record id, so a session interrupted by a crash continues from its last
+completed phase instead of starting over.
+
+    python batch.py requirements.jsonl --out reports.jsonl --concurrency 8
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterable, List, Optional
+
+from langchain_core.messages import HumanMessage
+from langgraph.types import Command
+
+CONFIRM_REPLY = "yes"
+MAX_TURNS = int(os.getenv("BATCH_MAX_TURNS", "8"))  # requirement + 3 confirmations, with slack for clarifications
+DEFAULT_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+
+_ID_KEYS = ("id", "request_id")
+_TEXT_KEYS = ("requirement", "body", "text")
+
+
+def load_requirements(path: str) -> List[Dict[str, str]]:
+    """Read the input JSONL into [{"id", "requirement"}], deriving a stable id when none is given."""
+    records = []
+    with open(path, encoding="utf-8") as fh:
+        for lineno, line in enumerate(fh, 1):
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            text = next((row[k] for k in _TEXT_KEYS if row.get(k)), None)
+            if not text:
+                print(f"  Skipping line {lineno}: no requirement text", file=sys.stderr)
+                continue
+            if row.get("title") and "requirement" not in row:
+                text = f"{row['title']}\n\n{text}"
+            rid = next((str(row[k]) for k in _ID_KEYS if row.get(k)), None)
+            rid = rid or hashlib.sha1(text.encode("utf-8")).hexdigest()[:12]
+            records.append({"id": rid, "requirement": text})
+    return records
+
+
+def completed_ids(out_path: str) -> set:
+    """Ids already written with status 'done' (failed ones are retried)."""
+    done = set()
+    if not os.path.exists(out_path):
+        return done
+    with open(out_path, encoding="utf-8") as fh:
+        for line in fh:
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:  # torn last line from a crash
+                continue
+            if row.get("status") == "done":
+                done.add(row["id"])
+    return done
+
+
+class ResultWriter:
+    """Appends one JSON line per finished session; flushed and fsynced so a crash loses nothing written."""
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._fh = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def write(self, row: dict) -> None:
+        line = json.dumps(row, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._fh.write(line)
+            self._fh.flush()
+            os.fsync(self._fh.fileno())
+
+    def close(self) -> None:
+        self._fh.close()
+
+
+def _next_input(graph, config, requirement: str):
+    """
+    (finished, input) for this session's next run. A session left mid-run by a
+    crash has pending tasks but no interrupt; input None continues it from its
+    last checkpoint.
+    """
+    snapshot = graph.get_state(config)
+    if not snapshot.values:
+        return False, {"messages": [HumanMessage(content=requirement)]}
+    if snapshot.interrupts:
+        return False, Command(resume=CONFIRM_REPLY)
+    if snapshot.next:
+        return False, None
+    return True, None
+
+
+def run_session(graph, record: Dict[str, str], thread_prefix: str = "batch") -> dict:
+    """Drive one requirement through every phase, auto-confirming, and return its result row."""
+    from graph_builder import thread_config
+
+    config = thread_config(f"{thread_prefix}-{record['id']}")
+    start = time.perf_counter()
+    turns = 0
+    try:
+        while turns < MAX_TURNS:
+            finished, graph_input = _next_input(graph, config, record["requirement"])
+            if finished:
+                break
+            graph.invoke(graph_input, config)
+            turns += 1
+        values = graph.get_state(config).values
+        status = "done" if values.get("phase") == "done" else "incomplete"
+        error = None
+    except Exception as e:
+        values, status, error = {}, "error", f"{type(e).__name__}: {e}"
+    return {
+        "id": record["id"],
+        "status": status,
+        "requirement": record["requirement"],
+        "solution": values.get("solution_output"),
+        "architecture": values.get("architecture_output"),
+        "analysis": values.get("analysis_output"),
+        "turns": turns,
+        "elapsed_s": round(time.perf_counter() - start, 3),
+        **({"error": error} if error else {}),
+    }
+
+
+def run_batch(records: Iterable[Dict[str, str]], out_path: str, concurrency: int = DEFAULT_CONCURRENCY,
+              graph=None, checkpoint_backend: Optional[str] = "sqlite", checkpoint_path: Optional[str] = None,
+              progress: bool = True) -> dict:
+    """
+    Run every record not already done in `out_path`, at most `concurrency` sessions at a time.
+    Returns throughput stats.
+    """
+    if graph is None:
+        from checkpointing import make_checkpointer
+        from graph_builder import build_graph
+        checkpoint_path = checkpoint_path or os.path.join(".cache", "batch_checkpoints.sqlite")
+        graph = build_graph(checkpointer=make_checkpointer(checkpoint_backend, checkpoint_path))
+
+    records = list(records)
+    done_before = completed_ids(out_path)
+    pending = [r for r in records if r["id"] not in done_before]
+    counts = {"done": 0, "incomplete": 0, "error": 0}
+    writer = ResultWriter(out_path)
+    start = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="batch") as pool:
+            futures = [pool.submit(run_session, graph, r) for r in pending]
+            for i, fut in enumerate(as_completed(futures), 1):
+                row = fut.result()
+                writer.write(row)
+                counts[row["status"]] += 1
+                if progress:
+                    elapsed = time.perf_counter() - start
+                    print(f"  [{i}/{len(pending)}] {row['id']}: {row['status']} in {row['elapsed_s']:.1f}s "
+                          f"({i / elapsed * 60:.1f} req/min)", file=sys.stderr)
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - start
+    return {
+        "skipped": len(records) - len(pending),
+        "ran": len(pending),
+        **counts,
+        "elapsed_s": elapsed,
+        "per_minute": len(pending) / elapsed * 60 if elapsed and pending else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    from tracing import configure_logging
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="JSONL of requirements")
+    parser.add_argument("--out", default="batch_results.jsonl", help="results JSONL (appended; re-run to resume)")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="sessions run at once")
+    parser.add_argument("--checkpointer", choices=["memory", "sqlite"], default="sqlite",
+                        help="sqlite (default) lets a crashed run resume mid-session")
+    parser.add_argument("--checkpoint-path", help="SQLite file (default .cache/batch_checkpoints.sqlite)")
+    args = parser.parse_args()
+    configure_logging()
+
+    stats = run_batch(load_requirements(args.input), args.out, args.concurrency,
+                      checkpoint_backend=args.checkpointer, checkpoint_path=args.checkpoint_path)
+    print(f"Skipped {stats['skipped']} already done; ran {stats['ran']}: {stats['done']} done, "
+          f"{stats['incomplete']} incomplete, {stats['error']} failed in {stats['elapsed_s']:.1f}s "
+          f"({stats['per_minute']:.1f} requirements/min).")
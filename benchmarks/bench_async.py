@@ -0,0 +1,109 @@
+# benchmarks/bench_async.py
+"""
+Load test of the async session service: how many concurrent sessions one
+process sustains while keeping turn latency under a p95 target.
+
+Every session sends a requirement and confirms all three phases (4 turns) through
+SessionService on a single event loop, with a fake LLM and fake tools (latency
+configurable, no network). Concurrency is stepped up until p95 exceeds the target.
+`--compare-sync` runs the same load through the blocking graph with one thread
+per session, the way a threaded sync server would have to.
+
+    python -m benchmarks.bench_async
+    python -m benchmarks.bench_async --levels 1,10,50,100,200 --p95-ms 3000 --compare-sync
+"""
+
+import argparse
+import asyncio
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.fakes import install_fakes
+
+SCRIPT = ["Design a multi-region order management platform with event sourcing", "yes", "yes", "yes"]
+
+
+def _pct(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))]
+
+
+async def _run_async(n_sessions: int):
+    from service import SessionService
+
+    service = await SessionService.create("memory")
+    latencies = []
+
+    async def session():
+        thread_id = uuid.uuid4().hex
+        for text in SCRIPT:
+            t0 = time.perf_counter()
+            await service.turn(thread_id, text)
+            latencies.append(time.perf_counter() - t0)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(session() for _ in range(n_sessions)))
+    return latencies, time.perf_counter() - start
+
+
+def _run_sync(n_sessions: int):
+    from checkpointing import make_checkpointer
+    from graph_builder import build_graph, thread_config, turn_input
+
+    graph = build_graph(checkpointer=make_checkpointer("memory"))
+    latencies = []
+
+    def session():
+        config = thread_config(uuid.uuid4().hex)
+        for text in SCRIPT:
+            t0 = time.perf_counter()
+            graph.invoke(turn_input(graph, config, text), config)
+            latencies.append(time.perf_counter() - t0)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=n_sessions) as pool:
+        for f in [pool.submit(session) for _ in range(n_sessions)]:
+            f.result()
+    return latencies, time.perf_counter() - start
+
+
+def _report(label: str, n: int, latencies, elapsed: float, target_ms: float) -> bool:
+    p50, p95 = _pct(latencies, 50) * 1000, _pct(latencies, 95) * 1000
+    ok = p95 <= target_ms
+    print(f"{label:<7}{n:>9}{p50:>10.0f}{p95:>10.0f}{len(latencies) / elapsed:>10.1f}{'  ok' if ok else '  over'}")
+    return ok
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--levels", default="1,10,25,50,100,200", help="concurrent sessions to try")
+    ap.add_argument("--p95-ms", type=float, default=2500.0, help="turn latency target")
+    ap.add_argument("--llm-ms", type=float, default=300.0, help="fake LLM latency")
+    ap.add_argument("--tool-ms", type=float, default=500.0, help="fake tool latency")
+    ap.add_argument("--compare-sync", action="store_true", help="also run the blocking graph, one thread per session")
+    args = ap.parse_args()
+
+    install_fakes(args.llm_ms / 1000, 0.0, 200, args.tool_ms / 1000)
+    levels = [int(x) for x in args.levels.split(",")]
+
+    print(f"{'mode':<7}{'sessions':>9}{'p50 ms':>10}{'p95 ms':>10}{'turns/s':>10}")
+    best = {}
+    for n in levels:
+        latencies, elapsed = asyncio.run(_run_async(n))
+        if _report("async", n, latencies, elapsed, args.p95_ms):
+            best["async"] = n
+    if args.compare_sync:
+        for n in levels:
+            latencies, elapsed = _run_sync(n)
+            if _report("sync", n, latencies, elapsed, args.p95_ms):
+                best["sync"] = n
+            else:
+                break
+    print()
+    for mode, n in best.items():
+        print(f"{mode}: up to {n} concurrent sessions per process at p95 <= {args.p95_ms:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
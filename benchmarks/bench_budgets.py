@@ -0,0 +1,132 @@
+# benchmarks/bench_budgets.py
+"""
+Analysis-turn latency with and without phase budgets, when research misbehaves.
+
+Sessions run request -> yes -> yes through the graph (fake LLM, fake tools) and
+the analysis turn is timed. Tools usually answer quickly but a share of calls
+hang for --spike-s. Two analysis modes:
+  agent      the tool-calling loop, with a fake model that keeps asking for more
+             tools (--loop-steps), i.e. one bad query looping through tools
+  parallel   planned fan-out (one call per tool), bounded by RESEARCH_DEADLINE_S
+Each runs with budgets off and on (--budget-s / --tool-calls / --tokens); the
+table shows p50/p95/p99/max turn latency, which budgets were hit, as recorded
+in the state's `budget_usage`, and how many analysis workers abandoned work past
+its budget still held when the run ended.
+
+    python -m benchmarks.bench_budgets
+    python -m benchmarks.bench_budgets --sessions 40 --budget-s 4 --spike-s 15 --loop-steps 40
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.tools import StructuredTool
+
+from benchmarks.fakes import install_fakes
+
+SCRIPT = ["Design a payments ledger with double-entry bookkeeping and audit trails ({n})", "yes", "yes"]
+
+
+def _drain(analysis_agent, timeout_s: float) -> None:
+    """Wait for work abandoned by the previous run, so it neither slows nor is counted in the next."""
+    deadline = time.perf_counter() + timeout_s
+    while analysis_agent._ABANDONED and time.perf_counter() < deadline:
+        time.sleep(0.05)
+
+
+def _pct(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))] if ordered else 0.0
+
+
+def _spiky_tools(latency_s: float, spike_rate: float, spike_s: float, seed: int = 0):
+    rng = random.Random(seed)
+
+    def make(name: str):
+        def delay() -> float:
+            return spike_s if rng.random() < spike_rate else latency_s
+
+        def run(query: str) -> str:
+            time.sleep(delay())
+            return f"{name} result for '{query}'. " * 20
+
+        async def arun(query: str) -> str:
+            await asyncio.sleep(delay())
+            return f"{name} result for '{query}'. " * 20
+
+        return StructuredTool.from_function(run, coroutine=arun, name=name, description=f"Search with {name}.")
+    return [make(n) for n in ("wikipedia_search", "tavily_search", "arxiv_search")]
+
+
+def _run(graph, sessions: int, concurrency: int):
+    from graph_builder import thread_config, turn_input
+
+    def session(n):
+        config = thread_config(uuid.uuid4().hex)
+        for text in SCRIPT:
+            t0 = time.perf_counter()
+            values = graph.invoke(turn_input(graph, config, text.format(n=n)), config)
+        return time.perf_counter() - t0, (values.get("budget_usage") or {}).get("hit")
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return list(pool.map(session, range(sessions)))
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sessions", type=int, default=24)
+    ap.add_argument("--concurrency", type=int, default=6)
+    ap.add_argument("--llm-ms", type=float, default=50.0)
+    ap.add_argument("--tool-ms", type=float, default=150.0)
+    ap.add_argument("--spike-rate", type=float, default=0.15, help="share of tool calls that hang")
+    ap.add_argument("--spike-s", type=float, default=8.0)
+    ap.add_argument("--loop-steps", type=int, default=30, help="tool calls the fake agent asks for")
+    ap.add_argument("--budget-s", type=float, default=3.0)
+    ap.add_argument("--reserve-s", type=float, default=0.5, help="time kept for the synthesis")
+    ap.add_argument("--tool-calls", type=int, default=8)
+    ap.add_argument("--tokens", type=int, default=0)
+    args = ap.parse_args()
+    logging.basicConfig(level=logging.ERROR)  # every budget hit logs a warning
+
+    os.environ["PHASE_BUDGET_RESERVE_S"] = str(args.reserve_s)
+    # Enough research workers for every session's fan-out: measure the budgets, not pool queueing.
+    os.environ.setdefault("RESEARCH_MAX_WORKERS", str(args.concurrency * 3 + 8))
+    fake = install_fakes(args.llm_ms / 1000, 0.0, 200, args.tool_ms / 1000)
+    fake.tool_loop_steps = args.loop_steps
+
+    from agents import analysis_agent
+    from checkpointing import make_checkpointer
+    from graph_builder import build_graph
+    from tools import tools as tool_module
+
+    tool_module.TOOLS[:] = _spiky_tools(args.tool_ms / 1000, args.spike_rate, args.spike_s)
+    graph = build_graph(checkpointer=make_checkpointer("memory"))
+    limits = {"S": args.budget_s, "TOOL_CALLS": args.tool_calls, "TOKENS": args.tokens}
+
+    print(f"{args.sessions} sessions, {args.concurrency} concurrent; tools {args.tool_ms:.0f} ms, "
+          f"{args.spike_rate:.0%} hang for {args.spike_s:.0f} s; budget {args.budget_s:.1f} s / "
+          f"{args.tool_calls or '-'} tool calls / {args.tokens or '-'} tokens\n")
+    print(f"{'mode':<10}{'budget':<8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}{'held':>6}  hits")
+    for mode in ("agent", "parallel"):
+        analysis_agent.ANALYSIS_MODE = mode
+        for budgeted in (False, True):
+            for suffix, value in limits.items():
+                os.environ[f"PHASE_BUDGET_ANALYSIS_{suffix}"] = str(value if budgeted else 0)
+            _drain(analysis_agent, args.spike_s + 1)
+            results = _run(graph, args.sessions, args.concurrency)
+            latencies = [r[0] * 1000 for r in results]
+            hits = Counter(r[1] for r in results if r[1])
+            held = len(analysis_agent._ABANDONED)
+            print(f"{mode:<10}{'on' if budgeted else 'off':<8}{_pct(latencies, 50):>9.0f}{_pct(latencies, 95):>9.0f}"
+                  f"{_pct(latencies, 99):>9.0f}{max(latencies):>9.0f}{held:>6}  {dict(hits) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
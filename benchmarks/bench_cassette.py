@@ -0,0 +1,112 @@
+# benchmarks/bench_cassette.py
+"""
+Record a few sessions' LLM and tool traffic to a cassette, then replay it.
+
+Sessions run request -> yes -> yes (solution, architecture and analysis turns)
+through stream_turn, with the fake LLM and fake (web page) tools behind the cassette layer
+(cassettes.py), as they would be behind CASSETTE_MODE=record|replay:
+  record            live (fake) calls, each recorded with its latency
+  replay original   served from the cassette after the recorded latencies
+  replay zero       served at once: what is left is orchestration and state handling
+  replay changed    zero latency with a changed tool-result cap, so the analysis
+                    prompts no longer match and are served from the same tier's
+                    next recording
+The table shows mean session time, solution time to first token, live LLM calls,
+cassette hits (exact / fuzzy / missing) and whether the outputs match the recording.
+
+    python -m benchmarks.bench_cassette
+    python -m benchmarks.bench_cassette --sessions 8 --llm-ms 300 --tool-ms 500
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import tempfile
+import time
+import uuid
+
+from benchmarks.fakes import install_fakes, make_fake_tools
+
+SCRIPT = ["Design an order-tracking service for a courier network ({n})", "yes", "yes"]
+OUTPUTS = ("solution_output", "architecture_output", "analysis_output")
+
+
+def _sessions(graph, sessions: int):
+    from graph_builder import thread_config, turn_input
+    from streaming import stream_turn
+
+    times, ttfts, outputs = [], [], []
+    for n in range(sessions):
+        config = thread_config(uuid.uuid4().hex)
+        t0 = time.perf_counter()
+        values = {}
+        for i, text in enumerate(SCRIPT):
+            t_turn, first = time.perf_counter(), None
+            for kind, payload in stream_turn(graph, turn_input(graph, config, text.format(n=n)), config):
+                if kind == "token" and first is None:
+                    first = time.perf_counter() - t_turn
+                elif kind == "state":
+                    values = payload
+            if i == 0 and first is not None:
+                ttfts.append(first)
+        times.append(time.perf_counter() - t0)
+        outputs.append(tuple(values.get(k) for k in OUTPUTS))
+    return statistics.mean(times), statistics.mean(ttfts) if ttfts else 0.0, outputs
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sessions", type=int, default=4)
+    ap.add_argument("--llm-ms", type=float, default=150.0, help="fake LLM first-token latency")
+    ap.add_argument("--token-ms", type=float, default=1.0, help="fake LLM per-token latency")
+    ap.add_argument("--tool-ms", type=float, default=300.0, help="fake tool latency")
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench-cassette-")
+    fake = install_fakes(args.llm_ms / 1000, args.token_ms / 1000, 200, args.tool_ms / 1000)
+
+    import cassettes
+    import llm_config
+    from checkpointing import make_checkpointer
+    from graph_builder import build_graph
+    from tools import compress
+    from tools import tools as tool_module
+
+    cassettes.PATH = os.path.join(tmp, "session.jsonl.gz")
+    cassettes.MODE = "record"
+    for tier in llm_config.TIERS:
+        llm_config._MODELS[tier] = cassettes.wrap_model(llm_config._MODELS[tier], tier)
+    llm_config.llm = llm_config._MODELS["generate"]
+    tool_module.TOOLS[:] = make_fake_tools(args.tool_ms / 1000, output_chars=4000, web=True)
+    graph = build_graph(checkpointer=make_checkpointer("memory"))
+
+    runs = [("record", "original", None), ("replay", "original", None), ("replay", "zero", None),
+            ("replay", "zero", max(50, compress.MAX_TOKENS // 2))]
+    print(f"{args.sessions} sessions x {len(SCRIPT)} turns; fake LLM {args.llm_ms:.0f} ms + "
+          f"{args.token_ms:g} ms/token, tools {args.tool_ms:.0f} ms\n")
+    print(f"{'run':<18}{'session ms':>11}{'ttft ms':>9}{'live llm':>10}{'exact':>7}{'fuzzy':>7}{'miss':>6}  same output")
+    recorded = None
+    for mode, latency, cap in runs:
+        cassettes.MODE, cassettes.LATENCY = mode, latency
+        if cap:
+            compress.MAX_TOKENS = cap
+        cassettes.rewind()
+        stats_before, calls_before = dict(cassettes.STATS), fake.stats
+        session_s, ttft_s, outputs = _sessions(graph, args.sessions)
+        cassettes.flush()
+        calls = fake.stats
+        live = calls["calls"] + calls["structured_calls"] - calls_before["calls"] - calls_before["structured_calls"]
+        hits = {k: cassettes.STATS[k] - stats_before[k] for k in ("exact", "fuzzy", "missing")}
+        recorded = recorded or outputs
+        label = f"{mode} {'changed' if cap else latency}" if mode == "replay" else mode
+        print(f"{label:<18}{session_s * 1000:>11.0f}{ttft_s * 1000:>9.0f}{live:>10}{hits['exact']:>7}"
+              f"{hits['fuzzy']:>7}{hits['missing']:>6}  {'yes' if outputs == recorded else 'no'}")
+
+    entries = cassettes.load(cassettes.PATH)
+    print(f"\ncassette: {len(entries)} entries, {os.path.getsize(cassettes.PATH) / 1024:.1f} KB gzip")
+    shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
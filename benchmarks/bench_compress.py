@@ -0,0 +1,100 @@
+# benchmarks/bench_compress.py
+"""
+Analysis-turn input tokens and latency with raw vs. compressed research tool results.
+
+The fake tools return noisy web pages (benchmarks.fakes.web_result): navigation and
+cookie lines, paragraphs of which only some mention the query, and a share of
+paragraphs that every tool returns. The fake LLM charges --prefill-ms per prompt
+token, so a longer scratchpad makes every step slower. Sessions run
+request -> yes -> yes and the analysis turn is measured in both analysis modes:
+  agent      the tool-calling loop, --loop-steps tool calls, each result appended
+             to the scratchpad the next step reads
+  parallel   planned fan-out, one synthesis over all the results
+with TOOL_COMPRESS off and on. The table shows the analysis-phase input tokens,
+mean latency per LLM step and per turn, and tokens per tool result before and
+after compression; the last line is the CPU cost of one compress() call.
+
+    python -m benchmarks.bench_compress
+    python -m benchmarks.bench_compress --tool-chars 12000 --loop-steps 10 --max-tokens 250
+"""
+
+import argparse
+import statistics
+import time
+import uuid
+
+from benchmarks.fakes import install_fakes, make_fake_tools, web_result
+
+SCRIPT = ["Design a payments ledger with double-entry bookkeeping and audit trails ({n})", "yes", "yes"]
+
+
+def _run(graph, fake, sessions: int):
+    from graph_builder import thread_config, turn_input
+    from tools import compress
+
+    turns, steps, tokens, raw, kept, calls = [], [], [], 0, 0, 0
+    for n in range(sessions):
+        config = thread_config(uuid.uuid4().hex)
+        for text in SCRIPT[:-1]:
+            graph.invoke(turn_input(graph, config, text.format(n=n)), config)
+        before, stats_before = fake.stats, dict(compress.STATS)
+        t0 = time.perf_counter()
+        graph.invoke(turn_input(graph, config, SCRIPT[-1]), config)
+        turns.append(time.perf_counter() - t0)
+        after = fake.stats
+        llm_calls = after["calls"] + after["structured_calls"] - before["calls"] - before["structured_calls"]
+        steps.append(turns[-1] / max(1, llm_calls))
+        tokens.append(after["input_tokens"] - before["input_tokens"])
+        raw += compress.STATS["raw_tokens"] - stats_before["raw_tokens"]
+        kept += compress.STATS["tokens"] - stats_before["tokens"]
+        calls += compress.STATS["calls"] - stats_before["calls"]
+    return (statistics.mean(tokens), statistics.mean(steps), statistics.mean(turns),
+            raw / calls if calls else 0, kept / calls if calls else 0)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sessions", type=int, default=4)
+    ap.add_argument("--llm-ms", type=float, default=50.0, help="fake LLM first-token latency")
+    ap.add_argument("--prefill-ms", type=float, default=0.05, help="fake LLM latency per prompt token")
+    ap.add_argument("--tool-chars", type=int, default=6000, help="characters per raw tool result")
+    ap.add_argument("--loop-steps", type=int, default=6, help="tool calls the fake agent makes")
+    ap.add_argument("--max-tokens", type=int, default=0, help="TOOL_OUTPUT_MAX_TOKENS (default: its env default)")
+    args = ap.parse_args()
+
+    fake = install_fakes(args.llm_ms / 1000)
+    fake.input_token_latency_s = args.prefill_ms / 1000
+    fake.tool_loop_steps = args.loop_steps
+
+    from agents import analysis_agent
+    from checkpointing import make_checkpointer
+    from graph_builder import build_graph
+    from tools import compress
+    from tools import tools as tool_module
+
+    if args.max_tokens:
+        compress.MAX_TOKENS = args.max_tokens
+    tool_module.TOOLS[:] = make_fake_tools(output_chars=args.tool_chars, web=True)
+    graph = build_graph(checkpointer=make_checkpointer("memory"))
+
+    print(f"{args.sessions} sessions; {args.tool_chars} chars per tool result, cap {compress.MAX_TOKENS} tokens; "
+          f"{args.llm_ms:.0f} ms + {args.prefill_ms:g} ms/prompt token per LLM call\n")
+    print(f"{'mode':<10}{'compress':<10}{'input tok':>11}{'ms/step':>9}{'turn ms':>9}{'tool tok raw':>14}{'tool tok':>10}")
+    for mode in ("agent", "parallel"):
+        analysis_agent.ANALYSIS_MODE = mode
+        for on in (False, True):
+            compress.TOOL_COMPRESS = on
+            tokens, step, turn, raw, kept = _run(graph, fake, args.sessions)
+            sizes = f"{raw:>14.0f}{kept:>10.0f}" if on else f"{'-':>14}{'-':>10}"
+            print(f"{mode:<10}{'on' if on else 'off':<10}{tokens:>11.0f}{step * 1000:>9.0f}{turn * 1000:>9.0f}{sizes}")
+
+    compress.TOOL_COMPRESS = True
+    samples = [web_result("tavily_search", f"ledger audit evidence {i}", args.tool_chars) for i in range(20)]
+    t0 = time.process_time()
+    for i, text in enumerate(samples):
+        compress.compress(f"ledger audit evidence {i}", text)
+    print(f"\ncompress(): {(time.process_time() - t0) / len(samples) * 1000:.2f} ms CPU per {args.tool_chars}-char result")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# benchmarks/bench_decompose.py
+"""
+Solution and architecture turn latency for requirements of growing size, designed
+in one call vs. decomposed into parallel sub-problem branches.
+
+A requirement lists N components ("... with: ingestion, serving, analytics, ...").
+The fake LLM writes --tokens-per-component tokens per component its prompt covers,
+at --token-ms per token, so a single-call answer grows with N while the answer
+for one part does not. Each session runs request -> yes (solution turn, then
+architecture turn) through the graph built with decompose off and on; the table
+shows the median latency of both turns and the LLM calls made.
+
+    python -m benchmarks.bench_decompose
+    python -m benchmarks.bench_decompose --components 1,2,4,8 --token-ms 2 --sessions 3
+"""
+
+import argparse
+import statistics
+import time
+import uuid
+
+from benchmarks.fakes import install_fakes
+
+COMPONENTS = ["ingestion", "stream processing", "serving api", "analytics warehouse", "billing",
+              "search", "notifications", "identity", "reporting", "ml features"]
+
+
+def _requirement(n: int, session: int) -> str:
+    return (f"Design a multi-tenant data platform for retail customers (variant {session}) "
+            f"with: {', '.join(COMPONENTS[:n])}.")
+
+
+def _run(graph, fake, n: int, sessions: int):
+    from graph_builder import thread_config, turn_input
+
+    solution, architecture, calls = [], [], []
+    for s in range(sessions):
+        config = thread_config(uuid.uuid4().hex)
+        before = fake.stats
+        for text, samples in ((_requirement(n, s), solution), ("yes", architecture)):
+            t0 = time.perf_counter()
+            graph.invoke(turn_input(graph, config, text), config)
+            samples.append(time.perf_counter() - t0)
+        after = fake.stats
+        calls.append(after["calls"] + after["structured_calls"] - before["calls"] - before["structured_calls"])
+    return statistics.median(solution), statistics.median(architecture), statistics.mean(calls)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--components", default="1,2,3,5,8", help="requirement sizes (components)")
+    ap.add_argument("--sessions", type=int, default=3)
+    ap.add_argument("--llm-ms", type=float, default=100.0, help="fake LLM first-token latency")
+    ap.add_argument("--token-ms", type=float, default=1.0, help="fake LLM per-token latency")
+    ap.add_argument("--tokens-per-component", type=int, default=300)
+    args = ap.parse_args()
+
+    fake = install_fakes(args.llm_ms / 1000, args.token_ms / 1000)
+    fake.tokens_per_component = args.tokens_per_component
+
+    from checkpointing import make_checkpointer
+    from graph_builder import build_graph
+
+    graphs = {mode: build_graph(checkpointer=make_checkpointer("memory"), decompose=mode == "decomposed")
+              for mode in ("single", "decomposed")}
+    print(f"median of {args.sessions} sessions; {args.tokens_per_component} tokens per component at "
+          f"{args.token_ms:g} ms/token, {args.llm_ms:.0f} ms first token\n")
+    print(f"{'components':>10}{'mode':>12}{'solution ms':>13}{'architecture ms':>17}{'llm calls':>11}")
+    for n in (int(x) for x in args.components.split(",")):
+        for mode, graph in graphs.items():
+            sol, arch, calls = _run(graph, fake, n, args.sessions)
+            print(f"{n:>10}{mode:>12}{sol * 1000:>13.0f}{arch * 1000:>17.0f}{calls:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+# benchmarks/bench_graph.py
+"""
+Offline benchmark of the whole graph: orchestration overhead without Azure/Tavily.
+
+Drives scripted conversations (new request -> yes -> no -> yes -> new, repeated, then end)
+through build_graph() with a fake LLM and fake tools, and reports per-node wall time,
+LLM calls per turn, checkpointed state size and memory growth across turns. Fails
+when a worker's context for one request carries turns of an earlier request.
+
+    python -m benchmarks.bench_graph                          # zero-latency fakes: pure overhead
+    python -m benchmarks.bench_graph --cycles 100 --llm-ms 50 --tool-ms 200
+"""
+
+import argparse
+import pickle
+import statistics
+import time
+import tracemalloc
+import uuid
+from collections import defaultdict
+from typing import Dict, List, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from benchmarks.fakes import install_fakes
+
+SCRIPT = ["{request}", "yes", "no", "yes", "new"]
+REQUESTS = [
+    "Design a real-time fraud detection platform for card payments with streaming ingestion",
+    "Build an internal developer portal with service catalog, docs search and scorecards",
+    "Create a multi-tenant analytics SaaS with usage-based billing and data isolation",
+]
+
+
+class NodeTimer(BaseCallbackHandler):
+    """Wall time of each top-level graph node run (nested chains are ignored)."""
+
+    def __init__(self):
+        self.root: Optional[UUID] = None
+        self.starts: Dict[UUID, tuple] = {}
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        if parent_run_id is None:
+            self.root = run_id
+        elif parent_run_id == self.root and metadata and "langgraph_node" in metadata:
+            self.starts[run_id] = (metadata["langgraph_node"], time.perf_counter())
+
+    def _finish(self, run_id):
+        started = self.starts.pop(run_id, None)
+        if started:
+            node, t0 = started
+            self.samples[node].append(time.perf_counter() - t0)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._finish(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id)
+
+
+class ContextIsolation:
+    """
+    Watches every context the workers build: none may carry turns from before the
+    current requirement, and a new requirement starts without a summary.
+    """
+
+    def __init__(self):
+        self.checked = 0
+        self.leaks: List[str] = []
+        self._requirement = None
+
+    def install(self):
+        from agents import context_builder
+
+        split = context_builder._split_history
+
+        def checked(state):
+            recent, pending = split(state)
+            self.check(state, recent + pending)
+            return recent, pending
+
+        context_builder._split_history = checked
+
+    def check(self, state, turns):
+        from langchain_core.messages import HumanMessage
+
+        self.checked += 1
+        requirement = state.get("requirement")
+        msgs = state.get("messages", [])
+        start = next((i for i in range(len(msgs) - 1, -1, -1)
+                      if isinstance(msgs[i], HumanMessage) and msgs[i].content == requirement), None)
+        earlier = {m.id for m in msgs[:start]} if start is not None else set()
+        stale = [m for m in turns if m.id in earlier]
+        if stale:
+            self.leaks.append(f"{len(stale)} earlier turns in a context for {requirement[:40]!r}")
+        if requirement != self._requirement:
+            self._requirement = requirement
+            if state.get("history_summary"):
+                self.leaks.append(f"earlier summary in the first context for {requirement[:40]!r}")
+
+
+def _pct(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))]
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--cycles", type=int, default=40, help="scripted request cycles (5 turns each)")
+    ap.add_argument("--llm-ms", type=float, default=0.0, help="fake LLM first-token latency")
+    ap.add_argument("--token-ms", type=float, default=0.0, help="fake LLM per-token latency")
+    ap.add_argument("--output-tokens", type=int, default=200)
+    ap.add_argument("--tool-ms", type=float, default=0.0, help="fake tool latency")
+    ap.add_argument("--no-tracemalloc", action="store_true", help="skip Python heap tracking (it slows the run)")
+    args = ap.parse_args()
+
+    fake = install_fakes(args.llm_ms / 1000, args.token_ms / 1000, args.output_tokens, args.tool_ms / 1000)
+
+    from graph_builder import build_graph, thread_config, turn_input
+
+    if not args.no_tracemalloc:
+        tracemalloc.start()
+    isolation = ContextIsolation()
+    isolation.install()
+    graph = build_graph()
+    config = thread_config(uuid.uuid4().hex)
+    timer = NodeTimer()
+    run_config = {**config, "callbacks": [timer]}
+
+    script = []
+    for i in range(args.cycles):
+        script += [t.format(request=REQUESTS[i % len(REQUESTS)]) for t in SCRIPT]
+    script.append("end")
+
+    turn_times, llm_calls, state_sizes, heap = [], [], [], []
+    for turn, text in enumerate(script):
+        before = fake.stats
+        t0 = time.perf_counter()
+        graph.invoke(turn_input(graph, config, text), run_config)
+        turn_times.append(time.perf_counter() - t0)
+        after = fake.stats
+        llm_calls.append(after["calls"] + after["structured_calls"] - before["calls"] - before["structured_calls"])
+        values = graph.get_state(config).values
+        state_sizes.append(len(pickle.dumps(values)))
+        if not args.no_tracemalloc:
+            heap.append(tracemalloc.get_traced_memory()[0])
+
+    n = len(script)
+    print(f"turns={n}  total={sum(turn_times):.2f}s  turn p50={_pct(turn_times, 50) * 1000:.1f} ms  "
+          f"p99={_pct(turn_times, 99) * 1000:.1f} ms")
+    print(f"llm calls: total={sum(llm_calls)}  per turn={sum(llm_calls) / n:.2f}  "
+          f"fake-model stats={fake.stats}")
+    print()
+    print(f"{'node':<18}{'runs':>6}{'mean ms':>10}{'p95 ms':>10}{'total s':>10}")
+    for node, samples in sorted(timer.samples.items(), key=lambda kv: -sum(kv[1])):
+        print(f"{node:<18}{len(samples):>6}{statistics.mean(samples) * 1000:>10.2f}"
+              f"{_pct(samples, 95) * 1000:>10.2f}{sum(samples):>10.2f}")
+    print()
+    q = max(1, n // 4)
+    print(f"state size (pickled): first={state_sizes[0]:,} B  25%={state_sizes[q]:,} B  last={state_sizes[-1]:,} B")
+    print(f"turn time, first quarter vs last quarter: "
+          f"{statistics.mean(turn_times[:q]) * 1000:.1f} ms -> {statistics.mean(turn_times[-q:]) * 1000:.1f} ms")
+    print(f"context isolation: {isolation.checked} contexts checked, {len(isolation.leaks)} leaks from earlier requests")
+    if heap:
+        print(f"python heap: after first cycle={heap[len(SCRIPT) - 1] / 1e6:.1f} MB  last={heap[-1] / 1e6:.1f} MB  "
+              f"growth/turn={(heap[-1] - heap[len(SCRIPT) - 1]) / max(1, n - len(SCRIPT)) / 1e3:.1f} KB")
+    if isolation.leaks:
+        raise SystemExit("context leak: " + "; ".join(isolation.leaks[:3]))
+
+
+if __name__ == "__main__":
+    main()
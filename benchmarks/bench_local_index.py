@@ -0,0 +1,156 @@
+# benchmarks/bench_local_index.py
+"""
+The local knowledge index: lookup cost, whether its recall threshold tells known
+topics from unknown ones, and what it saves on the analysis turn.
+
+lookup     a throwaway index filled with synthetic passages on common architecture
+           topics (Kafka, CQRS, vector databases...); p50/p95 lookup latency at
+           several sizes and the share of on-topic / off-topic queries answered
+           locally (off-topic ones should go to the network).
+analysis   sessions run request -> yes -> yes through the graph with a fake LLM and
+           fake tools of configurable latency; the analysis turn is timed with the
+           index off and on (the first session fills it, the rest are answered from
+           it), and once more offline, where every network fetch fails.
+
+    python -m benchmarks.bench_local_index
+    python -m benchmarks.bench_local_index --sizes 1000,20000 --sessions 6 --tool-ms 800
+"""
+
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+import uuid
+
+from benchmarks.fakes import install_fakes
+
+TOPICS = {
+    "kafka": "kafka topic partition consumer group offset broker replication log compaction exactly-once producer",
+    "cqrs": "cqrs command query responsibility segregation read model projection event sourcing write model",
+    "vector": "vector database embedding similarity search hnsw index ann recall cosine dimension",
+    "saga": "saga orchestration choreography compensating transaction distributed workflow step rollback",
+    "cache": "cache redis eviction ttl write-through cache-aside invalidation hot key stampede",
+    "gateway": "api gateway rate limiting authentication routing throttling quota edge tls termination",
+    "k8s": "kubernetes pod deployment autoscaling hpa node affinity ingress service mesh sidecar",
+    "lakehouse": "lakehouse parquet iceberg delta table schema evolution partition pruning compaction",
+}
+FILLER = "system design team platform latency throughput availability cost data service requirement".split()
+ON_TOPIC = [
+    "kafka consumer group offset",
+    "cqrs read model projection",
+    "vector database hnsw index",
+    "saga compensating transaction",
+    "redis cache eviction ttl",
+    "api gateway rate limiting",
+    "kubernetes autoscaling hpa",
+    "iceberg schema evolution",
+]
+OFF_TOPIC = [
+    "quantum annealing error correction",
+    "protein folding molecular dynamics",
+    "medieval manuscript illumination pigments",
+    "satellite orbit station keeping",
+]
+SCRIPT = ["Design an order platform with kafka events and cqrs read models ({n})", "yes", "yes"]
+
+
+def _pct(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))] if ordered else 0.0
+
+
+def _passage(rng, topic_words):
+    words = rng.choices(topic_words, k=40) + rng.choices(FILLER, k=60)
+    rng.shuffle(words)
+    return " ".join(words)
+
+
+def _bench_lookup(sizes, queries_per_size):
+    from tools.local_index import LocalIndex
+
+    rng = random.Random(0)
+    print(f"{'passages':>9}{'p50 ms':>9}{'p95 ms':>9}{'on-topic local %':>18}{'off-topic local %':>19}")
+    for size in sizes:
+        tmp = tempfile.mkdtemp(prefix="local-index-")
+        index = LocalIndex(os.path.join(tmp, "index.sqlite"))
+        names = list(TOPICS)
+        for i in range(size):
+            topic = names[i % len(names)]
+            index.add("bench", f"{topic} notes {i}", _passage(rng, TOPICS[topic].split()))
+        latencies, local = [], {"on": 0, "off": 0}
+        for i in range(queries_per_size):
+            kind, pool = ("on", ON_TOPIC) if i % 3 else ("off", OFF_TOPIC)
+            t0 = time.perf_counter()
+            answered = index.lookup(pool[i % len(pool)]) is not None
+            latencies.append(time.perf_counter() - t0)
+            local[kind] += answered
+        on_n = sum(1 for i in range(queries_per_size) if i % 3)
+        off_n = queries_per_size - on_n
+        print(f"{size:>9}{_pct(latencies, 50) * 1000:>9.2f}{_pct(latencies, 95) * 1000:>9.2f}"
+              f"{100 * local['on'] / on_n:>18.0f}{100 * local['off'] / off_n:>19.0f}")
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def _bench_analysis(sessions, tool_ms, llm_ms):
+    install_fakes(llm_ms / 1000, 0.0, 200, tool_ms / 1000)
+
+    import tracing
+    from checkpointing import make_checkpointer
+    from graph_builder import build_graph, thread_config, turn_input
+    from tools import local_index
+
+    sink = tracing.RingBufferSink(100000)
+    tracing.add_sink(sink)
+    graph = build_graph(checkpointer=make_checkpointer("memory"))
+    tmp = tempfile.mkdtemp(prefix="local-index-")
+
+    def run(label):
+        rows = []
+        for n in range(sessions):
+            config = thread_config(uuid.uuid4().hex)
+            sink.spans.clear()
+            for i, text in enumerate(SCRIPT):
+                t0 = time.perf_counter()
+                graph.invoke(turn_input(graph, config, text.format(n=n)), config)
+                elapsed = time.perf_counter() - t0
+            tools = [s for s in sink.snapshot() if s["kind"] == "tool"]
+            rows.append((elapsed, len(tools), sum(1 for s in tools if s.get("cache_hit") == "local")))
+        warm = rows[1:] or rows
+        print(f"{label:<10}{rows[0][0] * 1000:>12.0f}{_pct([r[0] for r in warm], 50) * 1000:>12.0f}"
+              f"{sum(r[1] for r in rows):>8}{sum(r[2] for r in rows):>8}")
+
+    print(f"\n{sessions} sessions; analysis turn with fake tools at {tool_ms:.0f} ms, fake LLM at {llm_ms:.0f} ms")
+    print(f"{'index':<10}{'first ms':>12}{'later p50':>12}{'tools':>8}{'local':>8}")
+    local_index.LOCAL_INDEX_ENABLED = False
+    run("off")
+    local_index.LOCAL_INDEX_ENABLED = True
+    local_index._INDEX = local_index.LocalIndex(os.path.join(tmp, "index.sqlite"))
+    run("on")
+
+    # Air-gapped: the network is gone, the index (filled above) still answers.
+    from tools import tools as tool_module
+    from benchmarks.fakes import make_fake_tools
+
+    local_index.LOCAL_INDEX_OFFLINE = True
+    tool_module.TOOLS[:] = make_fake_tools(latency_s=30.0)  # would stall the deadline if ever reached
+    run("offline")
+    shutil.rmtree(tmp, ignore_errors=True)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sizes", default="1000,10000", help="index sizes (passages) for the lookup benchmark")
+    ap.add_argument("--queries", type=int, default=300)
+    ap.add_argument("--sessions", type=int, default=4)
+    ap.add_argument("--tool-ms", type=float, default=600.0)
+    ap.add_argument("--llm-ms", type=float, default=50.0)
+    args = ap.parse_args()
+
+    _bench_lookup([int(s) for s in args.sizes.split(",")], args.queries)
+    _bench_analysis(args.sessions, args.tool_ms, args.llm_ms)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# benchmarks/bench_profile.py
+"""
+Cost of per-turn profiling (profiling.py), and what its report shows.
+
+Sessions run request -> yes -> yes through stream_turn with the fake LLM and fake
+web tools, first with profiling off, then on (sampler plus tracemalloc); the table
+shows the mean time of each turn up to its final state and the overhead; the
+report itself is written after that. The CPU-by-node table of
+the last profiled turn is printed after it; the full reports and folded stacks
+are left in --dir.
+
+    python -m benchmarks.bench_profile
+    python -m benchmarks.bench_profile --sessions 6 --interval-ms 2 --dir /tmp/profiles
+"""
+
+import argparse
+import statistics
+import tempfile
+import time
+import uuid
+
+from benchmarks.fakes import install_fakes, make_fake_tools
+
+SCRIPT = ["Design an order-tracking service for a courier network ({n})", "yes", "yes"]
+
+
+def _sessions(graph, sessions: int, profiling):
+    from graph_builder import thread_config, turn_input
+    from streaming import stream_turn
+
+    times, reports = [[] for _ in SCRIPT], []
+    last = {}
+    for n in range(sessions):
+        thread_id = uuid.uuid4().hex
+        config = thread_config(thread_id)
+        for i, text in enumerate(SCRIPT):
+            text = text.format(n=n)
+            t0 = time.perf_counter()
+            with profiling.profile_turn(thread_id, text) as profile:
+                for _ in stream_turn(graph, turn_input(graph, config, text), config):
+                    pass
+                t_done = time.perf_counter()
+            times[i].append(t_done - t0)
+            reports.append(time.perf_counter() - t_done)
+            last = profile or last
+    return [statistics.mean(t) for t in times], statistics.mean(reports), last
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sessions", type=int, default=4)
+    ap.add_argument("--llm-ms", type=float, default=100.0, help="fake LLM first-token latency")
+    ap.add_argument("--token-ms", type=float, default=1.0, help="fake LLM per-token latency")
+    ap.add_argument("--tool-ms", type=float, default=200.0, help="fake tool latency")
+    ap.add_argument("--interval-ms", type=float, default=None, help="sampling interval (default: $PROFILE_INTERVAL_MS)")
+    ap.add_argument("--dir", default=None, help="where reports go (default: a temporary directory)")
+    args = ap.parse_args()
+
+    install_fakes(args.llm_ms / 1000, args.token_ms / 1000, 200, args.tool_ms / 1000)
+
+    import profiling
+    from checkpointing import make_checkpointer
+    from graph_builder import build_graph
+    from tools import tools as tool_module
+
+    profiling.PROFILE_DIR = args.dir or tempfile.mkdtemp(prefix="bench-profile-")
+    if args.interval_ms:
+        profiling.INTERVAL_S = args.interval_ms / 1000
+    tool_module.TOOLS[:] = make_fake_tools(args.tool_ms / 1000, output_chars=4000, web=True)
+    graph = build_graph(checkpointer=make_checkpointer("memory"))
+
+    print(f"{args.sessions} sessions; fake LLM {args.llm_ms:.0f} ms + {args.token_ms:g} ms/token, "
+          f"tools {args.tool_ms:.0f} ms; sampling every {profiling.INTERVAL_S * 1000:g} ms\n")
+    print(f"{'turn':<14}{'off ms':>9}{'on ms':>9}{'overhead':>10}")
+    profiling.PROFILE_TURNS = False
+    off, _, _ = _sessions(graph, args.sessions, profiling)
+    profiling.PROFILE_TURNS = True
+    on, report_s, last = _sessions(graph, args.sessions, profiling)
+    for label, a, b in zip(("solution", "architecture", "analysis"), off, on):
+        print(f"{label:<14}{a * 1000:>9.0f}{b * 1000:>9.0f}{(b - a) / a:>10.1%}")
+    print(f"\nwriting each report (heap snapshot and diff) took {report_s * 1000:.0f} ms after the turn's last token")
+
+    if last:
+        with open(last["path"], encoding="utf-8") as f:
+            report = f.read().split("\n## Top functions")[0]
+        print(f"\n{report.rstrip()}\n\nreports in {profiling.PROFILE_DIR}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# benchmarks/bench_rerun.py
+"""
+Streamlit rerun time against transcript length.
+
+A session with N messages (short user turns, multi-KB Markdown answers) is
+written to a throwaway SQLite checkpoint; app.py is then run headless with
+Streamlit's AppTest on that thread and re-run several times, which is what every
+widget interaction or streamed turn triggers. `full` renders every message (the
+previous behaviour, CHAT_RECENT_TURNS=0), `windowed` the default recent-turn
+window with older turns collapsed. Reports the median rerun time and how many
+Markdown elements a rerun sends.
+
+    python -m benchmarks.bench_rerun
+    python -m benchmarks.bench_rerun --lengths 20,100,400 --answer-kb 6 --reruns 7
+"""
+
+import argparse
+import logging
+import os
+import statistics
+import tempfile
+import time
+import uuid
+
+SECTION = (
+    "## {title}\n"
+    "- **Ingestion**: events land on a partitioned log; consumers are idempotent and keyed by order id.\n"
+    "- **Storage**: write model in Postgres, read models projected into a search index and a cache.\n"
+    "- **Scaling**: stateless services behind the gateway scale on queue lag; the log scales by partitions.\n"
+    "| Component | Choice | Why |\n|---|---|---|\n| Broker | Kafka | replay, ordering per key |\n"
+    "| Cache | Redis | hot read paths |\n\n"
+)
+
+
+def _messages(n: int, answer_kb: float):
+    from langchain_core.messages import AIMessage, HumanMessage
+
+    body = ""
+    i = 0
+    while len(body) < answer_kb * 1024:
+        body += SECTION.format(title=f"Section {i + 1}")
+        i += 1
+    msgs = []
+    for k in range(n):
+        if k % 2 == 0:
+            msgs.append(HumanMessage(content=f"Refine step {k // 2}: add multi-region failover", id=uuid.uuid4().hex))
+        else:
+            msgs.append(AIMessage(content=f"# Answer {k // 2}\n\n{body}", id=uuid.uuid4().hex))
+    return msgs
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--lengths", default="10,50,100,200,400", help="transcript lengths (messages)")
+    ap.add_argument("--answer-kb", type=float, default=4.0, help="size of each assistant answer")
+    ap.add_argument("--reruns", type=int, default=5)
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench-rerun-")
+    os.environ["CHECKPOINT_BACKEND"] = "sqlite"
+    os.environ["CHECKPOINT_PATH"] = os.path.join(tmp, "checkpoints.sqlite")
+    os.environ["STARTUP_PREWARM"] = "0"
+    os.environ.setdefault("AZURE_API_KEY", "offline")
+    os.environ.setdefault("AZURE_ENDPOINT", "https://offline.openai.azure.com")
+
+    from streamlit.testing.v1 import AppTest
+    # AppTest touches st.* from the main thread, which warns about a missing script context
+    # (a filter, because Streamlit resets its loggers' levels on every run).
+    logging.getLogger("streamlit.runtime.scriptrunner_utils.script_run_context").addFilter(lambda record: False)
+
+    import chat_view
+    from checkpointing import make_checkpointer
+    from graph_builder import build_graph, thread_config
+
+    graph = build_graph(checkpointer=make_checkpointer())
+    app_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+    default_turns = chat_view.RECENT_TURNS
+
+    print(f"median of {args.reruns} reruns; assistant answers ~{args.answer_kb:.0f} KB\n")
+    print(f"{'messages':>9}{'full ms':>10}{'elements':>10}{'windowed ms':>13}{'elements':>10}")
+    for n in (int(x) for x in args.lengths.split(",")):
+        thread_id = uuid.uuid4().hex
+        graph.update_state(thread_config(thread_id), {"messages": _messages(n, args.answer_kb), "phase": "done"})
+        row = []
+        for turns in (0, default_turns):
+            chat_view.RECENT_TURNS = turns
+            at = AppTest.from_file(app_path, default_timeout=120)
+            at.query_params["thread"] = thread_id
+            at.run()
+            samples = []
+            for _ in range(args.reruns):
+                t0 = time.perf_counter()
+                at.run()
+                samples.append(time.perf_counter() - t0)
+            if at.exception:
+                raise RuntimeError(at.exception[0].message)
+            row += [statistics.median(samples) * 1000, len(at.markdown)]
+        print(f"{n:>9}{row[0]:>10.1f}{row[1]:>10}{row[2]:>13.1f}{row[3]:>10}")
+    chat_view.RECENT_TURNS = default_turns
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+# benchmarks/bench_resilience.py
+"""
+The LLM client layer under 429s and latency spikes, against the local stub server.
+
+Two stub deployments share the load: "east" has a requests-per-minute quota plus
+random 429s, "west" the same quota plus latency spikes. A burst of concurrent
+calls is sent through:
+  plain       the previous client: one AzureChatOpenAI on "east", SDK default retries
+  resilient   ResilientChatModel on "east" only (rate limiter + backoff)
+  balanced    ResilientChatModel over "east" and "west" (plus failover on spikes)
+and success rate, p50/p95 call latency, wall time and 429s seen by the server are
+reported. No network or credentials needed.
+
+    python -m benchmarks.bench_resilience
+    python -m benchmarks.bench_resilience --calls 300 --concurrency 32 --quota-rpm 600 --client-rpm 900
+"""
+
+import argparse
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.stub_openai import StubBehavior, start_stub
+
+API_VERSION = "2024-08-01-preview"
+
+
+def _pct(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))] if ordered else 0.0
+
+
+def _run(model, calls: int, concurrency: int):
+    latencies, failures = [], 0
+
+    def call(i):
+        t0 = time.perf_counter()
+        try:
+            model.invoke(f"request {i}: outline an event-driven order pipeline")
+            return time.perf_counter() - t0
+        except Exception:
+            return None
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for result in pool.map(call, range(calls)):
+            if result is None:
+                failures += 1
+            else:
+                latencies.append(result)
+    return latencies, failures, time.perf_counter() - start
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--calls", type=int, default=200)
+    ap.add_argument("--concurrency", type=int, default=24)
+    ap.add_argument("--quota-rpm", type=float, default=600, help="server-side quota per deployment")
+    ap.add_argument("--client-rpm", type=float, help="client RPM limit per deployment (default: the quota)")
+    ap.add_argument("--rate-429", type=float, default=0.05, help="random 429s on east")
+    ap.add_argument("--spike-rate", type=float, default=0.1, help="share of slow calls on west")
+    ap.add_argument("--latency-ms", type=float, default=80)
+    ap.add_argument("--timeout-s", type=float, default=1.0, help="per-attempt timeout of the resilient client")
+    ap.add_argument("--window-s", type=float, default=10.0, help="stub quota window")
+    args = ap.parse_args()
+    logging.basicConfig(level=logging.ERROR)
+
+    from langchain_openai import AzureChatOpenAI
+    from llm_client import build_chat_model
+
+    latency = args.latency_ms / 1000
+
+    def fresh_stub():
+        return start_stub({
+            "east": StubBehavior(latency_s=latency, rpm=args.quota_rpm, window_s=args.window_s,
+                                 rate_429=args.rate_429, retry_after_s=0.5),
+            "west": StubBehavior(latency_s=latency, rpm=args.quota_rpm, window_s=args.window_s,
+                                 spike_rate=args.spike_rate, spike_s=3.0),
+        })
+
+    def specs(stub, names):
+        return [{"name": n, "deployment": n, "endpoint": stub.endpoint, "api_key": "stub", "api_version": API_VERSION,
+                 "rpm": args.client_rpm or args.quota_rpm, "tpm": 0} for n in names]
+
+    modes = {
+        "plain": lambda stub: AzureChatOpenAI(azure_deployment="east", azure_endpoint=stub.endpoint, api_key="stub",
+                                              openai_api_version=API_VERSION, temperature=0.2),
+        "resilient": lambda stub: build_chat_model(specs(stub, ["east"]), timeout=args.timeout_s),
+        "balanced": lambda stub: build_chat_model(specs(stub, ["east", "west"]), timeout=args.timeout_s),
+    }
+
+    print(f"{args.calls} calls, {args.concurrency} concurrent; quota {args.quota_rpm:.0f} rpm per deployment\n")
+    print(f"{'client':<11}{'ok %':>7}{'p50 ms':>9}{'p95 ms':>9}{'wall s':>8}{'429s':>6}{'5xx':>5}")
+    for label, make in modes.items():
+        stub = fresh_stub()
+        model = make(stub)
+        latencies, failures, wall = _run(model, args.calls, args.concurrency)
+        stub.shutdown()
+        throttled = sum(n for (name, status), n in stub.counts.items() if status == 429)
+        errors = sum(n for (name, status), n in stub.counts.items() if isinstance(status, int) and status >= 500)
+        ok = 100.0 * len(latencies) / args.calls
+        print(f"{label:<11}{ok:>7.1f}{_pct(latencies, 50) * 1000:>9.0f}{_pct(latencies, 95) * 1000:>9.0f}"
+              f"{wall:>8.1f}{throttled:>6}{errors:>5}")
+        if hasattr(model, "stats"):
+            for name, s in model.stats().items():
+                print(f"    {name:<8} ok={s['ok']} throttled={s['throttled']} retried={s['retried']} "
+                      f"ewma={s['latency_ms']:.0f}ms rpm_scale={s['rpm_scale']}")
+
+
+if __name__ == "__main__":
+    main()
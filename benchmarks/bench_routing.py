@@ -0,0 +1,89 @@
+# benchmarks/bench_routing.py
+"""
+Confirmation-routing latency: LLM-only (before) vs. local rules + cache + LLM fallback (after).
+
+    python -m benchmarks.bench_routing                # stub LLM with simulated latency
+    python -m benchmarks.bench_routing --llm-ms 1500  # match the latency seen in production logs
+    python -m benchmarks.bench_routing --live         # real Azure classifier (needs .env)
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+from agents import router
+
+# A realistic mix of confirmation replies: mostly control tokens and stock phrases,
+# some repeated free-form replies, a few genuinely ambiguous ones.
+REPLIES = (
+    ["yes"] * 30 + ["no"] * 8 + ["new"] * 4 + ["end"] * 4
+    + ["Yes!", "ok", "go ahead", "Go ahead please", "proceed", "looks good", "redo", "try again",
+       "stop", "start over", "thanks, that's all", "sure"] * 2
+    + ["can you make it cheaper?", "I think we're good here", "hmm not sure",
+       "let's move to the next step", "can you make it cheaper?", "I think we're good here"]
+)
+
+
+def _stub_llm(latency_s: float):
+    def classify(message: str) -> str:
+        time.sleep(latency_s * random.uniform(0.8, 1.3))
+        return router.PROCEED if "good" in message or "next" in message else router.CLARIFY
+    return classify
+
+
+def _live_llm():
+    from agents.supervisor_agent import _llm_route
+    return _llm_route
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[idx]
+
+
+def _report(label, samples, llm_calls):
+    ms = [s * 1000 for s in samples]
+    print(f"{label:<8} n={len(ms):<4} p50={_percentile(ms, 50):8.2f} ms  p99={_percentile(ms, 99):8.2f} ms  "
+          f"mean={statistics.mean(ms):8.2f} ms  llm_calls={llm_calls}/{len(ms)} ({llm_calls / len(ms):.0%})")
+
+
+def run(llm_fallback, replies):
+    # Before: every reply goes to the classifier.
+    before = []
+    for text in replies:
+        t0 = time.perf_counter()
+        llm_fallback(router.normalize_reply(text))
+        before.append(time.perf_counter() - t0)
+    _report("before", before, len(replies))
+
+    # After: rules, then cache, then LLM.
+    router.ROUTE_CACHE.clear()
+    for k in router.ROUTER_STATS:
+        router.ROUTER_STATS[k] = 0
+    after = []
+    for text in replies:
+        t0 = time.perf_counter()
+        router.classify_reply(text, llm_fallback)
+        after.append(time.perf_counter() - t0)
+    _report("after", after, router.ROUTER_STATS["llm"])
+    print(f"         sources: {router.ROUTER_STATS}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--llm-ms", type=float, default=300.0, help="simulated LLM classification latency (stub mode)")
+    ap.add_argument("--live", action="store_true", help="use the real Azure-backed classifier")
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+
+    random.seed(args.seed)
+    replies = list(REPLIES)
+    random.shuffle(replies)
+    llm_fallback = _live_llm() if args.live else _stub_llm(args.llm_ms / 1000)
+    run(llm_fallback, replies)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# benchmarks/bench_setup.py
+"""
+Per-call setup overhead of tool clients, the analysis executor and the routing chain:
+rebuilt on every call (before) vs. built once and reused (after).
+
+    python -m benchmarks.bench_setup            # offline: construction cost only
+    python -m benchmarks.bench_setup --live     # also count TLS handshakes for one analysis turn (needs .env)
+"""
+
+import argparse
+import os
+import ssl
+import statistics
+import time
+
+# Constructing the Azure client needs credentials but never contacts the network.
+os.environ.setdefault("AZURE_API_KEY", "offline")
+os.environ.setdefault("AZURE_ENDPOINT", "https://offline.openai.azure.com")
+os.environ.setdefault("TAVILY_API_KEY", "offline")
+
+
+def _time(fn, n):
+    samples = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples)
+
+
+def setup_overhead(n):
+    from langchain.agents import AgentExecutor, create_tool_calling_agent
+    from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+    from langchain_tavily import TavilySearch
+    import arxiv
+    from llm_config import llm, TAVILY_API_KEY
+    from tools import tools as tt
+    from tools.tools import get_tools
+    from agents import analysis_agent, supervisor_agent
+
+    tools = get_tools()
+
+    def build_executor():
+        prompt = ChatPromptTemplate.from_messages([
+            ("system", "x"), ("system", "Context:\n{context_text}"), ("human", "{input}"),
+            MessagesPlaceholder("agent_scratchpad"),
+        ])
+        AgentExecutor(agent=create_tool_calling_agent(llm, tools, prompt), tools=tools)
+
+    def build_chain():
+        supervisor_agent.ROUTE_PROMPT | llm.with_structured_output(supervisor_agent.RouteDecision)
+
+    cases = [
+        ("tavily client", lambda: TavilySearch(max_results=3, tavily_api_key=TAVILY_API_KEY), tt._tavily),
+        ("arxiv client", lambda: arxiv.Client(), tt._arxiv),
+        ("analysis executor", build_executor, lambda: analysis_agent._get_executor(tools)),
+        ("routing chain", build_chain, supervisor_agent._get_decision_chain),
+    ]
+    print(f"{'component':<20}{'before (ms)':>14}{'after (ms)':>14}")
+    for name, before, after in cases:
+        after()  # warm the singleton
+        print(f"{name:<20}{_time(before, n):>14.3f}{_time(after, n):>14.4f}")
+
+
+def tls_handshakes_per_turn():
+    """Run one research fan-out twice and count TLS handshakes each time (cache disabled)."""
+    os.environ["TOOL_CACHE"] = "0"
+    from tools import cache
+    cache.TOOL_CACHE_ENABLED = False
+    from agents import analysis_agent
+
+    counter = {"n": 0}
+    original = ssl.SSLContext.wrap_socket
+
+    def counting_wrap(self, *args, **kwargs):
+        counter["n"] += 1
+        return original(self, *args, **kwargs)
+
+    ssl.SSLContext.wrap_socket = counting_wrap
+    try:
+        for turn in (1, 2):
+            counter["n"] = 0
+            t0 = time.perf_counter()
+            analysis_agent._run_parallel_research("Event-driven order processing with Kafka and CQRS", "")
+            print(f"analysis turn {turn}: {counter['n']} TLS handshakes, {time.perf_counter() - t0:.1f}s")
+    finally:
+        ssl.SSLContext.wrap_socket = original
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("-n", type=int, default=50, help="samples per component")
+    ap.add_argument("--live", action="store_true")
+    args = ap.parse_args()
+    setup_overhead(args.n)
+    if args.live:
+        tls_handshakes_per_turn()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# benchmarks/bench_speculation.py
+"""
+Perceived latency of confirmation turns with and without speculative next phases.
+
+Simulated users read each answer for `--think-ms` before replying; each reply is
+"yes" (proceed) with probability `--p-yes`, otherwise "no" (revise, which cancels
+the speculation), then "yes". Reports p50/p95 latency of the turns that start the
+architect/analysis phases, plus hit rate and wasted tokens from the speculator.
+
+    python -m benchmarks.bench_speculation
+    python -m benchmarks.bench_speculation --sessions 20 --p-yes 0.6 --llm-ms 400 --think-ms 1500
+"""
+
+import argparse
+import random
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.fakes import install_fakes
+
+REQUEST = "Design a usage-based billing service for a multi-tenant SaaS platform"
+
+
+def _pct(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))]
+
+
+def _run(graph, sessions: int, p_yes: float, think_s: float, seed: int):
+    from graph_builder import thread_config, turn_input
+
+    rng = random.Random(seed)
+    replies = [["yes" if rng.random() < p_yes else "no" for _ in range(2)] for _ in range(sessions)]
+    latencies = []
+
+    def session(plan):
+        config = thread_config(uuid.uuid4().hex)
+        graph.invoke(turn_input(graph, config, REQUEST), config)
+        for reply in plan:
+            texts = ["yes"] if reply == "yes" else ["no", "yes"]
+            for text in texts:
+                time.sleep(think_s)
+                t0 = time.perf_counter()
+                graph.invoke(turn_input(graph, config, text), config)
+                if text == "yes":
+                    latencies.append(time.perf_counter() - t0)
+
+    with ThreadPoolExecutor(max_workers=sessions) as pool:
+        for f in [pool.submit(session, plan) for plan in replies]:
+            f.result()
+    return latencies
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sessions", type=int, default=10)
+    ap.add_argument("--p-yes", type=float, default=0.7, help="probability a confirmation is accepted first time")
+    ap.add_argument("--think-ms", type=float, default=1000.0, help="user reading time before each reply")
+    ap.add_argument("--llm-ms", type=float, default=300.0)
+    ap.add_argument("--token-ms", type=float, default=2.0)
+    ap.add_argument("--tool-ms", type=float, default=400.0)
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+
+    install_fakes(args.llm_ms / 1000, args.token_ms / 1000, 200, args.tool_ms / 1000)
+
+    from checkpointing import make_checkpointer
+    from graph_builder import build_graph
+    from speculation import SPECULATOR
+
+    graph = build_graph(checkpointer=make_checkpointer("memory"))
+    print(f"{'speculation':<13}{'turns':>7}{'p50 ms':>10}{'p95 ms':>10}")
+    for enabled in (False, True):
+        SPECULATOR.enabled = enabled
+        latencies = _run(graph, args.sessions, args.p_yes, args.think_ms / 1000, args.seed)
+        print(f"{'on' if enabled else 'off':<13}{len(latencies):>7}{_pct(latencies, 50) * 1000:>10.0f}"
+              f"{_pct(latencies, 95) * 1000:>10.0f}")
+    stats = SPECULATOR.summary()
+    print(f"\nhit rate={stats['hit_rate']:.0%}  started={stats['started']}  hits={stats['hits']}  "
+          f"not started={stats['not_started']}  discarded={stats['discarded']}  expired={stats['expired']}  "
+          f"stale={stats['stale']}  budget skips={stats['skipped_budget']}")
+    print(f"tokens: used={stats['used_tokens']}  wasted={stats['wasted_tokens']}  "
+          f"work done ahead of the user: {stats['saved_s']:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# benchmarks/bench_startup.py
+"""
+Cold-start cost of the CLI / app: import time and time-to-first-prompt.
+
+Each run is a fresh interpreter that imports graph_builder, compiles the graph and
+reads the (empty) session, i.e. everything main.py does before showing its prompt.
+`lazy` is the current behaviour (model clients, tokenizer and integrations are
+built on first use or by the background prewarm); `eager` loads them all before
+the prompt, as every start used to. Also reports what prewarm costs off the prompt
+path and what a second graph compile (a new Streamlit session without the shared
+resource) would cost.
+
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --runs 10 --top 15     # also list the slowest imports
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+_CHILD = r"""
+import json, sys, time
+t0 = time.perf_counter()
+import graph_builder
+t_import = time.perf_counter()
+if sys.argv[1] == "eager":
+    graph_builder.prewarm(background=False)
+t_eager = time.perf_counter()
+graph = graph_builder.build_graph()
+t_build = time.perf_counter()
+graph_builder.session_values(graph, graph_builder.thread_config("startup-bench"))
+t_prompt = time.perf_counter()
+print("READY", flush=True)
+graph_builder.prewarm(background=False)
+t_warm = time.perf_counter()
+graph_builder.build_graph()
+t_rebuild = time.perf_counter()
+print(json.dumps({"import_s": t_import - t0, "eager_s": t_eager - t_import, "build_s": t_build - t_eager,
+                  "prompt_s": t_prompt - t0, "prewarm_s": t_warm - t_prompt, "rebuild_s": t_rebuild - t_warm}))
+"""
+
+
+def _run(mode: str) -> dict:
+    env = {**os.environ, "PYTHONWARNINGS": "ignore"}
+    for key, value in (("AZURE_API_KEY", "offline"), ("AZURE_ENDPOINT", "https://offline.openai.azure.com"),
+                       ("TAVILY_API_KEY", "offline")):
+        env.setdefault(key, value)
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-c", _CHILD, mode], stdout=subprocess.PIPE,
+                            stderr=subprocess.DEVNULL, text=True, env=env)
+    first_prompt = None
+    result = {}
+    for line in proc.stdout:
+        if line.startswith("READY"):
+            first_prompt = time.perf_counter() - start
+        elif line.startswith("{"):
+            result = json.loads(line)
+    proc.wait()
+    return {**result, "process_prompt_s": first_prompt}
+
+
+def _top_imports(n: int):
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", "import graph_builder"],
+                         capture_output=True, text=True, env={**os.environ, "PYTHONWARNINGS": "ignore"}).stderr
+    rows = []
+    for line in out.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            rows.append((int(parts[1]), parts[2].rstrip()))
+    print(f"\nslowest imports (cumulative ms) under `import graph_builder`:")
+    for us, name in sorted(rows, reverse=True)[:n]:
+        print(f"  {us / 1000:>8.1f}  {name}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--top", type=int, default=0, help="also list the N slowest imports")
+    args = ap.parse_args()
+
+    cols = ("import_s", "eager_s", "build_s", "prompt_s", "process_prompt_s", "prewarm_s", "rebuild_s")
+    print(f"median of {args.runs} cold starts, ms")
+    print(f"{'mode':<7}{'import':>9}{'eager':>9}{'compile':>9}{'prompt':>9}{'proc->prompt':>14}"
+          f"{'prewarm':>9}{'recompile':>11}")
+    for mode in ("eager", "lazy"):
+        samples = [_run(mode) for _ in range(args.runs)]
+        med = {c: statistics.median(s[c] for s in samples) * 1000 for c in cols}
+        print(f"{mode:<7}{med['import_s']:>9.0f}{med['eager_s']:>9.0f}{med['build_s']:>9.0f}{med['prompt_s']:>9.0f}"
+              f"{med['process_prompt_s']:>14.0f}{med['prewarm_s']:>9.0f}{med['rebuild_s']:>11.0f}")
+    if args.top:
+        _top_imports(args.top)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# benchmarks/bench_tiers.py
+"""
+Per-tier LLM call counts, latency and cost, with every tier on the main model vs.
+the router / rewrite / research tiers on a small, faster deployment.
+
+Sessions send a requirement, an ambiguous confirmation the rules can't resolve
+(so the router tier classifies it), then "yes" through analysis: every tier is
+exercised. Fake LLM and tools; the small model's latency and both price lists
+are flags. Reports turn latency per mode and a per-tier table from the LLM spans.
+
+    python -m benchmarks.bench_tiers
+    python -m benchmarks.bench_tiers --sessions 16 --llm-ms 900 --small-ms 200
+"""
+
+import argparse
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.fakes import install_fakes
+
+REQUEST = "Design an order management platform with inventory reservation and payment sagas"
+SCRIPT = ["{request}", "fine, take it to the next step ({n})", "yes"]
+
+
+def _pct(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))] if ordered else 0.0
+
+
+def _run(graph, sessions: int):
+    from graph_builder import thread_config, turn_input
+
+    turns = []
+
+    def session(n):
+        config = thread_config(uuid.uuid4().hex)
+        for text in SCRIPT:
+            t0 = time.perf_counter()
+            graph.invoke(turn_input(graph, config, text.format(request=REQUEST, n=n)), config)
+            turns.append(time.perf_counter() - t0)
+
+    with ThreadPoolExecutor(max_workers=sessions) as pool:
+        for f in [pool.submit(session, n) for n in range(sessions)]:
+            f.result()
+    return turns
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sessions", type=int, default=8)
+    ap.add_argument("--llm-ms", type=float, default=800.0, help="main model latency")
+    ap.add_argument("--small-ms", type=float, default=200.0, help="small model latency")
+    ap.add_argument("--tool-ms", type=float, default=300.0)
+    ap.add_argument("--price-main", default="2.50,10.00", help="USD per 1M input,output tokens")
+    ap.add_argument("--price-small", default="0.15,0.60", help="USD per 1M input,output tokens")
+    args = ap.parse_args()
+
+    prices = {"main": [float(x) for x in args.price_main.split(",")],
+              "small": [float(x) for x in args.price_small.split(",")]}
+    fake = install_fakes(args.llm_ms / 1000, 0.0, 200, args.tool_ms / 1000)
+
+    import llm_config
+    import tracing
+    from agents.router import ROUTE_CACHE
+    from checkpointing import make_checkpointer
+    from graph_builder import build_graph
+
+    sink = tracing.RingBufferSink(100000)
+    tracing.add_sink(sink)
+    graph = build_graph(checkpointer=make_checkpointer("memory"))
+
+    print(f"{args.sessions} sessions x {len(SCRIPT)} turns; main model {args.llm_ms:.0f} ms, "
+          f"small model {args.small_ms:.0f} ms\n")
+    results = {}
+    for mode, small_ms in (("single", args.llm_ms), ("tiered", args.small_ms)):
+        for tier, model in llm_config._MODELS.items():
+            if model is not fake:
+                model.first_token_latency_s = small_ms / 1000
+        sink.spans.clear()
+        ROUTE_CACHE.clear()  # the ambiguous replies must reach the router tier in both modes
+        turns = _run(graph, args.sessions)
+        per_tier = defaultdict(lambda: {"ms": [], "in": 0, "out": 0})
+        for span in sink.snapshot():
+            if span["kind"] == "llm":
+                row = per_tier[span.get("tier") or "-"]
+                row["ms"].append(span["duration_ms"])
+                row["in"] += span.get("input_tokens", 0)
+                row["out"] += span.get("output_tokens", 0)
+        results[mode] = (turns, per_tier)
+
+    print(f"{'mode':<8}{'tier':<10}{'calls':>7}{'p50 ms':>9}{'p95 ms':>9}{'tok in':>9}{'tok out':>9}{'USD':>10}")
+    for mode, (turns, per_tier) in results.items():
+        total = 0.0
+        for tier in sorted(per_tier):
+            row = per_tier[tier]
+            price_in, price_out = prices["main" if mode == "single" or tier == "generate" else "small"]
+            cost = (row["in"] * price_in + row["out"] * price_out) / 1e6
+            total += cost
+            print(f"{mode:<8}{tier:<10}{len(row['ms']):>7}{_pct(row['ms'], 50):>9.0f}{_pct(row['ms'], 95):>9.0f}"
+                  f"{row['in']:>9}{row['out']:>9}{cost:>10.4f}")
+        print(f"{mode:<8}{'turn':<10}{len(turns):>7}{_pct(turns, 50) * 1000:>9.0f}{_pct(turns, 95) * 1000:>9.0f}"
+              f"{'':>18}{total:>10.4f}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# benchmarks/bench_transcript.py
+"""
+Per-turn cost and session memory over a long session, with the whole transcript
+in the graph state vs. a bounded window with older turns archived to disk.
+
+One session runs --cycles request cycles (request -> yes -> yes -> new, so four
+turns and eleven messages each) through the graph with a fake LLM and fake
+tools. For each quarter of the session the table shows the mean CPU time per
+turn, the messages held in the state, the pickled state size and how much the
+Python heap (checkpoints included) grew per turn. `full` keeps every message in
+the state (CHAT_HISTORY_WINDOW=0); `window` keeps the default window and spills
+the rest to the session archive, which is read back once at the end.
+
+    python -m benchmarks.bench_transcript
+    python -m benchmarks.bench_transcript --cycles 200 --window 40 --checkpointer sqlite
+"""
+
+import argparse
+import os
+import pickle
+import shutil
+import statistics
+import tempfile
+import time
+import tracemalloc
+import uuid
+
+from benchmarks.fakes import install_fakes
+
+SCRIPT = ["Design a multi-region order platform, variant {n}", "yes", "yes", "new"]
+
+
+def _session(graph, cycles: int, quarters: int = 4):
+    from graph_builder import thread_config, turn_input
+
+    config = thread_config(uuid.uuid4().hex)
+    rows, cpu = [], []
+    per_quarter = max(1, cycles // quarters)
+    heap_start = tracemalloc.get_traced_memory()[0]
+    for n in range(cycles):
+        for text in SCRIPT:
+            t0 = time.process_time()
+            graph.invoke(turn_input(graph, config, text.format(n=n)), config)
+            cpu.append(time.process_time() - t0)
+        if (n + 1) % per_quarter == 0:
+            values = graph.get_state(config).values
+            heap = tracemalloc.get_traced_memory()[0]
+            rows.append((len(cpu), statistics.mean(cpu[-per_quarter * len(SCRIPT):]) * 1000,
+                         len(values["messages"]), values.get("archived_messages") or 0,
+                         len(pickle.dumps(values)), (heap - heap_start) / (per_quarter * len(SCRIPT))))
+            heap_start = heap
+    return config, rows
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--cycles", type=int, default=100, help="request cycles (4 turns each)")
+    ap.add_argument("--window", type=int, default=0, help="messages kept in the state (default: CHAT_HISTORY_WINDOW)")
+    ap.add_argument("--checkpointer", choices=["memory", "sqlite"], default="memory")
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench-transcript-")
+    os.environ["CHAT_ARCHIVE_DIR"] = os.path.join(tmp, "transcripts")
+    install_fakes()
+
+    import transcript_archive
+    from checkpointing import make_checkpointer
+    from graph_builder import build_graph
+
+    window = args.window or transcript_archive.HISTORY_WINDOW
+    tracemalloc.start()
+    print(f"{args.cycles * len(SCRIPT)} turns, {args.checkpointer} checkpointer; window {window} messages\n")
+    print(f"{'mode':<8}{'turns':>7}{'cpu ms/turn':>13}{'in state':>10}{'archived':>10}{'state KB':>10}{'heap KB/turn':>14}")
+    for mode, size in (("full", 0), ("window", window)):
+        transcript_archive.HISTORY_WINDOW = size
+        path = os.path.join(tmp, f"{mode}.sqlite")
+        graph = build_graph(checkpointer=make_checkpointer(args.checkpointer, path))
+        config, rows = _session(graph, args.cycles)
+        for turns, cpu_ms, kept, archived, state_b, heap_b in rows:
+            print(f"{mode:<8}{turns:>7}{cpu_ms:>13.2f}{kept:>10}{archived:>10}{state_b / 1024:>10.1f}{heap_b / 1024:>14.1f}")
+        if size:
+            thread_id = config["configurable"]["thread_id"]
+            t0 = time.perf_counter()
+            archived = transcript_archive.load_archive(thread_id)
+            print(f"{'':<8}archive: {len(archived)} messages, "
+                  f"{os.path.getsize(transcript_archive.archive_path(thread_id)) / 1024:.0f} KB gzip, "
+                  f"reloaded in {(time.perf_counter() - t0) * 1000:.1f} ms")
+        print()
+    tracemalloc.stop()
+    shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
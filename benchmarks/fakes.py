@@ -0,0 +1,363 @@
+# benchmarks/fakes.py
+"""
+Deterministic local stand-ins for the Azure chat model and the research tools.
+
+`install_fakes()` must run before `graph_builder` (or any agent module) is imported:
+agents bind `llm_config.llm` and the tool list at import time.
+"""
+
+import asyncio
+import json
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import RunnableLambda
+from langchain_core.tools import StructuredTool
+from pydantic import PrivateAttr
+
+from tracing import span
+
+_TOOL_LINE_RE = re.compile(r"^- (\w+): ", re.MULTILINE)
+# "... with: ingestion, serving, analytics" -- the components of a benchmark requirement;
+# a decomposed part's prompt names its own as "Components: ...".
+_COMPONENTS_RE = re.compile(r"with: ([^\n.]+)")
+_PART_COMPONENTS_RE = re.compile(r"Components: ([^\n.]+)")
+_MAX_PARTS_RE = re.compile(r"at most (\d+) sub-problems")
+
+
+def _components(text: str) -> List[str]:
+    """Components the prompt asks about: its part's, else the (last mentioned) requirement's."""
+    matches = _PART_COMPONENTS_RE.findall(text) if "This is part " in text else []
+    matches = matches or _COMPONENTS_RE.findall(text)
+    return [c.strip() for c in re.split(r",| and ", matches[-1]) if c.strip()] if matches else []
+
+
+def _split_parts(text: str) -> List[List[str]]:
+    components = _components(text)
+    match = _MAX_PARTS_RE.search(text)
+    n = min(len(components), int(match.group(1)) if match else len(components))
+    return [components[i * len(components) // n:(i + 1) * len(components) // n] for i in range(n)]
+_WORDS = ("architecture", "service", "queue", "storage", "latency", "cache", "gateway", "schema",
+          "replica", "partition", "throughput", "consistency", "observability", "deployment")
+_FILLER = ("regional", "managed", "elastic", "stateful", "batch", "streaming", "tenant", "billing", "audit",
+           "failover", "index", "shard", "ledger", "payload", "retry", "timeout", "quota", "snapshot",
+           "backup", "encryption", "session", "webhook", "cluster", "pipeline", "warehouse", "rollout")
+# A vocabulary big enough that unrelated paragraphs share few terms, as in real text.
+_VOCAB = tuple(f"{w}{i}" for w in _WORDS + _FILLER for i in range(8))
+# Paragraphs any tool may return (the same article reached through different searches).
+_SHARED_PARAGRAPHS = 12
+
+
+def _prompt_text(value: Any) -> str:
+    if hasattr(value, "to_messages"):
+        value = value.to_messages()
+    if isinstance(value, list):
+        return "\n".join(str(getattr(m, "content", m)) for m in value)
+    return str(value)
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model with configurable latency and output size; never touches the network."""
+
+    first_token_latency_s: float = 0.0
+    token_latency_s: float = 0.0
+    # Prefill time per prompt token, so a longer prompt (e.g. a growing agent scratchpad) is slower.
+    input_token_latency_s: float = 0.0
+    output_tokens: int = 200
+    # When set, an answer is this many tokens per requirement component it covers (a prompt
+    # for one part of a decomposed requirement covers one), instead of output_tokens.
+    tokens_per_component: int = 0
+    # With tools bound, keep asking for another tool call until this many tool results
+    # are in the conversation (0: answer straight away, the agent loop ends after one step).
+    tool_loop_steps: int = 0
+    bound_tools: List[str] = []
+
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    _stats: Dict[str, int] = PrivateAttr(default_factory=lambda: {"calls": 0, "structured_calls": 0,
+                                                                  "input_tokens": 0, "output_tokens": 0})
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-bench"
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats)
+
+    def _record(self, structured: bool, input_tokens: int, output_tokens: int) -> None:
+        with self._lock:
+            self._stats["structured_calls" if structured else "calls"] += 1
+            self._stats["input_tokens"] += input_tokens
+            self._stats["output_tokens"] += output_tokens
+
+    def _scope(self, messages: List[BaseMessage]) -> List[str]:
+        if not self.tokens_per_component:
+            return []
+        return _components("\n".join(str(m.content) for m in messages))
+
+    def _output_tokens(self, messages: List[BaseMessage]) -> int:
+        if not self.tokens_per_component:
+            return self.output_tokens
+        return self.tokens_per_component * max(1, len(self._scope(messages)))
+
+    def _reply_tokens(self, seed: int, count: int, scope: List[str] = ()) -> List[str]:
+        words = [_WORDS[(seed + i) % len(_WORDS)] for i in range(count)]
+        # Name the components covered, so rewrites and later phases still know the requirement's size.
+        tokens = [f"Designed with: {', '.join(scope)}.\n## Summary\n" if scope else "## Summary\n"]
+        for i, w in enumerate(words[1:], 1):
+            tokens.append(("\n- " if i % 12 == 0 else " ") + w)
+        return tokens
+
+    def _prefill_s(self, messages: List[BaseMessage]) -> float:
+        if not self.input_token_latency_s:
+            return 0.0
+        return self.input_token_latency_s * (sum(len(str(m.content)) for m in messages) // 4)
+
+    def _usage(self, messages: List[BaseMessage]) -> Dict[str, int]:
+        input_tokens = sum(len(str(m.content)) for m in messages) // 4
+        output_tokens = self._output_tokens(messages)
+        return {"input_tokens": input_tokens, "output_tokens": output_tokens,
+                "total_tokens": input_tokens + output_tokens}
+
+    def _tool_call(self, messages: List[BaseMessage]) -> Optional[Dict[str, Any]]:
+        done = sum(isinstance(m, ToolMessage) for m in messages)
+        if not self.bound_tools or done >= self.tool_loop_steps:
+            return None
+        name = self.bound_tools[done % len(self.bound_tools)]
+        return {"name": name, "args": {"query": f"{name} evidence {done}"}, "id": f"call_{done}"}
+
+    def _tool_call_result(self, call: Dict[str, Any], messages: List[BaseMessage]) -> ChatResult:
+        usage = {**self._usage(messages), "output_tokens": 20}
+        usage["total_tokens"] = usage["input_tokens"] + 20
+        self._record(False, usage["input_tokens"], 20)
+        return ChatResult(generations=[ChatGeneration(
+            message=AIMessage(content="", tool_calls=[call], usage_metadata=usage))])
+
+    def _tool_call_chunk(self, call: Dict[str, Any], messages: List[BaseMessage]) -> ChatGenerationChunk:
+        message = self._tool_call_result(call, messages).generations[0].message
+        return ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=message.usage_metadata, tool_call_chunks=[
+            {"name": call["name"], "args": json.dumps(call["args"]), "id": call["id"], "index": 0}]))
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        call = self._tool_call(messages)
+        if call:
+            time.sleep(self.first_token_latency_s + self._prefill_s(messages))
+            return self._tool_call_result(call, messages)
+        usage = self._usage(messages)
+        time.sleep(self.first_token_latency_s + self._prefill_s(messages)
+                   + self.token_latency_s * usage["output_tokens"])
+        self._record(False, usage["input_tokens"], usage["output_tokens"])
+        text = "".join(self._reply_tokens(len(messages), usage["output_tokens"], self._scope(messages)))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text, usage_metadata=usage))])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any):
+        call = self._tool_call(messages)
+        if call:
+            time.sleep(self.first_token_latency_s + self._prefill_s(messages))
+            yield self._tool_call_chunk(call, messages)
+            return
+        usage = self._usage(messages)
+        time.sleep(self.first_token_latency_s + self._prefill_s(messages))
+        self._record(False, usage["input_tokens"], usage["output_tokens"])
+        tokens = self._reply_tokens(len(messages), usage["output_tokens"], self._scope(messages))
+        for i, token in enumerate(tokens):
+            if self.token_latency_s:
+                time.sleep(self.token_latency_s)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(
+                content=token, usage_metadata=usage if i == len(tokens) - 1 else None))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Optional[AsyncCallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        call = self._tool_call(messages)
+        if call:
+            await asyncio.sleep(self.first_token_latency_s + self._prefill_s(messages))
+            return self._tool_call_result(call, messages)
+        usage = self._usage(messages)
+        await asyncio.sleep(self.first_token_latency_s + self._prefill_s(messages)
+                            + self.token_latency_s * usage["output_tokens"])
+        self._record(False, usage["input_tokens"], usage["output_tokens"])
+        text = "".join(self._reply_tokens(len(messages), usage["output_tokens"], self._scope(messages)))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text, usage_metadata=usage))])
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager: Optional[AsyncCallbackManagerForLLMRun] = None, **kwargs: Any):
+        call = self._tool_call(messages)
+        if call:
+            await asyncio.sleep(self.first_token_latency_s + self._prefill_s(messages))
+            yield self._tool_call_chunk(call, messages)
+            return
+        usage = self._usage(messages)
+        await asyncio.sleep(self.first_token_latency_s + self._prefill_s(messages))
+        self._record(False, usage["input_tokens"], usage["output_tokens"])
+        tokens = self._reply_tokens(len(messages), usage["output_tokens"], self._scope(messages))
+        for i, token in enumerate(tokens):
+            if self.token_latency_s:
+                await asyncio.sleep(self.token_latency_s)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(
+                content=token, usage_metadata=usage if i == len(tokens) - 1 else None))
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+    def bind_tools(self, tools, **kwargs):
+        # Tool-calling agents get plain answers (the loop finishes after one step) unless
+        # tool_loop_steps asks for a loop; model_copy shares the stats with this model.
+        if not self.tool_loop_steps:
+            return self
+        return self.model_copy(update={"bound_tools": [getattr(t, "name", str(t)) for t in tools]})
+
+    def with_structured_output(self, schema, **kwargs):
+        def answer(text: str):
+            self._record(True, len(text) // 4, 20)
+            fields = getattr(schema, "model_fields", {})
+            if "decision" in fields:
+                low = text.lower()
+                decision = "proceed_to_next_phase" if any(w in low for w in ("good", "next", "fine")) else "clarify"
+                return schema(decision=decision)
+            if "subproblems" in fields:
+                part_type = fields["subproblems"].annotation.__args__[0]
+                return schema(subproblems=[part_type(title=" + ".join(p).capitalize(), scope=f"Components: {', '.join(p)}.")
+                                           for p in _split_parts(text)])
+            if "queries" in fields:
+                query_type = fields["queries"].annotation.__args__[0]
+                tools = _TOOL_LINE_RE.findall(text)
+                return schema(queries=[query_type(tool=t, query=f"{t} evidence {i}") for i, t in enumerate(tools)])
+            return schema()
+
+        # No model run happens here, so record the LLM span the callbacks would have.
+        tier = (self.metadata or {}).get("llm_tier")
+
+        def respond(value):
+            with span(type(self).__name__, "llm", **({"tier": tier} if tier else {})) as attrs:
+                time.sleep(self.first_token_latency_s)
+                text = _prompt_text(value)
+                attrs.update(input_tokens=len(text) // 4, output_tokens=20)
+                return answer(text)
+
+        async def arespond(value):
+            with span(type(self).__name__, "llm", **({"tier": tier} if tier else {})) as attrs:
+                await asyncio.sleep(self.first_token_latency_s)
+                text = _prompt_text(value)
+                attrs.update(input_tokens=len(text) // 4, output_tokens=20)
+                return answer(text)
+
+        return RunnableLambda(respond, afunc=arespond, name="FakeStructuredOutput")
+
+
+def _sentence(rng: random.Random, topic: str = "") -> str:
+    words = rng.sample(_VOCAB, 10)
+    if topic:
+        words.insert(rng.randrange(len(words)), topic)
+    return " ".join(words).capitalize() + "."
+
+
+def web_result(name: str, query: str, output_chars: int, pages: int = 3, overlap: float = 0.3) -> str:
+    """
+    A Tavily-style result dict (as its str()) of `pages` pages: navigation and cookie
+    lines, paragraphs of which some mention `query`, and a share `overlap` of
+    paragraphs that every tool and query can return.
+    """
+    rng = random.Random(f"{name}|{query}")
+    results = []
+    for page in range(pages):
+        lines = ["Skip to main content", "Home | Docs | Blog", "Accept all cookies",
+                 f"https://example.com/{name}/{page}"]
+        size = 0
+        while size < output_chars // pages:
+            own = rng.random() >= overlap
+            src = rng if own else random.Random(f"shared|{rng.randrange(_SHARED_PARAGRAPHS)}")
+            para = " ".join(_sentence(src, query if own and i == 0 and rng.random() < 0.4 else "") for i in range(3))
+            lines.append(para)
+            size += len(para)
+        lines += ["Subscribe to our newsletter", "Copyright 2024. All rights reserved."]
+        results.append({"url": f"https://example.com/{name}/{page}", "title": f"{query} ({name} {page})",
+                        "content": "\n\n".join(lines), "score": 0.9 - page / 10, "raw_content": None})
+    return str({"query": query, "follow_up_questions": None, "answer": None, "images": [],
+                "results": results, "response_time": 0.8})
+
+
+def make_fake_tools(latency_s: float = 0.0, output_chars: int = 1500, web: bool = False):
+    """
+    Stand-ins for wikipedia_search / tavily_search / arxiv_search with the same names.
+    They go through the same layers as the real tools (cassette, local knowledge index,
+    tool cache, compression; index and cache are off by default under install_fakes);
+    only the "network" part is faked. `web` returns noisy web pages (`web_result`)
+    instead of a repeated summary.
+    """
+    from tools.tools import _aresearch, _research
+
+    def make(name: str, description: str):
+        def result(query: str) -> str:
+            if web:
+                return web_result(name, query, output_chars)
+            body = f"{name} result for '{query}'. " + " ".join(_WORDS) + ". "
+            return (body * (output_chars // len(body) + 1))[:output_chars]
+
+        def fetch(query: str) -> str:
+            time.sleep(latency_s)
+            return result(query)
+
+        async def afetch(query: str) -> str:
+            await asyncio.sleep(latency_s)
+            return result(query)
+
+        def run(query: str) -> str:
+            return _research(name, query, lambda: fetch(query))
+
+        async def arun(query: str) -> str:
+            return await _aresearch(name, query, lambda: afetch(query))
+
+        return StructuredTool.from_function(run, coroutine=arun, name=name, description=description)
+    return [
+        make("wikipedia_search", "Search Wikipedia and return a short summary."),
+        make("tavily_search", "Perform a Tavily web search and return a brief summary of top results."),
+        make("arxiv_search", "Search arXiv for related papers and return a brief summary."),
+    ]
+
+
+def install_fakes(llm_latency_s: float = 0.0, token_latency_s: float = 0.0, output_tokens: int = 200,
+                  tool_latency_s: float = 0.0, tool_output_chars: int = 1500,
+                  small_llm_latency_s: Optional[float] = None) -> FakeChatModel:
+    """
+    Swap every model tier of llm_config and the tool list for local fakes; returns the
+    "generate" fake, whose stats cover all tiers. `small_llm_latency_s` is the latency
+    of the non-generate tiers (default: the same as generate).
+    """
+    os.environ.setdefault("AZURE_API_KEY", "offline")
+    os.environ.setdefault("AZURE_ENDPOINT", "https://offline.openai.azure.com")
+    os.environ.setdefault("TAVILY_API_KEY", "offline")
+    # Benchmarks measure orchestration; response/tool caches would hide repeated work.
+    os.environ.setdefault("LLM_CACHE", "0")
+    os.environ.setdefault("TOOL_CACHE", "0")
+    os.environ.setdefault("LOCAL_INDEX", "0")
+    # Long benchmark sessions spill their transcripts; keep those out of the working tree.
+    os.environ.setdefault("CHAT_ARCHIVE_DIR", os.path.join(tempfile.gettempdir(), "bench-transcripts"))
+
+    import llm_config
+    from tools import tools as tool_module
+
+    fake = FakeChatModel(first_token_latency_s=llm_latency_s, token_latency_s=token_latency_s,
+                         output_tokens=output_tokens, metadata={"llm_tier": "generate"})
+    small_latency = llm_latency_s if small_llm_latency_s is None else small_llm_latency_s
+    for tier in llm_config.TIERS:
+        # model_copy shares the private stats dict and lock with `fake`.
+        llm_config._MODELS[tier] = fake if tier == "generate" else fake.model_copy(
+            update={"metadata": {"llm_tier": tier}, "first_token_latency_s": small_latency})
+    llm_config.llm = fake
+    tool_module.TOOLS[:] = make_fake_tools(tool_latency_s, tool_output_chars)
+    return fake
@@ -0,0 +1,177 @@
+# benchmarks/stub_openai.py
+"""
+Local stand-in for Azure OpenAI chat completions, for testing the client layer.
+
+Serves POST /openai/deployments/<name>/chat/completions (plain JSON and SSE
+streaming) with per-deployment behaviour: a server-side requests-per-minute quota
+that answers 429 + Retry-After when exceeded, random 429s / 500s, latency with
+occasional spikes, or a deployment that is down (503) or unknown (404).
+
+    from benchmarks.stub_openai import StubBehavior, start_stub
+    server = start_stub({"east": StubBehavior(rpm=120), "west": StubBehavior(spike_rate=0.2)})
+    # azure_endpoint = server.endpoint
+    server.shutdown()
+
+    python -m benchmarks.stub_openai --port 8099     # serve one default deployment "gpt-4o"
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter, deque
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+_PATH_RE = re.compile(r"^/openai/deployments/([^/]+)/chat/completions")
+_WORDS = ("architecture", "service", "queue", "storage", "latency", "cache", "gateway", "schema")
+
+
+@dataclass
+class StubBehavior:
+    latency_s: float = 0.05           # time to first byte
+    spike_rate: float = 0.0           # share of calls that take spike_s instead
+    spike_s: float = 2.0
+    rate_429: float = 0.0             # random 429s on top of the quota
+    rate_500: float = 0.0
+    retry_after_s: float = 1.0        # Retry-After sent with random 429s
+    rpm: Optional[float] = None       # server-side quota, enforced over a sliding window
+    window_s: float = 60.0            # shorter windows keep benchmarks short
+    down: bool = False                # every call answers 503
+    output_tokens: int = 40
+
+
+class _StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, behaviors: Dict[str, StubBehavior], seed: int):
+        super().__init__(address, _Handler)
+        self.behaviors = behaviors
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.windows: Dict[str, deque] = {name: deque() for name in behaviors}
+        self.counts: Counter = Counter()
+
+    @property
+    def endpoint(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def decide(self, name: str):
+        """(status, retry_after_s, latency_s) for the next call to `name`."""
+        behavior = self.behaviors[name]
+        with self.lock:
+            self.counts[(name, "requests")] += 1
+            now = time.monotonic()
+            if behavior.down:
+                return 503, None, 0.0
+            window = self.windows[name]
+            while window and window[0] <= now - behavior.window_s:
+                window.popleft()
+            if behavior.rpm is not None and len(window) >= behavior.rpm * behavior.window_s / 60:
+                return 429, max(0.05, window[0] + behavior.window_s - now), 0.0
+            roll = self.rng.random()
+            if roll < behavior.rate_429:
+                return 429, behavior.retry_after_s, 0.0
+            if roll < behavior.rate_429 + behavior.rate_500:
+                return 500, None, behavior.latency_s
+            window.append(now)
+            spike = self.rng.random() < behavior.spike_rate
+            return 200, None, behavior.spike_s if spike else behavior.latency_s
+
+    def handle_error(self, request, client_address):
+        pass  # clients that time out close their socket mid-reply; that is expected here
+
+    def count(self, name: str, status: int) -> None:
+        with self.lock:
+            self.counts[(name, status)] += 1
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: _StubServer
+
+    def log_message(self, *args):
+        pass
+
+    def _json(self, status: int, body: dict, headers: Optional[dict] = None):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        match = _PATH_RE.match(self.path)
+        name = match.group(1) if match else None
+        if name not in self.server.behaviors:
+            return self._json(404, {"error": {"code": "DeploymentNotFound", "message": f"no deployment {name}"}})
+
+        status, retry_after, latency = self.server.decide(name)
+        self.server.count(name, status)
+        time.sleep(latency)
+        if status == 429:
+            return self._json(429, {"error": {"code": "429", "message": "Rate limit exceeded"}},
+                              {"Retry-After": str(max(1, round(retry_after))),
+                               "retry-after-ms": str(int(retry_after * 1000))})
+        if status != 200:
+            return self._json(status, {"error": {"code": str(status), "message": "stub failure"}})
+
+        behavior = self.server.behaviors[name]
+        prompt_tokens = sum(len(str(m.get("content") or "")) for m in body.get("messages", [])) // 4
+        words = [_WORDS[i % len(_WORDS)] for i in range(behavior.output_tokens)]
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(words),
+                 "total_tokens": prompt_tokens + len(words)}
+        base = {"id": f"chatcmpl-{self.server.counts[(name, 200)]}", "created": int(time.time()), "model": "gpt-4o"}
+        if not body.get("stream"):
+            return self._json(200, {**base, "object": "chat.completion", "usage": usage, "choices": [
+                {"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": " ".join(words)}}]})
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def event(payload):
+            self.wfile.write(f"data: {payload}\n\n".encode())
+            self.wfile.flush()
+
+        for i, word in enumerate(words):
+            delta = {"content": ("" if i == 0 else " ") + word, **({"role": "assistant"} if i == 0 else {})}
+            event(json.dumps({**base, "object": "chat.completion.chunk",
+                              "choices": [{"index": 0, "delta": delta, "finish_reason": None}]}))
+        event(json.dumps({**base, "object": "chat.completion.chunk",
+                          "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}))
+        if (body.get("stream_options") or {}).get("include_usage"):
+            event(json.dumps({**base, "object": "chat.completion.chunk", "choices": [], "usage": usage}))
+        event("[DONE]")
+
+
+def start_stub(behaviors: Dict[str, StubBehavior], port: int = 0, seed: int = 0) -> _StubServer:
+    """Serve `behaviors` (deployment name -> behaviour) on a background thread."""
+    server = _StubServer(("127.0.0.1", port), behaviors, seed)
+    threading.Thread(target=server.serve_forever, name="stub-openai", daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--port", type=int, default=8099)
+    ap.add_argument("--rpm", type=float, help="server-side quota")
+    ap.add_argument("--rate-429", type=float, default=0.0)
+    ap.add_argument("--spike-rate", type=float, default=0.0)
+    args = ap.parse_args()
+    stub = start_stub({"gpt-4o": StubBehavior(rpm=args.rpm, rate_429=args.rate_429, spike_rate=args.spike_rate)},
+                      args.port)
+    print(f"Stub Azure OpenAI on {stub.endpoint} (deployment gpt-4o); Ctrl-C to stop")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        stub.shutdown()
@@ -0,0 +1,53 @@
+# benchmarks/trace_report.py
+"""
+Latency report from a JSONL trace (TRACE_SINK=jsonl:<path>).
+
+    TRACE_SINK=jsonl:traces.jsonl python main.py
+    python -m benchmarks.trace_report traces.jsonl
+    python -m benchmarks.trace_report traces.jsonl --kind llm --by-node
+    python -m benchmarks.trace_report traces.jsonl --by-tier
+"""
+
+import argparse
+import json
+from collections import defaultdict
+
+from tracing import LatencyHistogram
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("path", help="JSONL trace file")
+    ap.add_argument("--kind", choices=["node", "llm", "tool"], help="only this span kind")
+    ap.add_argument("--by-node", action="store_true", help="group LLM/tool spans by the node they ran in")
+    ap.add_argument("--by-tier", action="store_true", help="only LLM spans, grouped by model tier")
+    args = ap.parse_args()
+
+    hists = defaultdict(LatencyHistogram)
+    tokens = defaultdict(lambda: [0, 0])
+    hits = defaultdict(int)
+    errors = defaultdict(int)
+    with open(args.path, encoding="utf-8") as fh:
+        for line in fh:
+            span = json.loads(line)
+            if args.kind and span["kind"] != args.kind or args.by_tier and span["kind"] != "llm":
+                continue
+            key = f"tier:{span.get('tier') or '-'}" if args.by_tier else f"{span['kind']}:{span['name']}"
+            if args.by_node:
+                key += f"@{span.get('node') or '-'}"
+            hists[key].add(span["duration_ms"])
+            tokens[key][0] += span.get("input_tokens", 0)
+            tokens[key][1] += span.get("output_tokens", 0)
+            hits[key] += bool(span.get("cache_hit"))
+            errors[key] += "error" in span
+
+    print(f"{'span':<44}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}"
+          f"{'tok in':>9}{'tok out':>9}{'hits':>6}{'err':>5}")
+    for key, hist in sorted(hists.items(), key=lambda kv: -kv[1].total_ms):
+        s = hist.summary()
+        print(f"{key:<44}{s['count']:>6}{s['p50_ms']:>10.1f}{s['p95_ms']:>10.1f}{s['p99_ms']:>10.1f}"
+              f"{s['max_ms']:>10.1f}{tokens[key][0]:>9}{tokens[key][1]:>9}{hits[key]:>6}{errors[key]:>5}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+# budgets.py
+"""
+Per-phase budgets: wall-clock time, tool calls and LLM tokens.
+
+A `PhaseBudget` starts when its phase's node starts and is attached to the
+phase's model and tool calls as a callback. It counts tool calls and reported
+tokens, and stops the run once a budget is spent: the next model or tool call
+raises `BudgetExceeded`. Callers catch that (or their own deadline, for calls
+already in flight), synthesize from what was gathered so far and record
+`report()` in the state.
+
+Limits come from PHASE_BUDGET_<PHASE>_S / _TOOL_CALLS / _TOKENS (0 = unlimited).
+PHASE_BUDGET_RESERVE_S of the time budget is kept for the final synthesis, so a
+phase ends within its time budget as long as that last call fits in the reserve.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.runnables import RunnableConfig
+
+from tracing import token_usage
+
+logger = logging.getLogger(__name__)
+
+# Defaults per phase; phases not listed are unbudgeted.
+PHASE_BUDGETS: Dict[str, Dict[str, float]] = {
+    "analysis": {"time_s": 60.0, "tool_calls": 12, "tokens": 60000},
+}
+RESERVE_S = float(os.getenv("PHASE_BUDGET_RESERVE_S", "15"))
+
+# Budget names as recorded in state -> wording used in the partial-synthesis prompt.
+BUDGET_LABELS = {"time": "time", "tool_calls": "tool-call", "tokens": "token"}
+
+
+class BudgetExceeded(Exception):
+    def __init__(self, budget: str):
+        super().__init__(f"{budget} budget exhausted")
+        self.budget = budget
+
+
+class _QuietBudget(logging.Filter):
+    """LangChain logs every exception raised by a callback; a spent budget is expected."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return "BudgetExceeded" not in record.getMessage()
+
+
+logging.getLogger("langchain_core.callbacks.manager").addFilter(_QuietBudget())
+
+
+def _limit(phase: str, name: str, suffix: str) -> float:
+    value = os.getenv(f"PHASE_BUDGET_{phase.upper()}_{suffix}")
+    if value is not None:
+        return float(value)
+    return float(PHASE_BUDGETS.get(phase, {}).get(name, 0))
+
+
+class PhaseBudget(BaseCallbackHandler):
+    """Usage and limits of one phase run; stops the run's model/tool calls once a limit is hit."""
+
+    raise_error = True
+    run_inline = True
+
+    def __init__(self, phase: str, time_s: float = 0, tool_calls: int = 0, tokens: int = 0,
+                 reserve_s: Optional[float] = None):
+        self.phase = phase
+        self.time_s = time_s
+        self.max_tool_calls = int(tool_calls)
+        self.max_tokens = int(tokens)
+        self.reserve_s = min(RESERVE_S if reserve_s is None else reserve_s, time_s / 2) if time_s else 0.0
+        self.started = time.perf_counter()
+        self.tool_calls = 0
+        self.tokens = 0
+        self.hit: Optional[str] = None
+        # (tool, query, output) of every finished tool call, for a partial synthesis.
+        self.evidence: List[Tuple[str, str, str]] = []
+        self._pending: Dict[Any, Tuple[str, str]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_phase(cls, phase: str) -> "PhaseBudget":
+        return cls(phase, time_s=_limit(phase, "time_s", "S"), tool_calls=int(_limit(phase, "tool_calls", "TOOL_CALLS")),
+                   tokens=int(_limit(phase, "tokens", "TOKENS")))
+
+    # ---------- limits ----------
+
+    def elapsed_s(self) -> float:
+        return time.perf_counter() - self.started
+
+    def remaining_s(self) -> Optional[float]:
+        """Seconds left for gathering (the synthesis reserve excluded); None without a time budget."""
+        if not self.time_s:
+            return None
+        return max(0.0, self.time_s - self.reserve_s - self.elapsed_s())
+
+    def tool_calls_left(self) -> Optional[int]:
+        return max(0, self.max_tool_calls - self.tool_calls) if self.max_tool_calls else None
+
+    def tokens_left(self) -> Optional[int]:
+        return max(0, self.max_tokens - self.tokens) if self.max_tokens else None
+
+    def stop(self, budget: str) -> None:
+        """Record that `budget` ran out (the first one recorded wins); later model and tool calls raise."""
+        with self._lock:
+            self._stop_locked(budget)
+
+    def _stop_locked(self, budget: str) -> None:
+        if self.hit is None:
+            self.hit = budget
+            logger.warning("%s: %s budget exhausted after %.1fs, %d tool calls, %d tokens.",
+                           self.phase, budget, self.elapsed_s(), self.tool_calls, self.tokens)
+
+    def _check(self) -> None:
+        if self.hit is None:
+            if self.remaining_s() == 0.0:
+                self.stop("time")
+            elif self.tokens_left() == 0:
+                self.stop("tokens")
+        if self.hit is not None:
+            raise BudgetExceeded(self.hit)
+
+    def attach(self, config: Optional[RunnableConfig] = None, enforce: bool = True) -> RunnableConfig:
+        """
+        A copy of `config` whose runs (and their children) report to this budget. Without
+        `enforce` they only add their tokens (the final synthesis), and nothing else that
+        still runs under the budget is let off.
+        """
+        handler = self if enforce else _Tally(self)
+        config = dict(config or {})
+        callbacks = config.get("callbacks")
+        if callbacks is None:
+            callbacks = [handler]
+        elif isinstance(callbacks, list):
+            callbacks = callbacks + [handler]
+        else:
+            callbacks = callbacks.copy()
+            callbacks.add_handler(handler, inherit=True)
+        config["callbacks"] = callbacks
+        return config  # type: ignore[return-value]
+
+    def report(self) -> Dict[str, Any]:
+        return {"phase": self.phase, "hit": self.hit, "elapsed_s": round(self.elapsed_s(), 3),
+                "tool_calls": self.tool_calls, "tokens": self.tokens,
+                "limits": {"time_s": self.time_s, "tool_calls": self.max_tool_calls, "tokens": self.max_tokens}}
+
+    # ---------- callbacks ----------
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        self._check()
+
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        self._check()
+
+    def on_llm_end(self, response, **kwargs):
+        with self._lock:
+            self.tokens += sum(token_usage(response).values())
+
+    def on_tool_start(self, serialized, input_str, *, run_id, inputs=None, **kwargs):
+        self._check()
+        # Check and count under one lock, so concurrent tool starts cannot overshoot the limit.
+        with self._lock:
+            over = bool(self.max_tool_calls and self.tool_calls >= self.max_tool_calls)
+            if over:
+                self._stop_locked("tool_calls")
+            else:
+                self.tool_calls += 1
+                name = kwargs.get("name") or (serialized or {}).get("name") or "tool"
+                query = (inputs or {}).get("query") if isinstance(inputs, dict) else None
+                self._pending[run_id] = (name, str(query or input_str))
+        if over:
+            raise BudgetExceeded(self.hit)
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        with self._lock:
+            started = self._pending.pop(run_id, None)
+            if started:
+                self.evidence.append((*started, str(getattr(output, "content", output))))
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        with self._lock:
+            self._pending.pop(run_id, None)
+
+
+class _Tally(BaseCallbackHandler):
+    """Adds a run's tokens to a budget without ever stopping the run."""
+
+    run_inline = True
+
+    def __init__(self, budget: PhaseBudget):
+        self.budget = budget
+
+    def on_llm_end(self, response, **kwargs):
+        self.budget.on_llm_end(response, **kwargs)
@@ -0,0 +1,443 @@
+# cassettes.py
+"""
+Record/replay of LLM and research-tool traffic ("cassettes").
+
+CASSETTE_MODE=record wraps every model tier (llm_config.get_llm) and every research
+tool call (tools/tools.py) and appends each request's key, its response (or error)
+and how long it took to CASSETTE_PATH, as gzip JSON lines. CASSETTE_MODE=replay
+serves them from that file: no Azure, Tavily, arXiv or Wikipedia call is made and
+no credentials are needed, so a slow session can be profiled offline and the same
+traffic replayed against different versions of the code.
+
+A call is matched by a key of its tier (or tool), bound tools and prompt. When the
+code has changed and a prompt no longer matches, the next unused recording of the
+same tier and tools (or the same tool) is served instead, in recorded order.
+CASSETTE_LATENCY=original replays each response after its recorded latency (streams
+chunk by chunk at their recorded offsets); CASSETTE_LATENCY=zero serves it at once.
+
+The LLM response cache is off in both modes: its hits would be neither recorded nor
+replayed. Tool calls are recorded above the tool cache and local index for the same
+reason.
+"""
+
+import asyncio
+import atexit
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel, generate_from_stream
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import RunnableBinding, RunnableConfig, RunnableLambda
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import BaseModel
+
+from tracing import span
+
+logger = logging.getLogger(__name__)
+
+MODE = os.getenv("CASSETTE_MODE", "off").lower()  # off | record | replay
+PATH = os.getenv("CASSETTE_PATH", os.path.join(".cache", "cassettes", "session.jsonl.gz"))
+LATENCY = os.getenv("CASSETTE_LATENCY", "original").lower()  # original | zero
+# Recordings are written a gzip member at a time: every FLUSH_EVERY entries or FLUSH_S seconds.
+FLUSH_EVERY = 20
+FLUSH_S = 5.0
+
+STATS: Dict[str, int] = {"recorded": 0, "exact": 0, "fuzzy": 0, "missing": 0}
+_LOCK = threading.Lock()
+
+
+class CassetteMiss(LookupError):
+    """Replay found no recording for a call."""
+
+
+class RecordedError(RuntimeError):
+    """A call that failed when it was recorded fails the same way on replay."""
+
+
+# ---------- file ----------
+
+class _Recorder:
+    def __init__(self, path: str):
+        self.path = path
+        self.buffer: List[str] = []
+        self.flushed_at = time.monotonic()
+        self.lock = threading.Lock()
+        atexit.register(self.flush)
+
+    def add(self, entry: Dict[str, Any]) -> None:
+        with self.lock:
+            self.buffer.append(json.dumps(entry))
+            if len(self.buffer) >= FLUSH_EVERY or time.monotonic() - self.flushed_at >= FLUSH_S:
+                self._write()
+        with _LOCK:
+            STATS["recorded"] += 1
+
+    def flush(self) -> None:
+        with self.lock:
+            self._write()
+
+    def _write(self) -> None:
+        self.flushed_at = time.monotonic()
+        if not self.buffer:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with gzip.open(self.path, "at", encoding="utf-8") as f:
+            f.write("\n".join(self.buffer) + "\n")
+        self.buffer.clear()
+
+
+class _Player:
+    def __init__(self, path: str):
+        self.entries = load(path)
+        self.used = [False] * len(self.entries)
+        self.by_key: Dict[str, deque] = {}
+        self.by_shape: Dict[str, deque] = {}
+        for i, entry in enumerate(self.entries):
+            self.by_key.setdefault(entry["key"], deque()).append(i)
+            self.by_shape.setdefault(entry["shape"], deque()).append(i)
+        self.lock = threading.Lock()
+
+    def take(self, key: str, shape: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            for queue, kind in ((self.by_key.get(key), "exact"), (self.by_shape.get(shape), "fuzzy")):
+                while queue:
+                    i = queue.popleft()
+                    if not self.used[i]:
+                        self.used[i] = True
+                        STATS[kind] += 1
+                        if kind == "fuzzy":
+                            logger.debug("Cassette: no exact match for a %s call; serving the next in order.", shape)
+                        return self.entries[i]
+            STATS["missing"] += 1
+            return None
+
+
+_RECORDERS: Dict[str, _Recorder] = {}
+_PLAYERS: Dict[str, _Player] = {}
+
+
+def load(path: str) -> List[Dict[str, Any]]:
+    """Every entry of a cassette file, in recorded order (a truncated last member is skipped)."""
+    entries = []
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entries.append(json.loads(line))
+    except FileNotFoundError:
+        logger.warning("Cassette %s not found; every call will miss.", path)
+    except (EOFError, OSError, ValueError) as e:
+        logger.warning("Cassette %s ends early (%s); replaying %d entries.", path, e, len(entries))
+    return entries
+
+
+def _recorder() -> _Recorder:
+    with _LOCK:
+        recorder = _RECORDERS.get(PATH)
+        if recorder is None:
+            recorder = _RECORDERS[PATH] = _Recorder(PATH)
+        return recorder
+
+
+def _player() -> _Player:
+    with _LOCK:
+        player = _PLAYERS.get(PATH)
+        if player is None:
+            player = _PLAYERS[PATH] = _Player(PATH)
+        return player
+
+
+def flush() -> None:
+    """Write buffered recordings now (also done at exit)."""
+    for recorder in list(_RECORDERS.values()):
+        recorder.flush()
+
+
+def rewind() -> None:
+    """Forget what replay has served, so the next replay starts from the first recording."""
+    with _LOCK:
+        _PLAYERS.clear()
+
+
+def _digest(payload: Any) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def _record(key: str, shape: str, started: float, **fields: Any) -> None:
+    _recorder().add({"key": key, "shape": shape, "latency_s": round(time.perf_counter() - started, 4), **fields})
+
+
+def _take(key: str, shape: str) -> Dict[str, Any]:
+    entry = _player().take(key, shape)
+    if entry is None:
+        logger.warning("No recording for %s in cassette %s.", shape, PATH)
+        raise CassetteMiss(f"No recording for {shape} in cassette {PATH}")
+    return entry
+
+
+def _delay(seconds: float) -> float:
+    return max(0.0, seconds) if LATENCY == "original" else 0.0
+
+
+def _served(entry: Dict[str, Any]) -> Dict[str, Any]:
+    if "error" in entry:
+        raise RecordedError(entry["error"])
+    return entry
+
+
+# ---------- research tools ----------
+
+def tool_call(tool: str, query: str, call: Callable[[], str]) -> str:
+    """`call()`, recorded or replayed under the cassette mode."""
+    if MODE not in ("record", "replay"):
+        return call()
+    key, shape = _digest(["tool", tool, query]), f"tool:{tool}"
+    if MODE == "replay":
+        entry = _take(key, shape)
+        time.sleep(_delay(entry["latency_s"]))
+        return _served(entry)["value"]
+    started = time.perf_counter()
+    try:
+        value = call()
+    except Exception as e:
+        _record(key, shape, started, error=str(e))
+        raise
+    _record(key, shape, started, value=value)
+    return value
+
+
+async def atool_call(tool: str, query: str, call: Callable[[], Awaitable[str]]) -> str:
+    if MODE not in ("record", "replay"):
+        return await call()
+    key, shape = _digest(["tool", tool, query]), f"tool:{tool}"
+    if MODE == "replay":
+        entry = _take(key, shape)
+        await asyncio.sleep(_delay(entry["latency_s"]))
+        return _served(entry)["value"]
+    started = time.perf_counter()
+    try:
+        value = await call()
+    except Exception as e:
+        _record(key, shape, started, error=str(e))
+        raise
+    _record(key, shape, started, value=value)
+    return value
+
+
+# ---------- chat models ----------
+
+def _message_key(msg: BaseMessage) -> list:
+    # Content and tool calls only: message ids are random per run.
+    calls = [(c.get("name"), c.get("args")) for c in getattr(msg, "tool_calls", None) or []]
+    return [msg.type, msg.content if isinstance(msg.content, str) else json.dumps(msg.content, default=str), calls]
+
+
+def _prompt_key(value: Any) -> Any:
+    if hasattr(value, "to_messages"):
+        value = value.to_messages()
+    if isinstance(value, list):
+        return [_message_key(m) if isinstance(m, BaseMessage) else m for m in value]
+    return value
+
+
+def _dump(msg: BaseMessage) -> dict:
+    # Without its id, a replayed message gets a fresh one, like a live answer.
+    return message_to_dict(msg.model_copy(update={"id": None}))
+
+
+def _load(data: dict) -> BaseMessage:
+    return messages_from_dict([data])[0]
+
+
+def _chunk_of(msg: AIMessage) -> AIMessageChunk:
+    return AIMessageChunk(content=msg.content, usage_metadata=msg.usage_metadata, tool_call_chunks=[
+        {"name": c["name"], "args": json.dumps(c["args"]), "id": c.get("id"), "index": i}
+        for i, c in enumerate(msg.tool_calls)])
+
+
+def _replayed_result(entry: Dict[str, Any]) -> ChatResult:
+    if "chunks" in entry:
+        return generate_from_stream(iter(ChatGenerationChunk(message=_load(m)) for _, m in entry["chunks"]))
+    return ChatResult(generations=[ChatGeneration(message=_load(entry["message"]))])
+
+
+def _replayed_chunks(entry: Dict[str, Any]) -> List[Tuple[float, AIMessageChunk]]:
+    if "chunks" in entry:
+        return [(offset, _load(m)) for offset, m in entry["chunks"]]
+    return [(entry["latency_s"], _chunk_of(_load(entry["message"])))]
+
+
+class CassetteChatModel(BaseChatModel):
+    """Records the calls of the model it wraps, or replays them without it (`inner` None)."""
+
+    inner: Any = None
+    tier: str = "generate"
+    tool_names: List[str] = []
+
+    @property
+    def _llm_type(self) -> str:
+        return "cassette"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"tier": self.tier, "tool_names": self.tool_names}
+
+    def _key(self, messages: List[BaseMessage], stop: Optional[List[str]]) -> Tuple[str, str]:
+        shape = f"llm:{self.tier}:{','.join(self.tool_names)}"
+        return _digest([shape, stop or [], [_message_key(m) for m in messages]]), shape
+
+    def bind_tools(self, tools, **kwargs):
+        names = [convert_to_openai_tool(t)["function"]["name"] for t in tools]
+        model = self.model_copy(update={"tool_names": names})
+        if self.inner is None:
+            return model
+        # Let the wrapped model format the tools; bind what it would send (as ResilientChatModel does).
+        bound = self.inner.bind_tools(tools, **kwargs)
+        if isinstance(bound, RunnableBinding) and bound.bound is self.inner:
+            return model.bind(**bound.kwargs)
+        return model.model_copy(update={"inner": bound})
+
+    def with_structured_output(self, schema, *, include_raw: bool = False, **kwargs):
+        if include_raw or not isinstance(schema, type):
+            # Recorded as the tool call it becomes (bind_tools + _generate).
+            return super().with_structured_output(schema, include_raw=include_raw, **kwargs)
+        shape = f"structured:{self.tier}:{getattr(schema, '__name__', 'schema')}"
+        live = self.inner.with_structured_output(schema, **kwargs) if self.inner is not None else None
+
+        def parse(value):
+            return schema.model_validate(value) if isinstance(schema, type) and issubclass(schema, BaseModel) else value
+
+        def dump(value):
+            return value.model_dump(mode="json") if isinstance(value, BaseModel) else value
+
+        def respond(value, config: RunnableConfig = None):
+            key = _digest([shape, _prompt_key(value)])
+            if MODE == "replay":
+                with span(type(self).__name__, "llm", tier=self.tier):
+                    entry = _take(key, shape)
+                    time.sleep(_delay(entry["latency_s"]))
+                    return parse(_served(entry)["value"])
+            started = time.perf_counter()
+            try:
+                result = live.invoke(value, config=config)
+            except Exception as e:
+                _record(key, shape, started, error=str(e))
+                raise
+            _record(key, shape, started, value=dump(result))
+            return result
+
+        async def arespond(value, config: RunnableConfig = None):
+            key = _digest([shape, _prompt_key(value)])
+            if MODE == "replay":
+                with span(type(self).__name__, "llm", tier=self.tier):
+                    entry = _take(key, shape)
+                    await asyncio.sleep(_delay(entry["latency_s"]))
+                    return parse(_served(entry)["value"])
+            started = time.perf_counter()
+            try:
+                result = await live.ainvoke(value, config=config)
+            except Exception as e:
+                _record(key, shape, started, error=str(e))
+                raise
+            _record(key, shape, started, value=dump(result))
+            return result
+
+        return RunnableLambda(respond, afunc=arespond, name="CassetteStructuredOutput")
+
+    # -- calls ------------------------------------------------------------------
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        key, shape = self._key(messages, stop)
+        if MODE == "replay":
+            entry = _take(key, shape)
+            time.sleep(_delay(entry["latency_s"]))
+            return _replayed_result(_served(entry))
+        started = time.perf_counter()
+        try:
+            result = self.inner._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        except Exception as e:
+            _record(key, shape, started, error=str(e))
+            raise
+        _record(key, shape, started, message=_dump(result.generations[0].message))
+        return result
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Optional[AsyncCallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        key, shape = self._key(messages, stop)
+        if MODE == "replay":
+            entry = _take(key, shape)
+            await asyncio.sleep(_delay(entry["latency_s"]))
+            return _replayed_result(_served(entry))
+        started = time.perf_counter()
+        try:
+            result = await self.inner._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        except Exception as e:
+            _record(key, shape, started, error=str(e))
+            raise
+        _record(key, shape, started, message=_dump(result.generations[0].message))
+        return result
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any):
+        key, shape = self._key(messages, stop)
+        started = time.perf_counter()
+        if MODE == "replay":
+            entry = _served(_take(key, shape))
+            for offset, message in _replayed_chunks(entry):
+                time.sleep(_delay(offset - (time.perf_counter() - started)))
+                chunk = ChatGenerationChunk(message=message)
+                if run_manager:
+                    run_manager.on_llm_new_token(str(message.content), chunk=chunk)
+                yield chunk
+            return
+        chunks = []
+        try:
+            for chunk in self.inner._stream(messages, stop=stop, run_manager=run_manager, **kwargs):
+                chunks.append([round(time.perf_counter() - started, 4), _dump(chunk.message)])
+                yield chunk
+        except Exception as e:
+            _record(key, shape, started, chunks=chunks, error=str(e))
+            raise
+        _record(key, shape, started, chunks=chunks)
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager: Optional[AsyncCallbackManagerForLLMRun] = None, **kwargs: Any):
+        key, shape = self._key(messages, stop)
+        started = time.perf_counter()
+        if MODE == "replay":
+            entry = _served(_take(key, shape))
+            for offset, message in _replayed_chunks(entry):
+                await asyncio.sleep(_delay(offset - (time.perf_counter() - started)))
+                chunk = ChatGenerationChunk(message=message)
+                if run_manager:
+                    await run_manager.on_llm_new_token(str(message.content), chunk=chunk)
+                yield chunk
+            return
+        chunks = []
+        try:
+            async for chunk in self.inner._astream(messages, stop=stop, run_manager=run_manager, **kwargs):
+                chunks.append([round(time.perf_counter() - started, 4), _dump(chunk.message)])
+                yield chunk
+        except Exception as e:
+            _record(key, shape, started, chunks=chunks, error=str(e))
+            raise
+        _record(key, shape, started, chunks=chunks)
+
+
+def wrap_model(model, tier: str):
+    """`model` under the cassette mode: as is when off, recorded, or replaced by its recordings."""
+    if MODE == "record":
+        return CassetteChatModel(inner=model, tier=tier, metadata={"llm_tier": tier})
+    if MODE == "replay":
+        return CassetteChatModel(tier=tier, metadata={"llm_tier": tier})
+    return model
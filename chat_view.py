@@ -0,0 +1,152 @@
+# chat_view.py
+"""
+Transcript rendering for the Streamlit app.
+
+A rerun renders only the last CHAT_RECENT_TURNS turns; older messages sit behind
+a toggle, collapsed and paginated (CHAT_PAGE_SIZE per page), so rerun time does not grow
+with the session. Session state holds a `Transcript` of compact (id, role,
+markdown) entries instead of the graph's message objects; it is updated with just
+the new messages after each turn, and each message's entry is built once per
+message id (a process-wide LRU shared by all browser sessions). Messages archived
+out of the graph state (transcript_archive.py) are read back only when the user
+asks for them.
+"""
+
+import functools
+import os
+import threading
+from collections import OrderedDict
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+import streamlit as st
+from langchain_core.messages import BaseMessage, HumanMessage
+
+from transcript_archive import load_archive
+
+RECENT_TURNS = int(os.getenv("CHAT_RECENT_TURNS", "3"))  # 0 renders the whole transcript
+PAGE_SIZE = int(os.getenv("CHAT_PAGE_SIZE", "10"))
+RENDER_CACHE_SIZE = int(os.getenv("CHAT_RENDER_CACHE", "5000"))
+
+
+class Entry(NamedTuple):
+    id: str
+    role: str        # "user" | "assistant"
+    markdown: str
+    title: str       # one-line label for the collapsed history
+
+
+_ENTRIES: "OrderedDict[str, Entry]" = OrderedDict()
+_ENTRIES_LOCK = threading.Lock()
+
+
+def _text(content) -> str:
+    if isinstance(content, str):
+        return content
+    # Multi-part content: keep the text parts.
+    return "".join(p.get("text", "") if isinstance(p, dict) else str(p) for p in content or [])
+
+
+def _title(role: str, markdown: str) -> str:
+    for line in markdown.splitlines():
+        line = line.strip().lstrip("#").strip()
+        if line:
+            return f"{'You' if role == 'user' else 'Assistant'}: {line[:80]}"
+    return "You" if role == "user" else "Assistant"
+
+
+def entry(message: BaseMessage, position: int) -> Entry:
+    """The render entry of a message, built once per message id."""
+    msg_id = message.id or f"pos-{position}"
+    if message.id:
+        with _ENTRIES_LOCK:
+            cached = _ENTRIES.get(msg_id)
+            if cached is not None:
+                _ENTRIES.move_to_end(msg_id)
+                return cached
+    role = "user" if isinstance(message, HumanMessage) else "assistant"
+    markdown = _text(message.content)
+    built = Entry(msg_id, role, markdown, _title(role, markdown))
+    if message.id:
+        with _ENTRIES_LOCK:
+            _ENTRIES[msg_id] = built
+            while len(_ENTRIES) > RENDER_CACHE_SIZE:
+                _ENTRIES.popitem(last=False)
+    return built
+
+
+class Transcript:
+    """
+    Render entries of one session's in-state messages, synced incrementally from graph
+    state; `archived` counts the older messages that live in the session archive.
+    """
+
+    def __init__(self, messages: Sequence[BaseMessage] = (), thread_id: Optional[str] = None, archived: int = 0):
+        self.thread_id = thread_id
+        self.archived = archived
+        self.entries: List[Entry] = []
+        self.sync(messages, archived)
+
+    def sync(self, messages: Sequence[BaseMessage], archived: int = 0) -> None:
+        known = len(self.entries)
+        if (archived != self.archived or known > len(messages)
+                or (known and (messages[known - 1].id or f"pos-{known - 1}") != self.entries[-1].id)):
+            # Earlier history was rewritten (trimmed or archived): rebuild from the cache.
+            self.entries, known = [], 0
+            self.archived = archived
+        self.entries.extend(entry(m, i) for i, m in enumerate(messages[known:], known))
+
+
+@functools.lru_cache(maxsize=8)
+def _archived_entries(thread_id: str, count: int) -> Tuple[Entry, ...]:
+    """Entries of a session's archived messages (keyed by count, so a new spill reloads)."""
+    return tuple(entry(m, i - count) for i, m in enumerate(load_archive(thread_id)[-count:]))
+
+
+def window_start(entries: Sequence[Entry], turns: Optional[int] = None) -> int:
+    """Index of the first entry of the last `turns` turns (a turn starts with a user message)."""
+    turns = RECENT_TURNS if turns is None else turns
+    if turns <= 0:
+        return 0
+    seen = 0
+    for i in range(len(entries) - 1, -1, -1):
+        if entries[i].role == "user":
+            seen += 1
+            if seen == turns:
+                return i
+    return 0
+
+
+def _show(entries: Sequence[Entry]) -> None:
+    for e in entries:
+        with st.chat_message(e.role):
+            st.markdown(e.markdown)
+
+
+def _show_older(older: Sequence[Entry], transcript: Transcript) -> None:
+    if not st.toggle(f"Show {len(older) + transcript.archived} earlier messages", key="chat_show_older"):
+        return
+    if transcript.archived and transcript.thread_id:
+        if st.toggle(f"Load {transcript.archived} archived messages", key="chat_show_archived"):
+            older = _archived_entries(transcript.thread_id, transcript.archived) + tuple(older)
+    if not older:
+        return
+    pages = (len(older) + PAGE_SIZE - 1) // PAGE_SIZE
+    page = pages
+    if st.session_state.get("chat_older_page", 0) > pages:  # history was trimmed since
+        st.session_state["chat_older_page"] = pages
+    if pages > 1:
+        # Page 1 is the oldest; the newest page is shown first.
+        page = int(st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=pages,
+                                   key="chat_older_page"))
+    for e in older[(page - 1) * PAGE_SIZE: page * PAGE_SIZE]:
+        with st.expander(e.title):
+            st.markdown(e.markdown)
+    st.divider()
+
+
+def render(transcript: Transcript, turns: Optional[int] = None) -> None:
+    entries = transcript.entries
+    start = window_start(entries, turns)
+    if start or transcript.archived:
+        _show_older(entries[:start], transcript)
+    _show(entries[start:])
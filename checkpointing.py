@@ -0,0 +1,49 @@
+# checkpointing.py
+"""
+Checkpointers for the compiled graph.
+
+Every session is a LangGraph thread (`thread_id`); its state lives in the
+checkpointer, so a turn only sends the new human message (or the reply that
+resumes a confirmation interrupt). The SQLite backend lets a session survive a
+process restart or continue on another worker that shares the file.
+"""
+
+import os
+import sqlite3
+
+from langgraph.checkpoint.memory import InMemorySaver
+
+def make_checkpointer(backend: str = None, path: str = None):
+    """
+    backend: "memory" (default) or "sqlite"; falls back to $CHECKPOINT_BACKEND.
+    path: SQLite file; falls back to $CHECKPOINT_PATH or .cache/checkpoints.sqlite.
+    """
+    backend = (backend or os.getenv("CHECKPOINT_BACKEND", "memory")).lower()
+    if backend == "memory":
+        return InMemorySaver()
+    if backend == "sqlite":
+        from langgraph.checkpoint.sqlite import SqliteSaver
+        path = path or os.getenv("CHECKPOINT_PATH", os.path.join(".cache", "checkpoints.sqlite"))
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return SqliteSaver(conn)
+    raise ValueError(f"Unknown checkpoint backend: {backend!r} (expected 'memory' or 'sqlite')")
+
+async def amake_checkpointer(backend: str = None, path: str = None):
+    """
+    Checkpointer for graphs driven with ainvoke/astream; same arguments as make_checkpointer.
+    Must be called inside the running event loop (the SQLite backend opens an aiosqlite connection).
+    """
+    backend = (backend or os.getenv("CHECKPOINT_BACKEND", "memory")).lower()
+    if backend == "memory":
+        return InMemorySaver()
+    if backend == "sqlite":
+        import aiosqlite
+        from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+        path = path or os.getenv("CHECKPOINT_PATH", os.path.join(".cache", "checkpoints.sqlite"))
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = await aiosqlite.connect(path, timeout=10)
+        await conn.execute("PRAGMA journal_mode=WAL")
+        return AsyncSqliteSaver(conn)
+    raise ValueError(f"Unknown checkpoint backend: {backend!r} (expected 'memory' or 'sqlite')")
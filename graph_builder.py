@@ -1,53 +1,193 @@
 # graph_builder.py
+import logging
+import os
+import threading
+from typing import Any, Optional
+from langchain_core.messages import HumanMessage
+from langchain_core.runnables import RunnableConfig
 from langgraph.graph import StateGraph, START, END
+from langgraph.types import Command, interrupt
 from state import ChatState
-from agents.solution_agent import solution_agent
-from agents.architect_agent import architect_agent
-from agents.analysis_agent import analysis_agent
-from agents.supervisor_agent import supervisor_agent
+from agents.solution_agent import solution_agent, asolution_agent
+from agents.architect_agent import architect_agent, aarchitect_agent
+from agents.analysis_agent import analysis_agent, aanalysis_agent
+from agents.supervisor_agent import supervisor_agent, asupervisor_agent
+from agents.intake_agent import aintake_agent, intake_agent, question_update
+from agents import decompose as decomposition
+from checkpointing import make_checkpointer
+from tracing import traced_node
+from speculation import speculative_supervisor, speculative_worker
+from transcript_archive import aarchive_update, archive_update
+
+logger = logging.getLogger(__name__)
+
+# Load model clients and integrations in the background once the prompt is up.
+PREWARM = os.getenv("STARTUP_PREWARM", "1").lower() not in ("0", "false", "off")
 
 def _route_from_supervisor(state: ChatState) -> str:
     """
     Supervisor writes state['route'] as:
-    'solution_agent' | 'architect_agent' | 'analysis_agent' | 'END' | None
+    'solution_agent' | 'architect_agent' | 'analysis_agent' | 'await_reply' | 'END' | None
     """
     route = state.get("route")
     if route is None:
-        return "supervisor"   # stay on supervisor until we have a decision
+        return "END"   # no decision: end the run rather than spin on the supervisor
     return route
 
-def build_graph():
+def await_reply(state: ChatState, config: RunnableConfig = None):
+    """
+    Pause the run until the user answers the confirmation prompt.
+    The reply arrives as Command(resume=<text>) and is recorded like any human message.
+    """
+    reply = str(interrupt({"phase": state.get("phase"), "awaiting_confirm": True}))
+    return _reply_update(reply, archive_update(state, config))
+
+async def aawait_reply(state: ChatState, config: RunnableConfig = None):
+    """Async twin of await_reply (the archive write, when one is due, leaves the event loop)."""
+    reply = str(interrupt({"phase": state.get("phase"), "awaiting_confirm": True}))
+    return _reply_update(reply, await aarchive_update(state, config))
+
+def _reply_update(reply: str, archived: dict) -> dict:
+    # Removals of archived messages and the new reply go in one messages update.
+    return {**archived, "messages": archived.get("messages", []) + [HumanMessage(content=reply)],
+            "last_user_text": reply.strip(), **question_update(reply.strip(), after_prompt=True)}
+
+def build_graph(checkpointer: Any = None, decompose: Optional[bool] = None):
     """
     Builds the LangGraph workflow with supervisor and worker agents.
     Ensures that control returns to the supervisor after each worker agent's execution.
+    Compiled with a checkpointer (in-memory unless one is given) so sessions are
+    addressed by thread_id and confirmation pauses are real interrupts.
+    Every node is wrapped in a tracing span (see tracing.py).
+    The same compiled graph serves invoke/stream and ainvoke/astream: nodes that
+    do I/O have an async twin.
+    Nodes return only the messages they add; intake and await_reply keep the
+    transcript to a bounded window and archive older turns (transcript_archive.py).
+    With SPECULATIVE_PHASES=1 the next phase is prepared while a confirmation is pending (speculation.py).
+    With decompose (default: $DECOMPOSE_REQUIREMENTS) large requirements are split into
+    sub-problems whose solution/architecture run as parallel branches (agents/decompose.py).
     """
+    if decompose is None:
+        decompose = decomposition.DECOMPOSE_REQUIREMENTS
     g = StateGraph(ChatState)
 
-    g.add_node("supervisor", supervisor_agent)
-    g.add_node("solution_agent", solution_agent)
-    g.add_node("architect_agent", architect_agent)
-    g.add_node("analysis_agent", analysis_agent)
+    workers = {
+        "architect_agent": (architect_agent, aarchitect_agent),
+        "analysis_agent": (analysis_agent, aanalysis_agent),
+    }
+    nodes = {
+        "intake": (intake_agent, aintake_agent),
+        "supervisor": speculative_supervisor(supervisor_agent, asupervisor_agent, workers),
+        "await_reply": (await_reply, aawait_reply),
+        "solution_agent": (solution_agent, asolution_agent),
+        "architect_agent": speculative_worker("architect", *workers["architect_agent"]),
+        "analysis_agent": speculative_worker("analysis", *workers["analysis_agent"]),
+    }
+    if decompose:
+        nodes.update({
+            "solution_map": (decomposition.solution_map, decomposition.asolution_map),
+            "solution_part": (decomposition.solution_part, decomposition.asolution_part),
+            "solution_reduce": (decomposition.solution_reduce, None),
+            "architect_map": (decomposition.architect_map, decomposition.aarchitect_map),
+            "architect_part": (decomposition.architect_part, decomposition.aarchitect_part),
+            "architect_reduce": (decomposition.architect_reduce, None),
+        })
+    # Map nodes route with Command(goto=...): fan out to the branches, or hand a requirement
+    # that didn't split to the regular agent.
+    destinations = {"solution_map": ("solution_part", "solution_agent"),
+                    "architect_map": ("architect_part", "architect_agent")}
+    for name, (fn, afn) in nodes.items():
+        g.add_node(name, traced_node(name, fn, afn), destinations=destinations.get(name))
 
-    # Initial entry point into the graph is the supervisor
-    g.add_edge(START, "supervisor")
+    # Every run starts by recording the new human message, then hands over to the supervisor
+    g.add_edge(START, "intake")
+    g.add_edge("intake", "supervisor")
 
-    # Conditional edges from the supervisor to decide the next agent or end the flow
+    # Conditional edges from the supervisor to decide the next agent, pause for a reply, or end the flow
     g.add_conditional_edges(
         "supervisor",
         _route_from_supervisor,
         {
-            "solution_agent": "solution_agent",
-            "architect_agent": "architect_agent",
+            "solution_agent": "solution_map" if decompose else "solution_agent",
+            "architect_agent": "architect_map" if decompose else "architect_agent",
             "analysis_agent": "analysis_agent",
+            "await_reply": "await_reply",
             "END": END,
-            # If supervisor returns None or an unknown route, loop back to itself
-            "supervisor": "supervisor",
         },
     )
 
-    # After any worker agent completes, return control to the supervisor
+    # After any worker agent completes (or the user replies), return control to the supervisor
+    g.add_edge("await_reply", "supervisor")
     g.add_edge("solution_agent", "supervisor")
     g.add_edge("architect_agent", "supervisor")
     g.add_edge("analysis_agent", "supervisor")
+    if decompose:
+        # All branches of a fan-out run in one step; the reduce node runs once they are done.
+        g.add_edge("solution_part", "solution_reduce")
+        g.add_edge("architect_part", "architect_reduce")
+        g.add_edge("solution_reduce", "supervisor")
+        g.add_edge("architect_reduce", "supervisor")
+
+    return g.compile(checkpointer=checkpointer if checkpointer is not None else make_checkpointer())
+
+def thread_config(thread_id: str, **configurable: Any) -> RunnableConfig:
+    """Run config addressing one session's checkpointed state."""
+    return {"configurable": {"thread_id": thread_id, **configurable}}
+
+def turn_input(graph, config: RunnableConfig, user_text: str):
+    """
+    Input for the next turn of a session: resume the pending confirmation
+    interrupt with the reply, or start a new run with just the new message.
+    """
+    snapshot = graph.get_state(config)
+    if snapshot.interrupts:
+        return Command(resume=user_text)
+    return {"messages": [HumanMessage(content=user_text)]}
+
+async def aturn_input(graph, config: RunnableConfig, user_text: str):
+    """Async `turn_input` (reads the checkpointer without blocking the loop)."""
+    snapshot = await graph.aget_state(config)
+    if snapshot.interrupts:
+        return Command(resume=user_text)
+    return {"messages": [HumanMessage(content=user_text)]}
+
+def session_values(graph, config: RunnableConfig) -> Optional[dict]:
+    """Current checkpointed state of a session (None for a new thread)."""
+    snapshot = graph.get_state(config)
+    return snapshot.values or None
+
+async def asession_values(graph, config: RunnableConfig) -> Optional[dict]:
+    snapshot = await graph.aget_state(config)
+    return snapshot.values or None
+
+def prewarm(background: bool = True) -> Optional[threading.Thread]:
+    """
+    Build what the first turn needs (model clients, tokenizer, search integration,
+    local knowledge index), which are otherwise created on first use. Entry points call this right after
+    showing the prompt, so the work overlaps with the user typing.
+    """
+    def load():
+        try:
+            from llm_config import TIERS, get_llm
+            from agents import analysis_agent
+            from agents.context_builder import count_tokens
+            from tools import local_index
+            from tools.tools import _tavily
+
+            for tier in TIERS:
+                get_llm(tier)
+            count_tokens("warm up")
+            _tavily()
+            if local_index.LOCAL_INDEX_ENABLED:
+                local_index.get_index().load()
+            if analysis_agent.ANALYSIS_MODE == "agent":
+                analysis_agent._agent_imports()
+        except Exception as e:  # the first turn builds it again and reports the error
+            logger.debug("Prewarm failed: %s", e)
 
-    return g.compile()
+    if not background:
+        load()
+        return None
+    thread = threading.Thread(target=load, name="prewarm", daemon=True)
+    thread.start()
+    return thread
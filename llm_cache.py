@@ -0,0 +1,297 @@
+# llm_cache.py
+"""
+Response cache for the chat model.
+
+Exact layer: keyed by a hash of the serialized prompt plus LangChain's `llm_string`
+(deployment, temperature, bound tools...), held in an in-memory LRU in front of a
+SQLite table. Optional semantic layer: reuses an answer when the user-authored part
+of a prompt is a near duplicate (cosine similarity above a threshold) of a cached one
+with the same system/tooling context.
+
+`cache_bypass()` skips lookups (but still stores the fresh answer) for the current
+context; agents use it when the user asked to revise a phase.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+from langchain_core.outputs import Generation
+
+# numpy is optional (pure-Python cosine is fine for small caches) and only the
+# semantic layer uses it, so it is imported on first use rather than at startup.
+_np: Any = None
+
+logger = logging.getLogger(__name__)
+
+_BYPASS: ContextVar[bool] = ContextVar("llm_cache_bypass", default=False)
+
+# Which layer served the last lookup in this context (thread or task); read once by tracing.
+_LAST_HIT: ContextVar[Optional[str]] = ContextVar("llm_cache_last_hit", default=None)
+
+
+def consume_cache_hit() -> Optional[str]:
+    """'memory' | 'disk' | 'semantic' if the last lookup in this context hit, else None; then reset."""
+    hit = _LAST_HIT.get()
+    _LAST_HIT.set(None)
+    return hit
+
+
+@contextmanager
+def cache_bypass(enabled: bool = True):
+    """Within this block, LLM calls skip cache lookups; their results still refresh the cache."""
+    token = _BYPASS.set(bool(enabled) or _BYPASS.get())
+    try:
+        yield
+    finally:
+        _BYPASS.reset(token)
+
+
+def _key(prompt: str, llm_string: str) -> str:
+    return hashlib.sha256(f"{llm_string}\x00{prompt}".encode("utf-8")).hexdigest()
+
+
+def _split_prompt(prompt: str) -> Tuple[str, str]:
+    """Split a serialized prompt into (fixed context, user-authored text) for the semantic layer."""
+    try:
+        messages = json.loads(prompt)
+    except ValueError:
+        return "", prompt
+    if not isinstance(messages, list):
+        return "", prompt
+    fixed, user = [], []
+    for m in messages:
+        kwargs = m.get("kwargs", {}) if isinstance(m, dict) else {}
+        content = kwargs.get("content", "")
+        text = content if isinstance(content, str) else json.dumps(content)
+        kind = (m.get("id") or [""])[-1] if isinstance(m, dict) else ""
+        (user if kind.startswith("Human") else fixed).append(text)
+    return "\n".join(fixed), "\n".join(user)
+
+
+def _numpy():
+    global _np
+    if _np is None:
+        try:
+            import numpy
+            _np = numpy
+        except ImportError:
+            _np = False
+    return _np or None
+
+
+def _cosine(a: Sequence[float], b: Sequence[float]) -> float:
+    np = _numpy()
+    if np is not None:
+        va, vb = np.asarray(a, dtype=float), np.asarray(b, dtype=float)
+        denom = float(np.linalg.norm(va) * np.linalg.norm(vb))
+        return float(va @ vb) / denom if denom else 0.0
+    dot = sum(x * y for x, y in zip(a, b))
+    na = sum(x * x for x in a) ** 0.5
+    nb = sum(y * y for y in b) ** 0.5
+    return dot / (na * nb) if na and nb else 0.0
+
+
+class SemanticLayer:
+    """Near-duplicate lookup over user text, scoped to identical model + fixed prompt context."""
+
+    def __init__(self, embed: Callable[[str], List[float]], threshold: float = 0.95, max_entries: int = 1000):
+        self.embed = embed
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[str, List[float]]]" = OrderedDict()  # key -> (scope, vector)
+        self._lock = threading.Lock()
+
+    def _scope(self, prompt: str, llm_string: str) -> Tuple[str, str]:
+        fixed, user = _split_prompt(prompt)
+        return hashlib.sha256(f"{llm_string}\x00{fixed}".encode("utf-8")).hexdigest(), user
+
+    def nearest(self, prompt: str, llm_string: str) -> Optional[str]:
+        scope, user = self._scope(prompt, llm_string)
+        if not user:
+            return None
+        vector = self.embed(user)
+        best_key, best = None, self.threshold
+        with self._lock:
+            candidates = [(k, v) for k, (s, v) in self._entries.items() if s == scope]
+        for k, v in candidates:
+            score = _cosine(vector, v)
+            if score >= best:
+                best_key, best = k, score
+        return best_key
+
+    def add(self, key: str, prompt: str, llm_string: str) -> None:
+        scope, user = self._scope(prompt, llm_string)
+        if not user:
+            return
+        vector = self.embed(user)
+        with self._lock:
+            self._entries[key] = (scope, vector)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class TieredLLMCache(BaseCache):
+    """In-memory LRU in front of a SQLite store, with an optional semantic layer."""
+
+    def __init__(self, path: str, max_memory_entries: int = 256, max_disk_entries: int = 5000,
+                 semantic: Optional[SemanticLayer] = None):
+        self.path = path
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.semantic = semantic
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "semantic_hits": 0, "misses": 0, "bypassed": 0}
+        self._memory: "OrderedDict[str, Sequence[Generation]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA busy_timeout=10000")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, accessed REAL NOT NULL)"
+            )
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _remember(self, key: str, value: Sequence[Generation]) -> None:
+        with self._lock:
+            self._memory[key] = value
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_memory_entries:
+                self._memory.popitem(last=False)
+
+    def _by_key(self, key: str) -> Optional[Sequence[Generation]]:
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                _LAST_HIT.set("memory")
+                return value
+        try:
+            conn = self._conn()
+            row = conn.execute("SELECT value FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (time.time(), key))
+            value = loads(row[0])
+        except Exception as e:
+            logger.warning("LLM cache read failed: %s", e)
+            return None
+        self.stats["disk_hits"] += 1
+        _LAST_HIT.set("disk")
+        self._remember(key, value)
+        return value
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Generation]]:
+        _LAST_HIT.set(None)
+        if _BYPASS.get():
+            self.stats["bypassed"] += 1
+            return None
+        value = self._by_key(_key(prompt, llm_string))
+        if value is None and self.semantic is not None:
+            try:
+                near = self.semantic.nearest(prompt, llm_string)
+            except Exception as e:
+                logger.warning("Semantic cache lookup failed: %s", e)
+                near = None
+            if near is not None:
+                value = self._by_key(near)
+                if value is not None:
+                    self.stats["semantic_hits"] += 1
+                    _LAST_HIT.set("semantic")
+        if value is None:
+            self.stats["misses"] += 1
+        return value
+
+    async def alookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Generation]]:
+        # SQLite reads and embedding calls stay off the event loop; the hit flag
+        # set in the worker thread is copied back for tracing.
+        ctx = copy_context()
+        value = await asyncio.get_running_loop().run_in_executor(None, ctx.run, self.lookup, prompt, llm_string)
+        _LAST_HIT.set(ctx.get(_LAST_HIT))
+        return value
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Generation]) -> None:
+        key = _key(prompt, llm_string)
+        return_val = list(return_val)
+        self._remember(key, return_val)
+        try:
+            conn = self._conn()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses(key, value, accessed) VALUES (?, ?, ?)",
+                    (key, dumps(return_val), time.time()),
+                )
+                (count,) = conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+                if count > self.max_disk_entries:
+                    conn.execute(
+                        "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY accessed ASC LIMIT ?)",
+                        (count - self.max_disk_entries,),
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        except Exception as e:
+            logger.warning("LLM cache write failed: %s", e)
+        if self.semantic is not None:
+            try:
+                self.semantic.add(key, prompt, llm_string)
+            except Exception as e:
+                logger.warning("Semantic cache update failed: %s", e)
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock:
+            self._memory.clear()
+        self._conn().execute("DELETE FROM responses")
+        if self.semantic is not None:
+            self.semantic.clear()
+
+
+def build_llm_cache() -> Optional[TieredLLMCache]:
+    """Cache configured from the environment (LLM_CACHE=0 disables it)."""
+    if os.getenv("LLM_CACHE", "1").lower() in ("0", "false", "off"):
+        return None
+    semantic = None
+    if os.getenv("LLM_SEMANTIC_CACHE", "0").lower() in ("1", "true", "on"):
+        from langchain_openai import AzureOpenAIEmbeddings
+        embeddings = AzureOpenAIEmbeddings(
+            azure_deployment=os.getenv("AZURE_EMBEDDING_DEPLOYMENT", "text-embedding-3-small"),
+            api_key=os.getenv("AZURE_API_KEY"),
+            azure_endpoint=os.getenv("AZURE_ENDPOINT"),
+            openai_api_version="2024-08-01-preview",
+        )
+        semantic = SemanticLayer(
+            embeddings.embed_query,
+            threshold=float(os.getenv("LLM_SEMANTIC_CACHE_THRESHOLD", "0.95")),
+        )
+    return TieredLLMCache(
+        path=os.getenv("LLM_CACHE_PATH", os.path.join(".cache", "llm_responses.sqlite")),
+        max_memory_entries=int(os.getenv("LLM_CACHE_MAX_MEMORY", "256")),
+        max_disk_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000")),
+        semantic=semantic,
+    )
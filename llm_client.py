@@ -0,0 +1,564 @@
+# llm_client.py
+"""
+Resilient client layer for the Azure chat model.
+
+`ResilientChatModel` is a drop-in chat model that spreads calls over one or more
+Azure OpenAI deployments (possibly on different endpoints/regions):
+
+- Rate limiting: per deployment, a requests-per-minute and a tokens-per-minute
+  token bucket. Calls reserve capacity up front (prompt estimate + expected
+  output) and wait locally instead of collecting 429s; the token reservation is
+  corrected with the real usage afterwards. Both limits adapt: a 429 shrinks the
+  deployment's effective rate, every success grows it back towards the quota.
+- Retry: 429, 408/409, 5xx, timeouts and connection errors are retried with
+  full-jitter exponential backoff, never sooner than the server's Retry-After /
+  retry-after-ms. Streams are only retried before their first chunk.
+- Load balancing and failover: each call goes to the healthy deployment with the
+  lowest (in-flight + 1) x latency (EWMA) score. A failing deployment cools down
+  for its backoff period, so other callers move to the remaining ones; 401/403/404
+  take a deployment out of rotation for DEPLOYMENT_DISABLE_S.
+- Deadline: inside `call_deadline(seconds)` no attempt may run past the deadline;
+  each request's timeout is cut to the time left and no retry starts after it.
+
+Deployments come from AZURE_DEPLOYMENTS (JSON list), e.g.
+    [{"deployment": "gpt-4o", "endpoint": "https://eu.openai.azure.com", "rpm": 300, "tpm": 50000},
+     {"deployment": "gpt-4o", "endpoint": "https://us.openai.azure.com", "api_key_env": "AZURE_API_KEY_US"}]
+and default to the single deployment configured by AZURE_ENDPOINT / AZURE_API_KEY.
+"""
+
+import asyncio
+import email.utils
+import json
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+from urllib.parse import urlparse
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from pydantic import PrivateAttr
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DEPLOYMENT = os.getenv("AZURE_DEPLOYMENT", "gpt-4o")
+DEFAULT_API_VERSION = "2024-08-01-preview"
+DEFAULT_RPM = float(os.getenv("AZURE_RPM", "0"))  # 0 = no local limit
+DEFAULT_TPM = float(os.getenv("AZURE_TPM", "0"))
+MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "6"))
+BACKOFF_BASE_S = float(os.getenv("LLM_BACKOFF_BASE_S", "0.5"))
+BACKOFF_MAX_S = float(os.getenv("LLM_BACKOFF_MAX_S", "30"))
+REQUEST_TIMEOUT_S = float(os.getenv("LLM_TIMEOUT_S", "120"))
+EXPECTED_OUTPUT_TOKENS = int(os.getenv("LLM_EXPECTED_OUTPUT_TOKENS", "800"))
+DEPLOYMENT_DISABLE_S = float(os.getenv("DEPLOYMENT_DISABLE_S", "300"))
+
+THROTTLE_FACTOR = 0.7    # effective rate multiplier after a 429
+RECOVERY_STEP = 0.02     # added back to the multiplier per success
+MIN_SCALE = 0.1
+LATENCY_ALPHA = 0.2      # EWMA weight of the newest sample
+
+# time.monotonic() by which calls made in this context must be over (see call_deadline).
+_DEADLINE: ContextVar[Optional[float]] = ContextVar("llm_call_deadline", default=None)
+
+
+class CallDeadlineExceeded(TimeoutError):
+    pass
+
+
+@contextmanager
+def call_deadline(seconds: Optional[float]):
+    """
+    Calls made in the block (and in threads/tasks started from it, which copy the
+    context) give up once `seconds` have passed; None sets no deadline.
+    """
+    token = _DEADLINE.set(None if seconds is None else time.monotonic() + seconds)
+    try:
+        yield
+    finally:
+        _DEADLINE.reset(token)
+
+
+def _past_deadline() -> bool:
+    deadline = _DEADLINE.get()
+    return deadline is not None and time.monotonic() >= deadline
+BURST_S = float(os.getenv("LLM_RATE_BURST_S", "1"))  # Azure evaluates per-minute quotas over 1-10 s windows
+
+_RETRY_STATUSES = {408, 409, 429}
+_FAILOVER_STATUSES = {401, 403, 404}
+
+
+class TokenBucket:
+    """
+    Reservation-style bucket refilled continuously at `per_minute` x scale, holding
+    at most `burst_s` seconds' worth.
+
+    `reserve(n)` debits immediately (the level may go negative) and returns how
+    long the caller must wait before sending, so concurrent callers queue up in
+    arrival order without holding the lock while they wait.
+    """
+
+    def __init__(self, per_minute: float, burst_s: float = BURST_S):
+        self.per_minute = float(per_minute or 0)
+        self.burst_s = burst_s
+        self.scale = 1.0
+        self._level = self.capacity
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.per_minute > 0
+
+    @property
+    def capacity(self) -> float:
+        return self.per_minute * self.scale * self.burst_s / 60.0
+
+    def _refill(self) -> Tuple[float, float]:
+        now = time.monotonic()
+        capacity = self.capacity
+        rate = self.per_minute * self.scale / 60.0
+        self._level = min(capacity, self._level + (now - self._stamp) * rate)
+        self._stamp = now
+        return capacity, rate
+
+    def reserve(self, amount: float) -> float:
+        if not self.enabled:
+            return 0.0
+        with self._lock:
+            capacity, rate = self._refill()
+            # A single request larger than the whole bucket still goes through, alone.
+            self._level -= min(amount, capacity)
+            return 0.0 if self._level >= 0 else -self._level / rate
+
+    def wait_estimate(self) -> float:
+        """Seconds until the bucket is non-negative again (0 if it is)."""
+        if not self.enabled:
+            return 0.0
+        with self._lock:
+            _, rate = self._refill()
+            return 0.0 if self._level >= 0 else -self._level / rate
+
+    def refund(self, amount: float) -> None:
+        """Give back (or, if negative, take) capacity once the real cost is known."""
+        if not self.enabled or not amount:
+            return
+        with self._lock:
+            capacity, _ = self._refill()
+            self._level = min(capacity, self._level + amount)
+
+    def throttle(self) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self.scale = max(MIN_SCALE, self.scale * THROTTLE_FACTOR)
+            self._level = min(self._level, self.capacity)
+
+    def recover(self) -> None:
+        if self.enabled and self.scale < 1.0:
+            with self._lock:
+                self.scale = min(1.0, self.scale + RECOVERY_STEP)
+
+
+class Deployment:
+    """One Azure deployment: its client, rate limits and health."""
+
+    def __init__(self, name: str, model: BaseChatModel, rpm: float = 0, tpm: float = 0):
+        self.name = name
+        self.model = model
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.cooldown_until = 0.0
+        self.failures = 0
+        self.latency_s = 1.0
+        self.in_flight = 0
+        self.stats = {"calls": 0, "ok": 0, "throttled": 0, "retried": 0, "failed": 0, "tokens": 0}
+
+    def score(self) -> float:
+        wait = max(self.requests.wait_estimate(), self.tokens.wait_estimate())
+        return (self.in_flight + 1) * self.latency_s * (1 + self.failures) + wait
+
+    def reserve(self, tokens: int) -> float:
+        return max(self.requests.reserve(1), self.tokens.reserve(tokens))
+
+
+def _estimate_tokens(messages: Sequence[BaseMessage], kwargs: Dict[str, Any]) -> int:
+    """Rough prompt + completion size for the TPM reservation (corrected after the call)."""
+    prompt = sum(len(str(m.content)) for m in messages) // 4 + 4 * len(messages)
+    if kwargs.get("tools"):
+        prompt += len(json.dumps(kwargs["tools"], default=str)) // 4
+    return prompt + int(kwargs.get("max_tokens") or EXPECTED_OUTPUT_TOKENS)
+
+
+def _usage_tokens(message: Any) -> Optional[int]:
+    usage = getattr(message, "usage_metadata", None)
+    return usage.get("total_tokens") if usage else None
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """Server-requested delay from retry-after-ms / Retry-After (seconds or HTTP date)."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000.0
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            when = email.utils.parsedate_to_datetime(value)
+            return max(0.0, when.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _classify(error: Exception) -> str:
+    """'throttled' | 'retry' | 'failover' | 'fatal'."""
+    import openai  # already loaded by the Azure client that raised
+
+    if isinstance(error, openai.APIConnectionError):  # includes timeouts
+        return "retry"
+    status = getattr(error, "status_code", None)
+    if status == 429:
+        return "throttled"
+    if status in _RETRY_STATUSES or (status is not None and status >= 500):
+        return "retry"
+    if status in _FAILOVER_STATUSES:
+        return "failover"
+    return "fatal"
+
+
+def backoff_delay(failures: int) -> float:
+    """Full-jitter exponential backoff for the n-th consecutive failure."""
+    return random.uniform(0, min(BACKOFF_MAX_S, BACKOFF_BASE_S * 2 ** max(0, failures - 1)))
+
+
+class ResilientChatModel(BaseChatModel):
+    """Rate-limited, retrying, load-balanced front for one or more deployments."""
+
+    max_retries: int = MAX_RETRIES
+    # Sent with every request, so models of different tiers can share deployments.
+    temperature: Optional[float] = None
+    max_tokens: Optional[int] = None
+
+    _deployments: List[Deployment] = PrivateAttr(default_factory=list)
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    def __init__(self, deployments: Sequence[Deployment], **kwargs: Any):
+        super().__init__(**kwargs)
+        if not deployments:
+            raise ValueError("ResilientChatModel needs at least one deployment")
+        self._deployments = list(deployments)
+
+    @property
+    def deployments(self) -> List[Deployment]:
+        return self._deployments
+
+    # Identity follows the primary deployment, so cache keys and trace metadata are
+    # the same whichever deployment serves a call.
+    @property
+    def _llm_type(self) -> str:
+        return self._deployments[0].model._llm_type
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {**self._deployments[0].model._identifying_params, **self._call_kwargs({})}
+
+    def _get_llm_string(self, stop: Optional[List[str]] = None, **kwargs: Any) -> str:
+        return self._deployments[0].model._get_llm_string(stop=stop, **self._call_kwargs(kwargs))
+
+    def _get_ls_params(self, stop: Optional[List[str]] = None, **kwargs: Any):
+        return self._deployments[0].model._get_ls_params(stop=stop, **self._call_kwargs(kwargs))
+
+    def _call_kwargs(self, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        params = {k: v for k, v in (("temperature", self.temperature), ("max_tokens", self.max_tokens)) if v is not None}
+        return {**params, **kwargs}
+
+    def bind_tools(self, tools, **kwargs):
+        # Let the Azure model format the tools, then bind the same kwargs here.
+        bound = self._deployments[0].model.bind_tools(tools, **kwargs)
+        return self.bind(**bound.kwargs)  # type: ignore[attr-defined]
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {d.name: {**d.stats, "latency_ms": round(d.latency_s * 1000, 1),
+                             "rpm_scale": round(d.requests.scale, 2), "tpm_scale": round(d.tokens.scale, 2),
+                             "cooling_down": d.cooldown_until > time.monotonic()}
+                    for d in self._deployments}
+
+    # -- scheduling -------------------------------------------------------------
+
+    def _pick(self, excluded: set, estimate: int) -> Tuple[Deployment, float]:
+        """Choose a deployment and reserve its capacity; returns it and how long to wait first."""
+        with self._lock:
+            now = time.monotonic()
+            candidates = [d for d in self._deployments if d.name not in excluded] or self._deployments
+            ready = [d for d in candidates if d.cooldown_until <= now]
+            if ready:
+                chosen = min(ready, key=lambda d: (d.score(), random.random()))
+                wait = 0.0
+            else:  # everything is cooling down: wait for the first one back, spread out a little
+                chosen = min(candidates, key=lambda d: d.cooldown_until)
+                wait = chosen.cooldown_until - now + random.uniform(0, BACKOFF_BASE_S)
+            chosen.in_flight += 1
+            chosen.stats["calls"] += 1
+        return chosen, max(wait, chosen.reserve(estimate))
+
+    def _succeeded(self, dep: Deployment, elapsed: float, estimate: int, used: Optional[int]) -> None:
+        with self._lock:
+            dep.in_flight -= 1
+            dep.failures = 0
+            dep.latency_s += LATENCY_ALPHA * (elapsed - dep.latency_s)
+            dep.stats["ok"] += 1
+            dep.stats["tokens"] += used or 0
+        dep.requests.recover()
+        dep.tokens.recover()
+        if used is not None:
+            dep.tokens.refund(estimate - used)
+
+    def _bounded(self, dep: Deployment, wait: float) -> Dict[str, Any]:
+        """Request options that end the attempt by the context's deadline (see call_deadline)."""
+        deadline = _DEADLINE.get()
+        if deadline is None:
+            return {}
+        left = deadline - time.monotonic() - wait
+        if left <= 0:
+            with self._lock:
+                dep.in_flight -= 1
+            raise CallDeadlineExceeded("LLM call deadline passed")
+        limit = getattr(dep.model, "request_timeout", None)
+        return {"timeout": min(left, limit) if isinstance(limit, (int, float)) else left}
+
+    def _failed(self, dep: Deployment, error: Exception, attempt: int) -> str:
+        """Update health after a failed attempt; returns the error class."""
+        if _past_deadline():
+            # Cut short by the caller's deadline, not the deployment's fault: no retry, no cooldown.
+            with self._lock:
+                dep.in_flight -= 1
+            return "deadline"
+        kind = _classify(error)
+        now = time.monotonic()
+        with self._lock:
+            dep.in_flight -= 1
+            if kind == "fatal":
+                dep.stats["failed"] += 1
+                return kind
+            if kind == "failover":
+                dep.cooldown_until = now + DEPLOYMENT_DISABLE_S
+                dep.stats["failed"] += 1
+                logger.warning("Deployment %s rejected the call (%s); out of rotation for %.0fs",
+                               dep.name, getattr(error, "status_code", "?"), DEPLOYMENT_DISABLE_S)
+                return kind
+            # Calls already in flight when the deployment started failing report the same
+            # incident: they extend the cooldown but don't escalate backoff or throttling.
+            fresh = dep.cooldown_until <= now
+            if fresh:
+                dep.failures += 1
+            delay = max(backoff_delay(dep.failures), _retry_after(error) or 0.0)
+            dep.cooldown_until = max(dep.cooldown_until, now + delay)
+            dep.stats["throttled" if kind == "throttled" else "retried"] += 1
+        if kind == "throttled" and fresh:
+            dep.requests.throttle()
+            dep.tokens.throttle()
+        logger.info("LLM call on %s failed (%s: %s); attempt %d, cooling down %.2fs",
+                    dep.name, kind, type(error).__name__, attempt + 1, delay)
+        return kind
+
+    def _give_up(self, kind: str, attempt: int, excluded: set) -> bool:
+        if kind in ("fatal", "deadline") or attempt >= self.max_retries:
+            return True
+        return kind == "failover" and len(excluded) >= len(self._deployments)
+
+    # -- calls ------------------------------------------------------------------
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        kwargs = self._call_kwargs(kwargs)
+        estimate = _estimate_tokens(messages, kwargs)
+        excluded: set = set()
+        for attempt in range(self.max_retries + 1):
+            dep, wait = self._pick(excluded, estimate)
+            bounded = self._bounded(dep, wait)
+            if wait:
+                time.sleep(wait)
+            start = time.monotonic()
+            try:
+                result = dep.model._generate(messages, stop=stop, run_manager=run_manager, **kwargs, **bounded)
+            except Exception as e:
+                kind = self._failed(dep, e, attempt)
+                if kind == "failover":
+                    excluded.add(dep.name)
+                if self._give_up(kind, attempt, excluded):
+                    raise
+                continue
+            message = result.generations[0].message if result.generations else None
+            self._succeeded(dep, time.monotonic() - start, estimate, _usage_tokens(message))
+            return result
+        raise RuntimeError("unreachable")
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Optional[AsyncCallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        kwargs = self._call_kwargs(kwargs)
+        estimate = _estimate_tokens(messages, kwargs)
+        excluded: set = set()
+        for attempt in range(self.max_retries + 1):
+            dep, wait = self._pick(excluded, estimate)
+            bounded = self._bounded(dep, wait)
+            if wait:
+                await asyncio.sleep(wait)
+            start = time.monotonic()
+            try:
+                result = await dep.model._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs, **bounded)
+            except asyncio.CancelledError:
+                with self._lock:
+                    dep.in_flight -= 1
+                raise
+            except Exception as e:
+                kind = self._failed(dep, e, attempt)
+                if kind == "failover":
+                    excluded.add(dep.name)
+                if self._give_up(kind, attempt, excluded):
+                    raise
+                continue
+            message = result.generations[0].message if result.generations else None
+            self._succeeded(dep, time.monotonic() - start, estimate, _usage_tokens(message))
+            return result
+        raise RuntimeError("unreachable")
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        kwargs = self._call_kwargs(kwargs)
+        estimate = _estimate_tokens(messages, kwargs)
+        excluded: set = set()
+        for attempt in range(self.max_retries + 1):
+            dep, wait = self._pick(excluded, estimate)
+            bounded = self._bounded(dep, wait)
+            if wait:
+                time.sleep(wait)
+            start = time.monotonic()
+            used, started = None, False
+            try:
+                for chunk in dep.model._stream(messages, stop=stop, run_manager=run_manager, **kwargs, **bounded):
+                    started = True
+                    used = _usage_tokens(chunk.message) or used
+                    yield chunk
+            except GeneratorExit:
+                with self._lock:
+                    dep.in_flight -= 1
+                raise
+            except Exception as e:
+                kind = self._failed(dep, e, attempt)
+                if kind == "failover":
+                    excluded.add(dep.name)
+                # Tokens already reached the caller: retrying would duplicate them.
+                if started or self._give_up(kind, attempt, excluded):
+                    raise
+                continue
+            self._succeeded(dep, time.monotonic() - start, estimate, used)
+            return
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+                       **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        kwargs = self._call_kwargs(kwargs)
+        estimate = _estimate_tokens(messages, kwargs)
+        excluded: set = set()
+        for attempt in range(self.max_retries + 1):
+            dep, wait = self._pick(excluded, estimate)
+            bounded = self._bounded(dep, wait)
+            if wait:
+                await asyncio.sleep(wait)
+            start = time.monotonic()
+            used, started = None, False
+            try:
+                async for chunk in dep.model._astream(messages, stop=stop, run_manager=run_manager, **kwargs, **bounded):
+                    started = True
+                    used = _usage_tokens(chunk.message) or used
+                    yield chunk
+            except (GeneratorExit, asyncio.CancelledError):
+                with self._lock:
+                    dep.in_flight -= 1
+                raise
+            except Exception as e:
+                kind = self._failed(dep, e, attempt)
+                if kind == "failover":
+                    excluded.add(dep.name)
+                if started or self._give_up(kind, attempt, excluded):
+                    raise
+                continue
+            self._succeeded(dep, time.monotonic() - start, estimate, used)
+            return
+
+
+def load_deployment_specs(deployment: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    AZURE_DEPLOYMENTS entries with defaults filled in from the single-deployment settings.
+
+    `deployment` overrides them: a JSON list in the same format, or a deployment name
+    to use on every configured endpoint. A different deployment has its own quota, so
+    the entries' names and rpm/tpm limits don't carry over to it.
+    """
+    if deployment and deployment.lstrip().startswith(("[", "{")):
+        specs = json.loads(deployment)
+    else:
+        raw = os.getenv("AZURE_DEPLOYMENTS")
+        specs = json.loads(raw) if raw else [{}]
+    if isinstance(specs, dict):
+        specs = [specs]
+    if deployment and not deployment.lstrip().startswith(("[", "{")):
+        specs = [spec if spec.get("deployment", DEFAULT_DEPLOYMENT) == deployment else
+                 {**{k: v for k, v in spec.items() if k not in ("name", "rpm", "tpm")}, "deployment": deployment}
+                 for spec in specs]
+    filled = []
+    for spec in specs:
+        endpoint = spec.get("endpoint") or os.getenv("AZURE_ENDPOINT")
+        deployment = spec.get("deployment", DEFAULT_DEPLOYMENT)
+        filled.append({
+            "name": spec.get("name") or f"{deployment}@{urlparse(endpoint or '').hostname or 'default'}",
+            "deployment": deployment,
+            "endpoint": endpoint,
+            "api_key": os.getenv(spec.get("api_key_env", "AZURE_API_KEY")),
+            "api_version": spec.get("api_version", DEFAULT_API_VERSION),
+            "rpm": float(spec.get("rpm", DEFAULT_RPM)),
+            "tpm": float(spec.get("tpm", DEFAULT_TPM)),
+        })
+    return filled
+
+
+# Deployments by (name, endpoint, deployment), shared by every model built in this process so that their
+# rate limits and health reflect all the traffic they get.
+_POOL: Dict[Tuple[str, str, str], Deployment] = {}
+_POOL_LOCK = threading.Lock()
+
+
+def _deployment(spec: Dict[str, Any], timeout: float) -> Deployment:
+    from langchain_openai import AzureChatOpenAI
+
+    key = (spec["name"], spec["endpoint"], spec["deployment"])
+    with _POOL_LOCK:
+        dep = _POOL.get(key)
+        if dep is None:
+            # Retries are ours: the SDK must surface every failure immediately.
+            model = AzureChatOpenAI(azure_deployment=spec["deployment"], api_key=spec["api_key"],
+                                    azure_endpoint=spec["endpoint"], openai_api_version=spec["api_version"],
+                                    max_retries=0, timeout=timeout)
+            dep = _POOL[key] = Deployment(spec["name"], model, spec.get("rpm", 0), spec.get("tpm", 0))
+        return dep
+
+
+def build_chat_model(specs: Optional[List[Dict[str, Any]]] = None, temperature: Optional[float] = 0.2,
+                     max_tokens: Optional[int] = None, timeout: float = REQUEST_TIMEOUT_S,
+                     max_retries: int = MAX_RETRIES, **kwargs: Any) -> ResilientChatModel:
+    """ResilientChatModel over `specs` (default: load_deployment_specs()); kwargs go to the outer model (e.g. cache)."""
+    deployments = [_deployment(spec, timeout) for spec in specs or load_deployment_specs()]
+    return ResilientChatModel(deployments, temperature=temperature, max_tokens=max_tokens,
+                              max_retries=max_retries, **kwargs)
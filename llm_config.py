@@ -1,8 +1,81 @@
-from langchain_openai import AzureChatOpenAI
 import os
+import threading
 from dotenv import load_dotenv
-load_dotenv()
+load_dotenv()  # before the client modules read their settings
 
-llm = AzureChatOpenAI(azure_deployment="gpt-4o", temperature=float(0.2), api_key=os.getenv("AZURE_API_KEY"), azure_endpoint=os.getenv("AZURE_ENDPOINT"), openai_api_version="2024-08-01-preview")
+import cassettes
+from llm_cache import build_llm_cache
+from llm_client import DEFAULT_DEPLOYMENT, build_chat_model, load_deployment_specs
 
-TAVILY_API_KEY = os.getenv("TAVILY_API_KEY")
\ No newline at end of file
+SMALL_DEPLOYMENT = os.getenv("AZURE_SMALL_DEPLOYMENT") or DEFAULT_DEPLOYMENT
+
+# Model tiers: each call site picks one. Classification, rewriting and research
+# planning are short, low-stakes calls that a small, fast deployment handles;
+# user-facing answers stay on the main one. LLM_TIER_<NAME> overrides a tier's
+# deployment (a name, or a JSON list like AZURE_DEPLOYMENTS) and
+# LLM_TIER_<NAME>_MAX_TOKENS its output cap.
+TIERS = {
+    "router": {"deployment": SMALL_DEPLOYMENT, "temperature": 0.0, "max_tokens": 64},
+    "rewrite": {"deployment": SMALL_DEPLOYMENT, "temperature": 0.0, "max_tokens": 1024},
+    "research": {"deployment": SMALL_DEPLOYMENT, "temperature": 0.0, "max_tokens": 512},
+    "generate": {"deployment": DEFAULT_DEPLOYMENT, "temperature": 0.2, "max_tokens": None},
+}
+
+# Models are built on first use, not at import: the Azure client and its openai
+# dependency are a large share of startup time.
+# Responses are cached (memory LRU + SQLite, optional semantic layer); see llm_cache.py.
+# Calls are rate limited, retried and spread over the configured deployments; see llm_client.py.
+# CASSETTE_MODE=record|replay records or replays every call; see cassettes.py.
+# Tiers whose responses are cached. "generate" (temperature 0.2, streamed answers) is opt-in:
+# a cached answer comes back at once, unstreamed, where the user expects a fresh one.
+CACHED_TIERS = {t.strip() for t in os.getenv("LLM_CACHE_TIERS", "router,rewrite,research").split(",") if t.strip()}
+_CACHE = None
+_MODELS = {}
+_MODELS_LOCK = threading.RLock()
+
+
+def _cache():
+    global _CACHE
+    with _MODELS_LOCK:
+        if _CACHE is None:
+            _CACHE = build_llm_cache() or False  # False: disabled, don't look again
+    return _CACHE or None
+
+
+def _build_tier(tier: str):
+    if cassettes.MODE == "replay":
+        return cassettes.wrap_model(None, tier)  # answers come from the cassette; nothing to connect to
+    settings = TIERS[tier]
+    max_tokens = os.getenv(f"LLM_TIER_{tier.upper()}_MAX_TOKENS")
+    model = build_chat_model(
+        load_deployment_specs(os.getenv(f"LLM_TIER_{tier.upper()}") or settings["deployment"]),
+        temperature=settings["temperature"],
+        max_tokens=int(max_tokens) if max_tokens else settings["max_tokens"],
+        # Not under a cassette: a cache hit would not be recorded.
+        cache=_cache() if cassettes.MODE == "off" and tier in CACHED_TIERS else None,
+        metadata={"llm_tier": tier},  # lets tracing attribute calls to their tier
+    )
+    return cassettes.wrap_model(model, tier)
+
+
+def get_llm(tier: str = "generate"):
+    """The chat model for a tier (built once per process)."""
+    model = _MODELS.get(tier)
+    if model is None:
+        if tier not in TIERS:
+            raise ValueError(f"Unknown model tier {tier!r}; expected one of {sorted(TIERS)}")
+        with _MODELS_LOCK:
+            model = _MODELS.get(tier)
+            if model is None:
+                model = _MODELS[tier] = _build_tier(tier)
+    return model
+
+
+def __getattr__(name: str):
+    # `from llm_config import llm` keeps working; the model is built on that first access.
+    if name == "llm":
+        return get_llm("generate")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+TAVILY_API_KEY = os.getenv("TAVILY_API_KEY")
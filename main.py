@@ -1,21 +1,31 @@
 # main.py
-from graph_builder import build_graph
-from state import ChatState
-from langchain_core.messages import HumanMessage, AIMessage
+import argparse
+import uuid
+import profiling
+from graph_builder import PREWARM, build_graph, prewarm, thread_config, turn_input, session_values
+from checkpointing import make_checkpointer
+from streaming import stream_turn
+from tracing import VERBOSE, configure_logging
 
-def run_chatbot():
-    graph = build_graph()
+def run_chatbot(thread_id: str = None, checkpoint_backend: str = None):
+    graph = build_graph(checkpointer=make_checkpointer(checkpoint_backend))
+    thread_id = thread_id or uuid.uuid4().hex
+    config = thread_config(thread_id)
 
-    state: ChatState = {
-        "messages": [],
-        "phase": "start",
-        "awaiting_confirm": False,
-        "route": None,
-        "last_printed_ai_messages": []
-    }
+    # Resuming an existing session: its state comes from the checkpointer.
+    state = session_values(graph, config) or {"phase": "start", "awaiting_confirm": False, "route": None}
+    # Messages shown so far, counting those archived out of the state (transcript_archive.py);
+    # only newer messages are printed.
+    printed_upto = (state.get("archived_messages") or 0) + len(state.get("messages", []))
 
     print("\n--- Chatbot Started ---")
-    print("Hello! I'm here to help you with step by step guide for everything. What's your requirement?")
+    print(f"Session: {thread_id}")
+    if printed_upto:
+        print(f"Resumed session in phase '{state.get('phase')}' with {printed_upto} messages.")
+    else:
+        print("Hello! I'm here to help you with step by step guide for everything. What's your requirement?")
+    if PREWARM:
+        prewarm()  # model clients and integrations load while the user types
 
     while True:
         # If awaiting confirmation, the supervisor already printed a question.
@@ -23,41 +33,62 @@ def run_chatbot():
         prompt = "User (reply to confirmation): " if state.get("awaiting_confirm") else "User: "
         user_input = input(prompt)
 
-        # Append user's message to the state
-        state["messages"].append(HumanMessage(content=user_input))
+        if VERBOSE:
+            print(f"\n--- State before invoke ---")
+            print(f"Phase: {state.get('phase')}, Awaiting Confirm: {state.get('awaiting_confirm')}, Route: {state.get('route')}")
+            print(f"Last User Message: {user_input}")
+            print("--------------------------")
 
-        # Debugging: Print state before invocation
-        print(f"\n--- State before invoke ---")
-        print(f"Phase: {state['phase']}, Awaiting Confirm: {state['awaiting_confirm']}, Route: {state['route']}")
-        print(f"Last User Message: {user_input}")
-        print("--------------------------")
+        # Only the new message (or the reply resuming a confirmation pause) is sent;
+        # the rest of the session state is in the checkpointer.
+        graph_input = turn_input(graph, config, user_input)
 
-        # Stream the graph to see tool calls / steps in real time
+        # Stream the graph: print answer tokens as they arrive, then any
+        # non-streamed AI messages (supervisor prompts) added during this turn.
         latest_state = None
-        for event in graph.stream(state):
-            latest_state = event
-            # Show incremental AI messages
-            if "messages" in event:
-                for msg in reversed(event["messages"]):
-                    if msg.type == "ai" and msg not in state.get("last_printed_ai_messages", []):
-                        print("🤖", msg.content)
-                        break
-
-        # Merge updates rather than replacing entire dict
-        if latest_state:
-            state.update(latest_state)
+        streamed = {}
+        current_id = None
+        with profiling.profile_turn(thread_id, user_input) as profile:
+            for kind, payload in stream_turn(graph, graph_input, config):
+                if kind == "token":
+                    msg_id, text = payload
+                    if msg_id != current_id:
+                        print("\n🤖 ", end="")
+                        current_id = msg_id
+                    streamed[msg_id] = streamed.get(msg_id, "") + text
+                    print(text, end="", flush=True)
+                else:
+                    latest_state = payload
+        if streamed:
+            print()
 
-        # Track printed AI messages to avoid duplicates
-        state["last_printed_ai_messages"] = [m for m in state["messages"] if m.type == "ai"]
+        if latest_state:
+            streamed_texts = set(streamed.values())
+            archived = latest_state.get("archived_messages") or 0
+            for msg in latest_state["messages"][max(0, printed_upto - archived):]:
+                if msg.type == "ai" and msg.content not in streamed_texts:
+                    print("🤖", msg.content)
+            state = latest_state
+            printed_upto = archived + len(state["messages"])
 
-        # Debugging: Print state after invocation
-        print(f"\n--- State after invoke ---")
-        print(f"Phase: {state['phase']}, Awaiting Confirm: {state['awaiting_confirm']}, Route: {state['route']}")
-        print("--------------------------")
+        if VERBOSE:
+            print(f"\n--- State after invoke ---")
+            print(f"Phase: {state.get('phase')}, Awaiting Confirm: {state.get('awaiting_confirm')}, Route: {state.get('route')}")
+            print("--------------------------")
+        if profile:
+            print(f"⏱ Profiled {profile['summary']}")
 
         if state.get("phase") == "done":
             print("✅ Flow complete. Thank you for using the chatbot!")
             break
 
 if __name__ == "__main__":
-    run_chatbot()
+    parser = argparse.ArgumentParser(description="Solution Architect CLI")
+    parser.add_argument("--thread-id", help="resume (or name) a session")
+    parser.add_argument("--checkpointer", choices=["memory", "sqlite"], help="session store (default: $CHECKPOINT_BACKEND or memory)")
+    parser.add_argument("--profile", action="store_true", help="profile each turn's CPU and memory (see profiling.py)")
+    args = parser.parse_args()
+    if args.profile:
+        profiling.PROFILE_TURNS = True
+    configure_logging()
+    run_chatbot(thread_id=args.thread_id, checkpoint_backend=args.checkpointer)
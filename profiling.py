@@ -0,0 +1,304 @@
+# profiling.py
+"""
+On-demand CPU and memory profiling of chat turns (PROFILE_TURNS=1, or `--profile`).
+
+`profile_turn()` wraps one turn (main.py, app.py). While it runs, a sampler thread
+reads every thread's stack each PROFILE_INTERVAL_MS and charges it the CPU time the
+thread used since the previous sample (idle and network-bound threads cost nothing).
+Each sample is attributed to the graph node on its stack (tracing.traced_node), or,
+in a pool or `to_thread` worker, to the node that submitted the work; the rest is
+"(outside nodes)": the graph runtime (checkpointing, reducers, scheduling) and
+anything else the process does meanwhile, such as prewarm imports. tracemalloc
+runs from the first profiled turn on; node spans then carry the memory they
+allocated.
+
+Each turn writes PROFILE_DIR/<session>/turn-NNNN.txt (CPU by node, top functions
+by self and total CPU, memory growth and peak, per-node allocations and the top
+allocation sites that grew since the previous turn) and turn-NNNN.folded
+(collapsed stacks for flamegraph.pl / speedscope). Only one turn is profiled at a
+time; concurrent turns run unprofiled.
+"""
+
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import tracing
+from tracing import CURRENT_NODE
+
+logger = logging.getLogger(__name__)
+
+PROFILE_TURNS = os.getenv("PROFILE_TURNS", "0").lower() in ("1", "true", "on")
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(".cache", "profiles"))
+INTERVAL_S = float(os.getenv("PROFILE_INTERVAL_MS", "5")) / 1000
+MALLOC_FRAMES = int(os.getenv("PROFILE_MALLOC_FRAMES", "1"))
+TOP = int(os.getenv("PROFILE_TOP", "15"))
+MAX_DEPTH = 128
+RUNTIME = "(outside nodes)"
+
+_ACTIVE = threading.Lock()
+# Turns profiled per session (the last few sessions), and the heap at the end of the
+# last profiled turn, which the next turn's allocations are compared with.
+_TURNS: "OrderedDict[str, int]" = OrderedDict()
+_MAX_SESSIONS = 64
+_LAST_SITES: Optional[Dict[str, Tuple[int, int]]] = None
+_NODE_CODES: frozenset = frozenset()
+_WORKER_RUN = os.path.join("concurrent", "futures", "thread.py")
+# A thread whose innermost Python frame is here is blocked, not computing.
+_IDLE_FILES = (_WORKER_RUN, os.path.join("concurrent", "futures", "_base.py"), "threading.py", "queue.py",
+               "selectors.py")
+# CPU of a thread seen only while blocked: work that started and finished between two samples.
+_BETWEEN_SAMPLES = [("", 0, "(work finished between samples)")]
+
+
+def _node_codes() -> frozenset:
+    """Code objects of traced_node's wrappers; their frames hold the node's name."""
+    global _NODE_CODES
+    if not _NODE_CODES:
+        probe = tracing.traced_node("probe", lambda state: state, lambda state: state)
+        _NODE_CODES = frozenset({probe.func.__code__, probe.afunc.__code__})
+    return _NODE_CODES
+
+
+def _worker_node(frame) -> Optional[str]:
+    # Pool and to_thread work items run `partial(context.run, fn)`; the context is the submitter's.
+    try:
+        context = frame.f_locals["self"].fn.func.__self__
+        return context.get(CURRENT_NODE)
+    except (AttributeError, KeyError, TypeError):
+        return None
+
+
+def _stack(frame) -> Tuple[Optional[str], List[Tuple[str, int, str]]]:
+    """(node, frames leaf first) of one thread's stack."""
+    codes = _node_codes()
+    node, frames = None, []
+    while frame is not None and len(frames) < MAX_DEPTH:
+        code = frame.f_code
+        frames.append((code.co_filename, code.co_firstlineno, code.co_name))
+        if node is None:
+            if code in codes:
+                node = frame.f_locals.get("name")
+            elif code.co_name == "run" and code.co_filename.endswith(_WORKER_RUN):
+                node = _worker_node(frame)
+        frame = frame.f_back
+    return node, frames
+
+
+def _unwait(frames: List[Tuple[str, int, str]]) -> List[Tuple[str, int, str]]:
+    """The stack without its blocking frames, so the code that waited gets the CPU."""
+    for i, site in enumerate(frames):
+        if not site[0].endswith(_IDLE_FILES):
+            return frames[i:]
+    return _BETWEEN_SAMPLES
+
+
+def _label(site: Tuple[str, int, str]) -> str:
+    filename, line, name = site
+    return f"{name} ({os.path.basename(filename)}:{line})" if filename else name
+
+
+class _Sampler:
+    """Samples every other thread's stack, weighted by the CPU time that thread used."""
+
+    def __init__(self, interval_s: float):
+        self.interval_s = interval_s
+        self.by_node: Counter = Counter()
+        self.self_cpu: Counter = Counter()
+        self.total_cpu: Counter = Counter()
+        self.folded: Counter = Counter()
+        self.samples = 0
+        self._clocks: Dict[int, Optional[int]] = {}
+        self._cpu: Dict[int, float] = {}
+        self._last: Dict[int, Tuple[Optional[str], List[Tuple[str, int, str]]]] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="turn-profiler", daemon=True)
+
+    def _thread_cpu(self, ident: int) -> Optional[float]:
+        if ident not in self._clocks:
+            try:
+                self._clocks[ident] = time.pthread_getcpuclockid(ident)
+            except (AttributeError, OSError):  # not on this platform: weigh samples by wall time
+                self._clocks[ident] = None
+        clock = self._clocks[ident]
+        if clock is None:
+            return None
+        try:
+            return time.clock_gettime(clock)
+        except OSError:  # the thread has exited
+            return None
+
+    def start(self) -> None:
+        for ident in sys._current_frames():
+            cpu = self._thread_cpu(ident)
+            if cpu is not None:
+                self._cpu[ident] = cpu
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval_s):
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                cpu = self._thread_cpu(ident)
+                if cpu is None:
+                    weight = self.interval_s
+                else:
+                    # A thread first seen now started during the turn: all its CPU time is the turn's.
+                    weight, self._cpu[ident] = cpu - self._cpu.get(ident, 0.0), cpu
+                if weight <= 0:
+                    continue
+                node, frames = _stack(frame)
+                if frames[0][0].endswith(_IDLE_FILES):
+                    # The sampler mostly gets the GIL when a thread blocks, so CPU a thread used
+                    # since the last sample often shows up on a wait; charge it to where the
+                    # thread was last seen running instead.
+                    node, frames = self._last.pop(ident, None) or (node, _unwait(frames))
+                else:
+                    self._last[ident] = (node, frames)
+                node = node or RUNTIME
+                self.samples += 1
+                self.by_node[node] += weight
+                self.self_cpu[frames[0]] += weight
+                for site in set(frames):
+                    self.total_cpu[site] += weight
+                self.folded[";".join([node] + [f[2] for f in reversed(frames)])] += weight
+
+
+def _sites() -> Dict[str, Tuple[int, int]]:
+    """Traced memory by allocation site: {"file:line": (bytes, blocks)}."""
+    own = (tracemalloc.__file__, __file__)
+    sites = {}
+    for stat in tracemalloc.take_snapshot().statistics("lineno"):
+        frame = stat.traceback[0]
+        if frame.filename not in own:
+            sites[f"{frame.filename}:{frame.lineno}"] = (stat.size, stat.count)
+    return sites
+
+
+def _growth(sites: Dict[str, Tuple[int, int]], previous: Dict[str, Tuple[int, int]]) -> List[Tuple[str, int, int, int]]:
+    """(site, bytes grown, blocks grown, bytes now) for the sites that grew, most first."""
+    grown = []
+    for site, (size, count) in sites.items():
+        before = previous.get(site, (0, 0))
+        if size > before[0]:
+            grown.append((site, size - before[0], count - before[1], size))
+    return sorted(grown, key=lambda g: -g[1])
+
+
+def _session_dir(session: str) -> str:
+    safe = re.sub(r"[^A-Za-z0-9_.-]", "_", session)[:80] or "session"
+    path = os.path.join(PROFILE_DIR, safe)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _table(rows: List[Tuple[str, ...]], headers: Tuple[str, ...]) -> List[str]:
+    widths = [max(len(str(r[i])) for r in [headers] + rows) for i in range(len(headers))]
+    fmt = lambda r: "  ".join(str(v).ljust(w) if i == 0 else str(v).rjust(w) for i, (v, w) in enumerate(zip(r, widths)))
+    return [fmt(headers)] + [fmt(r) for r in rows]
+
+
+def _report(turn: int, text: str, wall_s: float, cpu_s: float, sampler: _Sampler, spans: List[Dict[str, Any]],
+            memory: Dict[str, int], growth: List[Tuple[str, int, int, int]]) -> str:
+    sampled = sum(sampler.by_node.values()) or 1e-9
+    node_spans: Dict[str, List[float]] = {}
+    for s in spans:
+        if s.get("kind") == "node":
+            entry = node_spans.setdefault(s["name"], [0, 0.0, 0.0])
+            entry[0] += 1
+            entry[1] += s.get("duration_ms", 0.0)
+            entry[2] += s.get("alloc_kb") or 0.0
+    nodes = sorted(set(sampler.by_node) | set(node_spans), key=lambda n: -sampler.by_node.get(n, 0.0))
+    lines = [f"turn {turn}: {text[:80]!r}",
+             f"wall {wall_s * 1000:.0f} ms, process CPU {cpu_s * 1000:.0f} ms, sampled CPU {sampled * 1000:.0f} ms "
+             f"({sampler.samples} samples every {sampler.interval_s * 1000:g} ms)", "", "## CPU and memory by node"]
+    lines += _table([(n, node_spans.get(n, [0])[0], f"{node_spans.get(n, [0, 0.0])[1]:.0f}",
+                      f"{sampler.by_node.get(n, 0.0) * 1000:.1f}", f"{sampler.by_node.get(n, 0.0) / sampled:.0%}",
+                      f"{node_spans.get(n, [0, 0.0, 0.0])[2]:+.0f}") for n in nodes],
+                    ("node", "runs", "wall ms", "cpu ms", "cpu", "alloc KB"))
+    for title, counter in (("self", sampler.self_cpu), ("total", sampler.total_cpu)):
+        lines += ["", f"## Top functions by {title} CPU"]
+        lines += _table([(_label(site), f"{cpu * 1000:.1f}", f"{cpu / sampled:.0%}")
+                         for site, cpu in counter.most_common(TOP)], ("function", "cpu ms", "share"))
+    lines += ["", "## Memory (tracemalloc)",
+              f"traced now {memory['current'] / 1024:.0f} KB, grew {memory['growth'] / 1024:+.0f} KB this turn, "
+              f"peak {memory['peak'] / 1024:.0f} KB", "", "## Top allocation sites, growth since the previous profiled turn"]
+    lines += _table([(site, f"{grown / 1024:+.1f}", f"{blocks:+d}", f"{size / 1024:.1f}")
+                     for site, grown, blocks, size in growth[:TOP]], ("site", "KB", "blocks", "total KB"))
+    return "\n".join(lines) + "\n"
+
+
+class _SpanCollector:
+    def __init__(self):
+        self.spans: List[Dict[str, Any]] = []
+
+    def emit(self, span: Dict[str, Any]) -> None:
+        self.spans.append(span)
+
+
+@contextmanager
+def profile_turn(session: str, text: str = "") -> Iterator[Dict[str, Any]]:
+    """
+    Profile the block as one turn of `session` when PROFILE_TURNS is on. The yielded
+    dict gets "path" (the report) and "summary" (one line) when the block ends.
+    """
+    global _LAST_SITES
+    result: Dict[str, Any] = {}
+    if not PROFILE_TURNS or not _ACTIVE.acquire(blocking=False):
+        yield result
+        return
+    try:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(MALLOC_FRAMES)
+            _LAST_SITES = None
+        # Just started, tracemalloc has little to snapshot: the first turn is compared with that.
+        previous = _sites() if _LAST_SITES is None else _LAST_SITES
+        tracemalloc.reset_peak()
+        start_mem = tracemalloc.get_traced_memory()[0]
+        collector = _SpanCollector()
+        tracing.add_sink(collector)
+        sampler = _Sampler(INTERVAL_S)
+        t0, cpu0 = time.perf_counter(), time.process_time()
+        sampler.start()
+        try:
+            yield result
+        finally:
+            sampler.stop()
+            wall_s, cpu_s = time.perf_counter() - t0, time.process_time() - cpu0
+            tracing.remove_sink(collector)
+            current, peak = tracemalloc.get_traced_memory()
+            _LAST_SITES = sites = _sites()
+            turn = _TURNS.pop(session, 0) + 1
+            _TURNS[session] = turn
+            while len(_TURNS) > _MAX_SESSIONS:
+                _TURNS.popitem(last=False)
+            growth = _growth(sites, previous)
+            report = _report(turn, text, wall_s, cpu_s, sampler, collector.spans,
+                             {"current": current, "peak": peak, "growth": current - start_mem}, growth)
+            directory = _session_dir(session)
+            path = os.path.join(directory, f"turn-{turn:04d}.txt")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(report)
+            with open(os.path.join(directory, f"turn-{turn:04d}.folded"), "w", encoding="utf-8") as f:
+                f.writelines(f"{stack} {max(1, round(cpu * 1e6))}\n" for stack, cpu in sampler.folded.items())
+            hot = [(n, cpu) for n, cpu in sampler.by_node.most_common() if n != RUNTIME][:1]
+            share = f", {hot[0][0]} {hot[0][1] / (sum(sampler.by_node.values()) or 1):.0%} of CPU" if hot else ""
+            result["path"] = path
+            result["summary"] = (f"turn {turn}: {wall_s * 1000:.0f} ms wall, {cpu_s * 1000:.0f} ms CPU{share}, "
+                                 f"{(current - start_mem) / 1024:+.0f} KB -> {path}")
+            logger.info("Profiled %s", result["summary"])
+    finally:
+        _ACTIVE.release()
@@ -0,0 +1,128 @@
+# service.py
+"""
+Async session service: many concurrent conversations on one event loop.
+
+`SessionService` drives the compiled graph with astream, one session per
+thread_id; turns of the same session are serialized, turns of different
+sessions interleave while they wait on the model and the research tools.
+
+Run as a small line-delimited JSON server (no web framework needed):
+
+    python service.py --port 8765 --checkpointer sqlite
+
+Each request line is {"thread_id": "...", "text": "..."} (thread_id optional:
+a new one is created). The reply is a stream of lines:
+    {"event": "token", "id": <message id>, "text": "..."}
+    {"event": "done", "thread_id": ..., "phase": ..., "awaiting_confirm": ..., "replies": [...]}
+or {"event": "error", "error": "..."}.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import uuid
+import weakref
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+from graph_builder import aturn_input, asession_values, build_graph, thread_config
+from checkpointing import amake_checkpointer
+from streaming import astream_turn
+
+logger = logging.getLogger(__name__)
+
+MAX_CONCURRENT_TURNS = int(os.getenv("SERVICE_MAX_CONCURRENT_TURNS", "256"))
+
+
+class SessionService:
+    """Multiplexes conversations over one compiled graph on the current event loop."""
+
+    def __init__(self, graph, max_concurrent_turns: int = MAX_CONCURRENT_TURNS):
+        self.graph = graph
+        self._slots = asyncio.Semaphore(max_concurrent_turns)
+        # A session's lock lives as long as some turn holds or waits on it.
+        self._locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+    @classmethod
+    async def create(cls, checkpoint_backend: Optional[str] = None, **kwargs) -> "SessionService":
+        return cls(build_graph(checkpointer=await amake_checkpointer(checkpoint_backend)), **kwargs)
+
+    def _lock(self, thread_id: str) -> asyncio.Lock:
+        lock = self._locks.get(thread_id)
+        if lock is None:
+            lock = self._locks[thread_id] = asyncio.Lock()
+        return lock
+
+    async def stream(self, thread_id: str, text: str) -> AsyncIterator[Tuple[str, Any]]:
+        """One turn of a session; yields stream_turn events plus a final ("done", summary)."""
+        lock = self._lock(thread_id)
+        async with lock, self._slots:
+            config = thread_config(thread_id)
+            before = await asession_values(self.graph, config) or {}
+            seen = {m.id for m in before.get("messages", [])}
+            state = before
+            async for kind, payload in astream_turn(self.graph, await aturn_input(self.graph, config, text), config):
+                if kind == "state":
+                    state = payload
+                else:
+                    yield kind, payload
+            yield "done", {
+                "thread_id": thread_id,
+                "phase": state.get("phase"),
+                "awaiting_confirm": state.get("awaiting_confirm", False),
+                "replies": [m.content for m in state.get("messages", []) if m.type == "ai" and m.id not in seen],
+            }
+
+    async def turn(self, thread_id: str, text: str) -> Dict[str, Any]:
+        """One turn of a session, without token events."""
+        async for kind, payload in self.stream(thread_id, text):
+            if kind == "done":
+                return payload
+        raise RuntimeError("turn ended without a final state")
+
+
+async def _handle_client(service: SessionService, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    async def send(obj: dict):
+        writer.write((json.dumps(obj, ensure_ascii=False) + "\n").encode("utf-8"))
+        await writer.drain()
+
+    try:
+        while line := await reader.readline():
+            try:
+                request = json.loads(line)
+                thread_id = request.get("thread_id") or uuid.uuid4().hex
+                async for kind, payload in service.stream(thread_id, str(request["text"])):
+                    if kind == "token":
+                        await send({"event": "token", "id": payload[0], "text": payload[1]})
+                    else:
+                        await send({"event": "done", **payload})
+            except (ValueError, KeyError) as e:
+                await send({"event": "error", "error": f"bad request: {e}"})
+            except Exception as e:
+                logger.exception("Turn failed")
+                await send({"event": "error", "error": f"{type(e).__name__}: {e}"})
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(host: str, port: int, checkpoint_backend: Optional[str] = None):
+    service = await SessionService.create(checkpoint_backend)
+    server = await asyncio.start_server(lambda r, w: _handle_client(service, r, w), host, port)
+    print(f"Session service listening on {host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    from tracing import configure_logging
+
+    parser = argparse.ArgumentParser(description="Solution Architect async session service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--checkpointer", choices=["memory", "sqlite"], help="session store (default: $CHECKPOINT_BACKEND or memory)")
+    args = parser.parse_args()
+    configure_logging()
+    asyncio.run(serve(args.host, args.port, args.checkpointer))
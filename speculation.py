@@ -0,0 +1,395 @@
+# speculation.py
+"""
+Speculative pre-computation of the next phase.
+
+When the supervisor shows a confirmation prompt after the solution or the
+architecture, the next phase's agent starts in the background on the state the
+user would confirm. If the reply routes to `proceed_to_next_phase`, the worker
+node returns the prepared result instead of starting from zero; a revise / new /
+end reply cancels the run and its tokens are counted as wasted.
+
+Off by default (SPECULATIVE_PHASES=1 enables it). Each session may waste at most
+SPECULATION_WASTE_BUDGET tokens on discarded runs before speculation stops for
+it; SPECULATION_WORKERS bounds the background runs of the sync graph. A prepared
+result nobody replies to is dropped after SPECULATION_TTL_S (and when more than
+MAX_TRACKED_SESSIONS sessions hold one) and counted as wasted.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextvars import Context
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.runnables import RunnableConfig, RunnableLambda
+
+from tracing import CURRENT_NODE, token_usage
+
+logger = logging.getLogger(__name__)
+
+SPECULATIVE_PHASES = os.getenv("SPECULATIVE_PHASES", "0").lower() in ("1", "true", "on")
+SPECULATION_WASTE_BUDGET = int(os.getenv("SPECULATION_WASTE_BUDGET", "20000"))
+SPECULATION_WORKERS = int(os.getenv("SPECULATION_WORKERS", "4"))
+SPECULATION_TTL_S = float(os.getenv("SPECULATION_TTL_S", "1800"))
+MAX_TRACKED_SESSIONS = 10000
+
+# Phase whose confirmation prompt triggers speculation -> (next phase, its worker node).
+NEXT_PHASE = {
+    "solution": ("architect", "architect_agent"),
+    "architect": ("analysis", "analysis_agent"),
+}
+
+# Everything a worker reads besides the transcript; a prepared result is only used if these still match.
+_INPUT_FIELDS = ("requirement", "clean_requirement", "solution_output", "architecture_output",
+                 "history_summary", "summary_upto_id")
+
+
+class SpeculationCancelled(Exception):
+    pass
+
+
+class _QuietCancel(logging.Filter):
+    """LangChain logs every exception raised by a callback; a cancelled speculation is expected."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return "SpeculationCancelled" not in record.getMessage()
+
+
+logging.getLogger("langchain_core.callbacks.manager").addFilter(_QuietCancel())
+
+
+class _Meter(BaseCallbackHandler):
+    """Counts a speculative run's tokens and stops it before its next model call once cancelled."""
+
+    raise_error = True
+    run_inline = True
+
+    def __init__(self):
+        self.tokens = 0
+        self.cancelled = threading.Event()
+
+    def _check(self):
+        if self.cancelled.is_set():
+            raise SpeculationCancelled()
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        self._check()
+
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        self._check()
+
+    def on_llm_end(self, response, **kwargs):
+        self.tokens += sum(token_usage(response).values())
+
+
+class _Run:
+    def __init__(self, phase: str, fingerprint: str, meter: _Meter, started: float):
+        self.phase = phase
+        self.fingerprint = fingerprint
+        self.meter = meter
+        self.started = started
+        self.finished: Optional[float] = None
+        self.future: Any = None  # concurrent Future (sync graph) or asyncio.Task (async graph)
+        self.claimed = False     # taken by the worker node, which does the accounting
+        self.accounted = False
+
+
+def _fingerprint(state) -> str:
+    raw = "\x00".join(str(state.get(f) or "") for f in _INPUT_FIELDS)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _thread_id(config: Optional[RunnableConfig]) -> Optional[str]:
+    return ((config or {}).get("configurable") or {}).get("thread_id")
+
+
+class Speculator:
+    def __init__(self, enabled: bool = SPECULATIVE_PHASES, waste_budget: int = SPECULATION_WASTE_BUDGET,
+                 workers: int = SPECULATION_WORKERS, ttl_s: float = SPECULATION_TTL_S):
+        self.enabled = enabled
+        self.waste_budget = waste_budget
+        self.ttl_s = ttl_s
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="speculation")
+        self._runs: Dict[str, _Run] = {}  # in start order: _begin pops a session's old run before adding
+        self._wasted: "OrderedDict[str, int]" = OrderedDict()
+        # Reentrant: cancelling a queued future runs its done-callback (_settle) immediately.
+        self._lock = threading.RLock()
+        self.stats = {"started": 0, "hits": 0, "discarded": 0, "stale": 0, "not_started": 0, "skipped_budget": 0,
+                      "expired": 0, "used_tokens": 0, "wasted_tokens": 0, "saved_s": 0.0}
+
+    # ---------- start ----------
+
+    def _begin(self, thread_id: Optional[str], phase: str, state) -> Optional[_Run]:
+        if not (self.enabled and thread_id):
+            return None
+        with self._lock:
+            if self._wasted.get(thread_id, 0) >= self.waste_budget:
+                self.stats["skipped_budget"] += 1
+                return None
+            self._cancel_locked(thread_id)
+            now = time.perf_counter()
+            self._expire_locked(now)
+            run = self._runs[thread_id] = _Run(phase, _fingerprint(state), _Meter(), now)
+            self.stats["started"] += 1
+        return run
+
+    def _expire_locked(self, now: float) -> None:
+        """Drop prepared results older than the TTL, and the oldest runs beyond MAX_TRACKED_SESSIONS."""
+        expired = []
+        for thread_id, run in self._runs.items():
+            if now - run.started <= self.ttl_s:
+                break  # later runs started later still
+            if run.finished is not None and now - run.finished > self.ttl_s:
+                expired.append(thread_id)
+        overflow = len(self._runs) - len(expired) - (MAX_TRACKED_SESSIONS - 1)
+        if overflow > 0:
+            skip = set(expired)
+            expired += [t for t in self._runs if t not in skip][:overflow]
+        for thread_id in expired:
+            self._cancel_locked(thread_id, "expired")
+        if expired:
+            logger.debug("Dropped %d unclaimed speculative runs", len(expired))
+
+    def _run_config(self, thread_id: str, run: _Run) -> RunnableConfig:
+        return {"callbacks": [run.meter], "configurable": {"thread_id": thread_id, "speculative": True}}
+
+    def start(self, thread_id: Optional[str], phase: str, node: str, fn: Callable, state) -> None:
+        """Run `fn(state, config)` for `phase` in the background thread pool."""
+        run = self._begin(thread_id, phase, state)
+        if run is None:
+            return
+        config = self._run_config(thread_id, run)
+        # Run as a Runnable so calls the agent makes without passing config still inherit the meter.
+        runnable = RunnableLambda(fn, name=f"{node}:speculative")
+
+        def work():
+            CURRENT_NODE.set(f"{node}:speculative")
+            try:
+                return runnable.invoke(state, config)
+            finally:
+                run.finished = time.perf_counter()
+
+        # A fresh context: the run must not inherit the graph run's callbacks (stream handlers, parent run).
+        run.future = self._pool.submit(Context().run, work)
+        run.future.add_done_callback(lambda f: self._settle(thread_id, run))
+
+    def astart(self, thread_id: Optional[str], phase: str, node: str, afn: Callable, state) -> None:
+        """Run `await afn(state, config)` for `phase` as a task on the current event loop."""
+        run = self._begin(thread_id, phase, state)
+        if run is None:
+            return
+        config = self._run_config(thread_id, run)
+        runnable = RunnableLambda(afn, name=f"{node}:speculative")
+
+        async def work():
+            CURRENT_NODE.set(f"{node}:speculative")
+            try:
+                return await runnable.ainvoke(state, config)
+            finally:
+                run.finished = time.perf_counter()
+
+        run.future = asyncio.get_running_loop().create_task(work(), context=Context())
+        run.future.add_done_callback(lambda f: self._settle(thread_id, run))
+
+    # ---------- finish ----------
+
+    def _settle(self, thread_id: str, run: _Run) -> None:
+        """A run that was discarded (or failed) before being taken wastes its tokens."""
+        with self._lock:
+            if run.claimed:
+                return
+            if self._runs.get(thread_id) is run:
+                if not run.future.cancelled() and run.future.exception() is None:
+                    return  # ready, waiting to be taken
+                del self._runs[thread_id]
+            self._waste_locked(thread_id, run)
+
+    def _waste_locked(self, thread_id: str, run: _Run) -> None:
+        if run.accounted:
+            return
+        run.accounted = True
+        self.stats["wasted_tokens"] += run.meter.tokens
+        self._wasted[thread_id] = self._wasted.get(thread_id, 0) + run.meter.tokens
+        self._wasted.move_to_end(thread_id)
+        while len(self._wasted) > MAX_TRACKED_SESSIONS:
+            self._wasted.popitem(last=False)
+
+    def _cancel_locked(self, thread_id: str, outcome: str = "discarded") -> None:
+        run = self._runs.pop(thread_id, None)
+        if run is None:
+            return
+        self.stats[outcome] += 1
+        run.meter.cancelled.set()
+        run.future.cancel()
+        if run.future.done():
+            self._waste_locked(thread_id, run)
+        # A run still in progress stops at its next model/tool call; _settle accounts for it.
+
+    def discard(self, thread_id: Optional[str]) -> None:
+        if thread_id:
+            with self._lock:
+                self._cancel_locked(thread_id)
+
+    def _claim(self, thread_id: Optional[str], phase: str, state) -> Optional[_Run]:
+        if not thread_id:
+            return None
+        with self._lock:
+            run = self._runs.get(thread_id)
+            if run is None:
+                return None
+            if run.phase != phase or run.fingerprint != _fingerprint(state):
+                self.stats["stale"] += 1
+                self._cancel_locked(thread_id)
+                return None
+            del self._runs[thread_id]
+            run.claimed = True
+        return run
+
+    def _hit(self, run: _Run) -> None:
+        with self._lock:
+            run.accounted = True
+            self.stats["hits"] += 1
+            self.stats["used_tokens"] += run.meter.tokens
+            # Work the user did not wait for: the whole run if it finished, else what it had done.
+            self.stats["saved_s"] += ((run.finished or time.perf_counter()) - run.started)
+
+    def take(self, thread_id: Optional[str], phase: str, state) -> Optional[Any]:
+        """The prepared update for `phase`, waiting for it if it is still running; None if there is none."""
+        run = self._claim(thread_id, phase, state)
+        if run is None:
+            return None
+        claimed_at = time.perf_counter()
+        if not isinstance(run.future, Future):
+            self._discard_claimed(thread_id, run)
+            return None
+        if run.future.cancel():
+            # Still queued behind other sessions' speculation: running it now is never slower.
+            with self._lock:
+                self.stats["not_started"] += 1
+            return None
+        try:
+            result = run.future.result()
+        except BaseException as e:  # includes a cancelled future
+            logger.warning("Speculative %s run failed (%s); running it now.", phase, e)
+            self._discard_claimed(thread_id, run)
+            return None
+        self._hit(run)
+        logger.debug("Speculation hit for %s (%.2fs wait)", phase, time.perf_counter() - claimed_at)
+        return result
+
+    async def atake(self, thread_id: Optional[str], phase: str, state) -> Optional[Any]:
+        run = self._claim(thread_id, phase, state)
+        if run is None:
+            return None
+        try:
+            result = await (run.future if isinstance(run.future, asyncio.Future) else asyncio.wrap_future(run.future))
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError) and not run.future.cancelled():
+                raise  # the caller itself was cancelled
+            logger.warning("Speculative %s run failed (%s); running it now.", phase, e)
+            self._discard_claimed(thread_id, run)
+            return None
+        self._hit(run)
+        return result
+
+    def _discard_claimed(self, thread_id: str, run: _Run) -> None:
+        with self._lock:
+            self.stats["discarded"] += 1
+            run.meter.cancelled.set()
+            self._waste_locked(thread_id, run)
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            out = dict(self.stats)
+        resolved = out["hits"] + out["discarded"] + out["stale"] + out["not_started"] + out["expired"]
+        out["hit_rate"] = out["hits"] / resolved if resolved else 0.0
+        return out
+
+
+SPECULATOR = Speculator()
+
+
+# ---------- Graph node wrappers (applied in build_graph) ----------
+
+def _speculation_target(state, update: dict) -> Optional[Tuple[str, str, dict]]:
+    """(next phase, node, projected state) when this supervisor step showed a phase confirmation."""
+    phase = state.get("phase")
+    if phase not in NEXT_PHASE or state.get("awaiting_confirm") or update.get("route") != "await_reply":
+        return None
+    next_phase, node = NEXT_PHASE[phase]
+    if next_phase == "architect" and state.get("subproblems"):
+        return None  # a decomposed architecture fans out in the graph (agents/decompose.py), not in one worker
+    # The confirmation prompt itself stays out: it is boilerplate to the worker, and the
+    # prepared result must only append the worker's own message.
+    update = {k: v for k, v in update.items() if k != "messages"}
+    projected = {**state, **update, "phase": next_phase, "route": node,
+                 "awaiting_confirm": False, "bypass_cache": False}
+    return next_phase, node, projected
+
+
+def _cancels_speculation(state, update: dict) -> bool:
+    """A confirmation reply that neither proceeds nor asks again (revise / new / end)."""
+    if not state.get("awaiting_confirm") or state.get("phase") not in NEXT_PHASE:
+        return False
+    return update.get("route") not in ("await_reply", NEXT_PHASE[state["phase"]][1])
+
+
+def speculative_supervisor(fn: Callable, afn: Callable, workers: Dict[str, Tuple[Callable, Callable]]):
+    """
+    Wrap the supervisor (sync, async) so a confirmation prompt starts the next phase
+    in the background and a reply other than proceed/clarify cancels it.
+    `workers` maps node name -> (sync, async) worker function.
+    """
+    def _update(result) -> dict:
+        return getattr(result, "update", None) or (result if isinstance(result, dict) else {})
+
+    def node(state, config: RunnableConfig = None):
+        result = fn(state)
+        if SPECULATOR.enabled:
+            update, thread_id = _update(result), _thread_id(config)
+            target = _speculation_target(state, update)
+            if target:
+                next_phase, name, projected = target
+                SPECULATOR.start(thread_id, next_phase, name, workers[name][0], projected)
+            elif _cancels_speculation(state, update):
+                SPECULATOR.discard(thread_id)
+        return result
+
+    async def anode(state, config: RunnableConfig = None):
+        result = await afn(state)
+        if SPECULATOR.enabled:
+            update, thread_id = _update(result), _thread_id(config)
+            target = _speculation_target(state, update)
+            if target:
+                next_phase, name, projected = target
+                SPECULATOR.astart(thread_id, next_phase, name, workers[name][1], projected)
+            elif _cancels_speculation(state, update):
+                SPECULATOR.discard(thread_id)
+        return result
+
+    return node, anode
+
+
+def speculative_worker(phase: str, fn: Callable, afn: Callable):
+    """Wrap a worker (sync, async) so a prepared result for its phase is used when there is one."""
+    def node(state, config: RunnableConfig = None):
+        if SPECULATOR.enabled:
+            prepared = SPECULATOR.take(_thread_id(config), phase, state)
+            if prepared is not None:
+                return prepared
+        return fn(state, config)
+
+    async def anode(state, config: RunnableConfig = None):
+        if SPECULATOR.enabled:
+            prepared = await SPECULATOR.atake(_thread_id(config), phase, state)
+            if prepared is not None:
+                return prepared
+        return await afn(state, config)
+
+    return node, anode
@@ -1,12 +1,34 @@
 # state.py
-from typing import TypedDict, Annotated, List, Optional
+from typing import TypedDict, Annotated, Dict, List, Optional
 from langgraph.graph.message import add_messages
 from langchain_core.messages import BaseMessage
 
+def merge_part_outputs(left: Optional[Dict[str, str]], right: Optional[Dict[str, str]]) -> Dict[str, str]:
+    """Reducer for fan-out branches: each adds {index: output}; None clears (agents/decompose.py)."""
+    if right is None:
+        return {}
+    return {**(left or {}), **right}
+
 class ChatState(TypedDict, total=False):
-    messages: Annotated[List[BaseMessage], add_messages]
+    messages: Annotated[List[BaseMessage], add_messages]   # recent window; nodes return only new messages
+    archived_messages: int      # older messages moved to the session archive (transcript_archive.py)
     phase: Optional[str]        # "start" | "solution" | "architect" | "analysis" | "done"
     awaiting_confirm: bool      # supervisor asks user to confirm next step
-    route: Optional[str]        # "solution_agent" | "architect_agent" | "analysis_agent" | "END"
-    # for CLI printing control (optional)
-    last_printed_ai_messages: List[BaseMessage]
+    route: Optional[str]        # "solution_agent" | "architect_agent" | "analysis_agent" | "await_reply" | "END"
+    bypass_cache: bool          # next worker run skips the LLM response cache (user asked for a revision)
+    # filled by intake / workers so agents never rescan the transcript
+    last_user_text: Optional[str]       # newest human message of this run, if any
+    requirement: Optional[str]          # the current request, as typed
+    last_question: Optional[str]        # latest human question (not a control reply); what analysis researches
+    clean_requirement: Optional[str]    # sanitized requirement (computed once by the architect)
+    solution_output: Optional[str]
+    architecture_output: Optional[str]
+    analysis_output: Optional[str]
+    # decomposition mode (agents/decompose.py)
+    subproblems: Optional[List[dict]]   # {"title", "scope"} per part; [] = designed whole, None = not split yet
+    solution_parts: Optional[List[str]] # solution of each part, read by its architecture branch
+    part_outputs: Annotated[Dict[str, str], merge_part_outputs]  # branch outputs awaiting the reduce node
+    budget_usage: Optional[dict]        # last budgeted phase run (budgets.py): usage and the budget that ran out, if any
+    # rolling summary of turns older than the recent window (agents/context_builder.py)
+    history_summary: Optional[str]
+    summary_upto_id: Optional[str]     # id of the newest message folded into the summary
@@ -0,0 +1,55 @@
+# streaming.py
+"""
+Token streaming from worker agents to the CLI and Streamlit UI.
+
+Worker agents invoke the model with `user_facing(config)`. Under LangGraph's
+"messages" stream mode the chat model streams its tokens through the callbacks
+in that config, and `stream_turn` forwards only the ones tagged as user facing
+(so routing/rewrite calls never leak into the transcript).
+"""
+
+from typing import Any, AsyncIterator, Iterator, Optional, Tuple
+
+from langchain_core.runnables import RunnableConfig
+
+USER_FACING_TAG = "user_facing"
+
+
+def user_facing(config: Optional[RunnableConfig] = None) -> RunnableConfig:
+    """Return a copy of `config` tagged so its LLM tokens are streamed to the user."""
+    config = dict(config or {})
+    config["tags"] = list(config.get("tags") or []) + [USER_FACING_TAG]
+    return config  # type: ignore[return-value]
+
+
+def stream_turn(graph, graph_input: Any, config: Optional[RunnableConfig] = None) -> Iterator[Tuple[str, Any]]:
+    """
+    Drive one turn of the graph and yield events as they happen:
+      ("token", (message_id, text))  – a piece of a user-facing AI answer
+      ("state", values)              – the full graph state after a step (last one is final)
+    """
+    for mode, payload in graph.stream(graph_input, config, stream_mode=["messages", "values"]):
+        if mode == "messages":
+            chunk, meta = payload
+            if USER_FACING_TAG not in (meta.get("tags") or []):
+                continue
+            text = chunk.content if isinstance(chunk.content, str) else ""
+            if text:
+                yield "token", (chunk.id, text)
+        elif "__interrupt__" not in payload:
+            yield "state", payload
+
+
+async def astream_turn(graph, graph_input: Any,
+                       config: Optional[RunnableConfig] = None) -> AsyncIterator[Tuple[str, Any]]:
+    """Async `stream_turn`, same events, driven by graph.astream."""
+    async for mode, payload in graph.astream(graph_input, config, stream_mode=["messages", "values"]):
+        if mode == "messages":
+            chunk, meta = payload
+            if USER_FACING_TAG not in (meta.get("tags") or []):
+                continue
+            text = chunk.content if isinstance(chunk.content, str) else ""
+            if text:
+                yield "token", (chunk.id, text)
+        elif "__interrupt__" not in payload:
+            yield "state", payload
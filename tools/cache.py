@@ -0,0 +1,256 @@
+# tools/cache.py
+"""
+Persistent TTL/LRU cache for research tool results.
+
+Entries live in a SQLite file keyed by tool name + normalized query. SQLite runs
+in WAL mode with a busy timeout and every process/thread gets its own
+connection, so several Streamlit workers can share one cache file safely.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextvars import ContextVar, copy_context
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional, Tuple, Union
+
+DEFAULT_TTL_S = float(os.getenv("TOOL_CACHE_TTL_S", str(24 * 3600)))
+
+# Per-tool defaults; override with TOOL_CACHE_TTL_<TOOL_NAME> (e.g. TOOL_CACHE_TTL_TAVILY_SEARCH=3600).
+TOOL_TTLS_S: Dict[str, float] = {
+    "wikipedia_search": 7 * 24 * 3600,
+    "arxiv_search": 7 * 24 * 3600,
+    "tavily_search": 6 * 3600,  # web results go stale faster
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key      TEXT PRIMARY KEY,
+    tool     TEXT NOT NULL,
+    query    TEXT NOT NULL,
+    value    TEXT NOT NULL,
+    created  REAL NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries(accessed);
+CREATE TABLE IF NOT EXISTS stats (
+    tool   TEXT PRIMARY KEY,
+    hits   INTEGER NOT NULL DEFAULT 0,
+    misses INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+_SPACE_RE = re.compile(r"\s+")
+
+logger = logging.getLogger(__name__)
+
+# Whether the last lookup in this context was served from the cache (True, or "local"
+# when the local knowledge index answered it); read once by tracing. The flag sits in
+# a one-item list: LangChain runs each tool in a copy of the caller's context, and a
+# shared list is how a hit flagged inside the tool reaches the tracing callback.
+_LAST_HIT: ContextVar[Optional[list]] = ContextVar("tool_cache_last_hit", default=None)
+
+
+def start_cache_scope() -> None:
+    """Give the calling context a fresh flag (tracing does this when a tool run starts)."""
+    _LAST_HIT.set([None])
+
+
+def note_cache_hit(hit: Union[bool, str]) -> None:
+    box = _LAST_HIT.get()
+    if box is None:
+        _LAST_HIT.set([hit])
+    else:
+        box[0] = hit
+
+
+def consume_cache_hit() -> Optional[Union[bool, str]]:
+    box = _LAST_HIT.get()
+    if box is None:
+        return None
+    hit, box[0] = box[0], None
+    return hit
+
+
+# What fetches return when a search failed or found nothing; never cached or indexed.
+_NOT_RESULTS = ("No Wikipedia results found", "Disambiguation error", "No good Arxiv Result was found",
+                "No search results found", "{'error':", '{"error":')
+
+
+def is_result(value: Any) -> bool:
+    """Whether a fetch returned content (not an error or an empty search)."""
+    return isinstance(value, str) and bool(value.strip()) and not value.lstrip().startswith(_NOT_RESULTS)
+
+
+def normalize_query(query: str) -> str:
+    return _SPACE_RE.sub(" ", (query or "").strip().lower())
+
+
+class ToolResultCache:
+    def __init__(self, path: str, max_entries: int = 5000, ttls: Optional[Dict[str, float]] = None,
+                 default_ttl: float = DEFAULT_TTL_S):
+        self.path = path
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.ttls = dict(ttls or {})
+        # Counters for this process; `stats()` reports the totals shared by all processes.
+        self.hits: Dict[str, int] = {}
+        self.misses: Dict[str, int] = {}
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=10000")
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def ttl_for(self, tool: str) -> float:
+        env = os.getenv(f"TOOL_CACHE_TTL_{tool.upper()}")
+        if env:
+            return float(env)
+        return self.ttls.get(tool, self.default_ttl)
+
+    @staticmethod
+    def key(tool: str, query: str) -> str:
+        return hashlib.sha256(f"{tool}\x00{normalize_query(query)}".encode("utf-8")).hexdigest()
+
+    def _count(self, tool: str, hit: bool) -> None:
+        note_cache_hit(hit)
+        counters = self.hits if hit else self.misses
+        counters[tool] = counters.get(tool, 0) + 1
+        col = "hits" if hit else "misses"
+        self._conn().execute(
+            f"INSERT INTO stats(tool, {col}) VALUES (?, 1) "
+            f"ON CONFLICT(tool) DO UPDATE SET {col} = {col} + 1",
+            (tool,),
+        )
+
+    def get(self, tool: str, query: str) -> Optional[str]:
+        conn = self._conn()
+        key = self.key(tool, query)
+        now = time.time()
+        row = conn.execute("SELECT value, created FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self._count(tool, hit=False)
+            return None
+        value, created = row
+        if now - created > self.ttl_for(tool) or not is_result(value):
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._count(tool, hit=False)
+            return None
+        conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+        self._count(tool, hit=True)
+        return value
+
+    def put(self, tool: str, query: str, value: str) -> None:
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries(key, tool, query, value, created, accessed) VALUES (?, ?, ?, ?, ?, ?)",
+                (self.key(tool, query), tool, normalize_query(query), value, now, now),
+            )
+            (count,) = conn.execute("SELECT COUNT(*) FROM entries").fetchone()
+            if count > self.max_entries:
+                conn.execute(
+                    "DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY accessed ASC LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def get_or_compute(self, tool: str, query: str, fetch: Callable[[], str]) -> str:
+        """Return the cached result or call `fetch()` and store it. Failures (exceptions, error texts) are not cached."""
+        try:
+            cached = self.get(tool, query)
+        except sqlite3.Error as e:
+            logger.warning("Tool cache unavailable (%s); calling %s directly.", e, tool)
+            return fetch()
+        if cached is not None:
+            return cached
+        value = fetch()
+        if not is_result(value):
+            return value
+        try:
+            self.put(tool, query, value)
+        except sqlite3.Error as e:
+            logger.warning("Tool cache write failed: %s", e)
+        return value
+
+    def items(self) -> Iterator[Tuple[str, str, str]]:
+        """(tool, normalized query, value) for every unexpired entry."""
+        now = time.time()
+        rows = self._conn().execute("SELECT tool, query, value, created FROM entries").fetchall()
+        for tool, query, value, created in rows:
+            if now - created <= self.ttl_for(tool) and is_result(value):
+                yield tool, query, value
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        rows = self._conn().execute("SELECT tool, hits, misses FROM stats").fetchall()
+        (entries,) = self._conn().execute("SELECT COUNT(*) FROM entries").fetchone()
+        out = {tool: {"hits": h, "misses": m} for tool, h, m in rows}
+        out["_total"] = {
+            "hits": sum(r[1] for r in rows),
+            "misses": sum(r[2] for r in rows),
+            "entries": entries,
+        }
+        return out
+
+    def clear(self) -> None:
+        self._conn().execute("DELETE FROM entries")
+        self._conn().execute("DELETE FROM stats")
+        self.hits.clear()
+        self.misses.clear()
+
+
+TOOL_CACHE_ENABLED = os.getenv("TOOL_CACHE", "1").lower() not in ("0", "false", "off")
+
+TOOL_CACHE = ToolResultCache(
+    path=os.getenv("TOOL_CACHE_PATH", os.path.join(".cache", "tool_results.sqlite")),
+    max_entries=int(os.getenv("TOOL_CACHE_MAX_ENTRIES", "5000")),
+    ttls=TOOL_TTLS_S,
+)
+
+
+def cached_call(tool: str, query: str, fetch: Callable[[], str]) -> str:
+    """Route a tool's network fetch through the shared cache (unless TOOL_CACHE=0)."""
+    if not TOOL_CACHE_ENABLED:
+        return fetch()
+    return TOOL_CACHE.get_or_compute(tool, query, fetch)
+
+
+async def acached_call(tool: str, query: str, afetch: Callable[[], Awaitable[str]]) -> str:
+    """Async `cached_call`: SQLite work runs in a worker thread, the fetch is awaited on the loop."""
+    if not TOOL_CACHE_ENABLED:
+        return await afetch()
+    ctx = copy_context()
+    try:
+        cached = await asyncio.to_thread(ctx.run, TOOL_CACHE.get, tool, query)
+        _LAST_HIT.set(ctx.get(_LAST_HIT))
+    except sqlite3.Error as e:
+        logger.warning("Tool cache unavailable (%s); calling %s directly.", e, tool)
+        return await afetch()
+    if cached is not None:
+        return cached
+    value = await afetch()
+    if not is_result(value):
+        return value
+    try:
+        await asyncio.to_thread(TOOL_CACHE.put, tool, query, value)
+    except sqlite3.Error as e:
+        logger.warning("Tool cache write failed: %s", e)
+    return value
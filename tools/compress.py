@@ -0,0 +1,257 @@
+# tools/compress.py
+"""
+Compression of research tool results before they reach a model.
+
+A tool result is split into passages; boilerplate (navigation, cookie and
+subscribe lines, bare URLs, search-API metadata) is dropped, passages already
+returned by another tool call in the same research run are dropped, and the rest
+are ranked by BM25 relevance to the query. The best ones, kept in their original
+order, fill at most TOOL_OUTPUT_MAX_TOKENS tokens. The agent scratchpad and the
+synthesis prompt then grow by a bounded amount per tool call, whatever the tools
+return. Caches and the local index keep the raw result; only what a model reads
+is compressed.
+
+Each call's raw and compressed token counts go to its tool span (tracing.py) and
+to `STATS`. TOOL_COMPRESS=0 turns compression off.
+"""
+
+import ast
+import hashlib
+import math
+import os
+import re
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from agents.context_builder import count_tokens
+from tools.local_index import tokenize
+
+TOOL_COMPRESS = os.getenv("TOOL_COMPRESS", "1").lower() not in ("0", "false", "off")
+MAX_TOKENS = int(os.getenv("TOOL_OUTPUT_MAX_TOKENS", "350"))
+PASSAGE_WORDS = 60
+# Passages whose term sets have this Jaccard similarity with one already kept count as duplicates;
+# passages with fewer terms (titles, one-line facts) are only dropped when repeated verbatim.
+DUPLICATE_OVERLAP = 0.8
+MIN_DEDUP_TERMS = 8
+# Search records (arXiv "Published:/Title:/Authors:/Summary:", Wikipedia "Page:/Summary:")
+# are kept whole: every passage of a record starts with its title.
+_FIELD_RE = re.compile(r"^([A-Z][\w ]{0,30}): ?(.*)$")
+_LABEL_FIELDS = ("Title", "Page")
+_BODY_FIELDS = ("Summary", "Content")
+LEAD_WORDS = 30
+
+_BOILERPLATE_RE = re.compile(
+    r"^\W*((skip to (main )?content|cookie|accept( all)? cookies|subscribe|sign (in|up)|log ?in|"
+    r"share (this|on)|advertisement|all rights reserved|copyright|privacy policy|terms of (use|service)|"
+    r"menu|back to top|related articles|read more|click here)\b|home\s*[|>/»])",
+    re.IGNORECASE,
+)
+_URL_LINE_RE = re.compile(r"^\s*(\[[^\]]*\]\()?https?://\S+\)?\s*$")
+_IMAGE_RE = re.compile(r"!\[[^\]]*\]\([^)]*\)")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+
+# Search-API fields that never help a model (Tavily returns a dict with these).
+_RESULT_FIELDS = ("title", "content")
+
+STATS: Dict[str, int] = {"calls": 0, "raw_tokens": 0, "tokens": 0, "passages": 0, "kept": 0, "duplicates": 0}
+_STATS_LOCK = threading.Lock()
+
+
+class _Seen:
+    """Passages already returned within one research run (shared by its parallel tool calls)."""
+
+    def __init__(self):
+        self.hashes = set()
+        self.term_sets: List[frozenset] = []
+        self.lock = threading.Lock()
+
+
+_SEEN: ContextVar[Optional[_Seen]] = ContextVar("tool_compress_seen", default=None)
+# Raw/compressed sizes of the last call in this context, read by tracing. A one-item list
+# for the same reason as tools.cache._LAST_HIT: tools run in a copy of the caller's context.
+_LAST_STATS: ContextVar[Optional[list]] = ContextVar("tool_compress_last", default=None)
+
+
+@contextmanager
+def research_scope() -> Iterator[None]:
+    """Drop passages repeated across the tool calls made inside this block (one research run)."""
+    token = _SEEN.set(_Seen())
+    try:
+        yield
+    finally:
+        _SEEN.reset(token)
+
+
+def start_compression_scope() -> None:
+    _LAST_STATS.set([None])
+
+
+def consume_compression_stats() -> Dict[str, int]:
+    box = _LAST_STATS.get()
+    if box is None or box[0] is None:
+        return {}
+    stats, box[0] = box[0], None
+    return stats
+
+
+def _note(stats: Dict[str, int]) -> None:
+    box = _LAST_STATS.get()
+    if box is None:
+        _LAST_STATS.set([stats])
+    else:
+        box[0] = stats
+    with _STATS_LOCK:
+        STATS["calls"] += 1
+        for key, value in stats.items():
+            STATS[key] += value
+
+
+def _documents(text: str) -> List[str]:
+    """Unpack a search-API result dict (e.g. Tavily's) into title + content; other text as is."""
+    stripped = text.strip()
+    if stripped.startswith("{") and "'results'" in stripped:
+        try:
+            data = ast.literal_eval(stripped)
+            return ["\n".join(str(r.get(f) or "") for f in _RESULT_FIELDS if r.get(f))
+                    for r in data.get("results", []) if isinstance(r, dict)]
+        except (ValueError, SyntaxError, AttributeError):
+            pass
+    return [text]
+
+
+def _clean(doc: str) -> str:
+    lines = []
+    for line in doc.splitlines():
+        line = _IMAGE_RE.sub("", line).strip()
+        if not line:
+            lines.append("")  # paragraph and record breaks
+        elif not (_URL_LINE_RE.match(line) or (len(line) < 80 and _BOILERPLATE_RE.match(line))):
+            lines.append(line)
+    return "\n".join(lines)
+
+
+def _record(block: str) -> Tuple[str, str, str]:
+    """(lead, label, body) of a search record; ("", "", block) for plain text."""
+    fields: List[List[str]] = []
+    for line in block.splitlines():
+        m = _FIELD_RE.match(line)
+        if m:
+            fields.append([m.group(1), m.group(2)])
+        elif fields:
+            fields[-1][1] += " " + line  # arXiv summaries wrap over several lines
+        else:
+            return "", "", block
+    names = [name for name, _ in fields]
+    label_name = next((n for n in _LABEL_FIELDS if n in names), None)
+    if label_name is None:
+        return "", "", block
+    body_name = next((n for n in _BODY_FIELDS if n in names), names[-1])
+    label = f"{label_name}: {dict(fields)[label_name].strip()}"
+    lead = " ".join(f"{name}: {value.strip()}" for name, value in fields if name != body_name)
+    body = " ".join(value for name, value in fields if name == body_name)
+    return " ".join(lead.split()[:LEAD_WORDS]), label, body
+
+
+def passages(text: str) -> List[str]:
+    """Clean passages of at most about PASSAGE_WORDS words, split at sentence ends."""
+    out = []
+    for doc in _documents(text):
+        for block in re.split(r"\n\s*\n", _clean(doc)):
+            lead, label, body = _record(block)
+            # The first passage of a record carries its fields, later ones its title.
+            prefix = lead
+            current: List[str] = []
+            for sentence in _SENTENCE_RE.split(" ".join(body.split())):
+                words = sentence.split()
+                if current and len(prefix.split()) + len(current) + len(words) > PASSAGE_WORDS:
+                    out.append(f"{prefix}\n{' '.join(current)}".strip())
+                    prefix, current = label, []
+                current.extend(words)
+            if current or prefix:
+                out.append(f"{prefix}\n{' '.join(current)}".strip())
+    return [p for p in out if p]
+
+
+def _key(passage: str) -> bytes:
+    return hashlib.sha1(" ".join(passage.lower().split()).encode("utf-8")).digest()
+
+
+def _repeats(seen: _Seen, key: bytes, terms: frozenset) -> bool:
+    with seen.lock:
+        if key in seen.hashes:
+            return True
+        return len(terms) >= MIN_DEDUP_TERMS and any(
+            len(terms & other) >= DUPLICATE_OVERLAP * len(terms | other) for other in seen.term_sets)
+
+
+def _remember(seen: _Seen, key: bytes, terms: frozenset) -> None:
+    with seen.lock:
+        seen.hashes.add(key)
+        if terms:
+            seen.term_sets.append(terms)
+
+
+def _bm25(query_terms: List[str], docs: List[List[str]], k1: float = 1.2, b: float = 0.75) -> List[float]:
+    n = len(docs)
+    avg = sum(len(d) for d in docs) / n if n else 0.0
+    df: Dict[str, int] = {}
+    for d in docs:
+        for t in set(d):
+            df[t] = df.get(t, 0) + 1
+    scores = []
+    for d in docs:
+        tf: Dict[str, int] = {}
+        for t in d:
+            tf[t] = tf.get(t, 0) + 1
+        score = 0.0
+        for t in set(query_terms):
+            f = tf.get(t, 0)
+            if f:
+                idf = math.log(1 + (n - df[t] + 0.5) / (df[t] + 0.5))
+                score += idf * f * (k1 + 1) / (f + k1 * (1 - b + b * len(d) / (avg or 1)))
+        scores.append(score)
+    return scores
+
+
+def compress(query: str, text: str, max_tokens: Optional[int] = None) -> str:
+    """The passages of `text` most relevant to `query`, within `max_tokens` (TOOL_OUTPUT_MAX_TOKENS)."""
+    if not TOOL_COMPRESS or not text:
+        return text
+    max_tokens = MAX_TOKENS if max_tokens is None else max_tokens
+    raw_tokens = count_tokens(text)
+    candidates = passages(text)
+    seen = _SEEN.get()
+    local = _Seen()  # repeats within this result
+    kept, terms, keys, duplicates = [], [], [], 0
+    for p in candidates:
+        p_terms = tokenize(p)
+        key, term_set = _key(p), frozenset(p_terms)
+        if _repeats(local, key, term_set) or (seen is not None and _repeats(seen, key, term_set)):
+            duplicates += 1
+            continue
+        _remember(local, key, term_set)
+        kept.append(p)
+        terms.append(p_terms)
+        keys.append((key, term_set))
+    scores = _bm25(tokenize(query), terms)
+    # Best first; earlier passages win ties (titles and lead sentences come first).
+    order = sorted(range(len(kept)), key=lambda i: (-scores[i], i))
+    chosen, room = [], max_tokens
+    for i in order:
+        cost = count_tokens(kept[i])
+        if cost > room:
+            continue
+        chosen.append(i)
+        room -= cost
+    result = "\n\n".join(kept[i] for i in sorted(chosen))
+    if seen is not None:
+        # Only what the model is shown counts as seen; a passage cut here may still come from another tool.
+        for i in chosen:
+            _remember(seen, *keys[i])
+    if not result:
+        result = "(No new information: results repeat earlier tool calls.)" if duplicates else text[: max_tokens * 4]
+    _note({"raw_tokens": raw_tokens, "tokens": count_tokens(result), "passages": len(candidates),
+           "kept": len(chosen), "duplicates": duplicates})
+    return result
@@ -0,0 +1,649 @@
+# tools/local_index.py
+"""
+Local knowledge index consulted before the network research tools.
+
+Passages come from two places: every result the research tools fetch (and, on
+first use, whatever is already in the tool cache) and the text/markdown files
+under LOCAL_DOCS_DIR. They are kept in SQLite and scored with BM25 in memory;
+optionally each passage also gets an embedding, appended to a float32 file that
+is read through a memory map, and lookups fuse both rankings.
+
+A lookup is answered locally when the top passages cover enough of the query
+("recall": the IDF-weighted share of query terms they contain) or, with
+embeddings, when the best passage is similar enough. A tool is answered only
+from its own results, while they are within its tool-cache TTL, and from local
+documents; passages are stored per source, so text one tool fetched first is
+indexed again when another tool returns it. Otherwise the tool goes to the
+network and its result is indexed for next time. LOCAL_INDEX_OFFLINE=1 never
+calls the network (air-gapped deployments).
+"""
+
+import asyncio
+import hashlib
+import logging
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence
+
+from tools.cache import TOOL_CACHE, TOOL_CACHE_ENABLED, is_result, note_cache_hit
+
+logger = logging.getLogger(__name__)
+
+LOCAL_INDEX_ENABLED = os.getenv("LOCAL_INDEX", "1").lower() not in ("0", "false", "off")
+LOCAL_INDEX_OFFLINE = os.getenv("LOCAL_INDEX_OFFLINE", "0").lower() in ("1", "true", "on")
+MIN_RECALL = float(os.getenv("LOCAL_INDEX_MIN_RECALL", "0.7"))
+MIN_SIMILARITY = float(os.getenv("LOCAL_INDEX_MIN_SIMILARITY", "0.82"))
+TOP_K = int(os.getenv("LOCAL_INDEX_TOP_K", "3"))
+MAX_CHARS = int(os.getenv("LOCAL_INDEX_MAX_CHARS", "3000"))
+CHUNK_WORDS = 120
+DOC_SUFFIXES = (".md", ".markdown", ".txt", ".rst")
+
+# BM25 parameters (the usual defaults).
+K1 = 1.2
+B = 0.75
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunks (
+    id      INTEGER PRIMARY KEY,
+    hash    TEXT NOT NULL,
+    source  TEXT NOT NULL,
+    title   TEXT NOT NULL,
+    text    TEXT NOT NULL,
+    added   REAL NOT NULL,
+    vec_row INTEGER
+);
+CREATE UNIQUE INDEX IF NOT EXISTS chunks_hash_source ON chunks(hash, source);
+CREATE INDEX IF NOT EXISTS chunks_source ON chunks(source);
+CREATE TABLE IF NOT EXISTS files (
+    path  TEXT PRIMARY KEY,
+    mtime REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#]*")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from how in is it its of on or that the this to use using vs what when which "
+    "with without into over under between about best practices".split()
+)
+# Sources of passages from files (LOCAL_DOCS_DIR, `ingest`); every other source is a tool name.
+_DOC_SOURCES = ("doc:", "file:")
+
+_np: Any = None
+
+
+def _numpy():
+    global _np
+    if _np is None:
+        try:
+            import numpy
+            _np = numpy
+        except ImportError:
+            _np = False
+    return _np or None
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased terms without stopwords; a trailing plural 's' is dropped."""
+    terms = []
+    for term in _TOKEN_RE.findall((text or "").lower()):
+        if term in _STOPWORDS:
+            continue
+        if len(term) > 3 and term.endswith("s") and not term.endswith("ss"):
+            term = term[:-1]
+        terms.append(term)
+    return terms
+
+
+def chunk_text(text: str, max_words: int = CHUNK_WORDS) -> List[str]:
+    """Split on paragraphs, packing them into passages of at most `max_words` words."""
+    chunks, current = [], []
+    for para in re.split(r"\n\s*\n", text or ""):
+        words = para.split()
+        while len(words) > max_words:
+            if current:
+                chunks.append(" ".join(current))
+                current = []
+            chunks.append(" ".join(words[:max_words]))
+            words = words[max_words:]
+        if current and len(current) + len(words) > max_words:
+            chunks.append(" ".join(current))
+            current = []
+        current.extend(words)
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+class Hit(NamedTuple):
+    source: str
+    title: str
+    text: str
+    score: float
+    similarity: float
+
+
+class LocalIndex:
+    def __init__(self, path: str, docs_dir: Optional[str] = None,
+                 embed_documents: Optional[Callable[[List[str]], List[List[float]]]] = None,
+                 embed_query: Optional[Callable[[str], List[float]]] = None):
+        self.path = path
+        self.vectors_path = os.path.splitext(path)[0] + ".vectors.f32"
+        self.docs_dir = docs_dir
+        self.embed_documents = embed_documents
+        self.embed_query = embed_query
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._embedder: Optional[ThreadPoolExecutor] = None
+        self._reset_memory()
+
+    def _reset_memory(self) -> None:
+        # Position-indexed passage data; postings map term -> {position: term frequency}.
+        self._ids: List[int] = []
+        self._docs: List[tuple] = []  # (source, title, text)
+        self._added: List[float] = []
+        self._lengths: List[int] = []
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._hashes: Dict[tuple, int] = {}  # (passage hash, source) -> position
+        self._total_length = 0
+        self._row_to_pos: Dict[int, int] = {}
+        self._vectors = None
+        self._vector_rows = 0
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=10000")
+            _migrate(conn)
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    # ---------- loading ----------
+
+    def load(self) -> None:
+        """Sync the docs folder, backfill from the tool cache and build the in-memory index (once)."""
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            conn = self._conn()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if self.docs_dir:
+                    self._sync_docs()
+                self._backfill_tool_cache()
+                self._drop_expired()
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            for chunk_id, source, title, text, added, vec_row in conn.execute(
+                    "SELECT id, source, title, text, added, vec_row FROM chunks ORDER BY id"):
+                self._remember(chunk_id, source, title, text, added, vec_row)
+            self._open_vectors()
+            self._loaded = True
+
+    def reload(self) -> None:
+        with self._lock:
+            self._reset_memory()
+            self._loaded = False
+            self.load()
+
+    def _remember(self, chunk_id: int, source: str, title: str, text: str, added: float,
+                  vec_row: Optional[int]) -> int:
+        pos = len(self._ids)
+        terms = tokenize(f"{title}\n{text}")
+        self._ids.append(chunk_id)
+        self._docs.append((source, title, text))
+        self._added.append(added)
+        self._lengths.append(len(terms))
+        self._total_length += len(terms)
+        self._hashes[(_hash(text), source)] = pos
+        for term in terms:
+            postings = self._postings.setdefault(term, {})
+            postings[pos] = postings.get(pos, 0) + 1
+        if vec_row is not None:
+            self._row_to_pos[vec_row] = pos
+        return pos
+
+    def _sync_docs(self) -> None:
+        """Re-index files under docs_dir that are new or changed; drop passages of deleted files."""
+        conn = self._conn()
+        seen = {}
+        if os.path.isdir(self.docs_dir):
+            for root, _dirs, files in os.walk(self.docs_dir):
+                for name in files:
+                    if name.lower().endswith(DOC_SUFFIXES):
+                        full = os.path.join(root, name)
+                        seen[os.path.relpath(full, self.docs_dir)] = (full, os.path.getmtime(full))
+        known = dict(conn.execute("SELECT path, mtime FROM files").fetchall())
+        for rel in set(known) - set(seen):
+            conn.execute("DELETE FROM chunks WHERE source = ?", (f"doc:{rel}",))
+            conn.execute("DELETE FROM files WHERE path = ?", (rel,))
+        for rel, (full, mtime) in seen.items():
+            if known.get(rel) == mtime:
+                continue
+            try:
+                with open(full, encoding="utf-8", errors="replace") as f:
+                    text = f.read()
+            except OSError as e:
+                logger.warning("Skipping %s: %s", full, e)
+                continue
+            conn.execute("DELETE FROM chunks WHERE source = ?", (f"doc:{rel}",))
+            title = os.path.splitext(os.path.basename(rel))[0].replace("_", " ").replace("-", " ")
+            self._insert(f"doc:{rel}", title, chunk_text(text))
+            conn.execute("INSERT OR REPLACE INTO files(path, mtime) VALUES (?, ?)", (rel, mtime))
+
+    def _backfill_tool_cache(self) -> None:
+        conn = self._conn()
+        if not TOOL_CACHE_ENABLED or conn.execute("SELECT 1 FROM meta WHERE key = 'backfilled'").fetchone():
+            return
+        try:
+            for tool, query, value in TOOL_CACHE.items():
+                if _is_result(value):
+                    self._insert(tool, query, chunk_text(value))
+        except sqlite3.Error as e:
+            logger.warning("Could not read the tool cache for the local index: %s", e)
+            return
+        conn.execute("INSERT OR REPLACE INTO meta(key, value) VALUES ('backfilled', ?)", (str(time.time()),))
+
+    def _drop_expired(self) -> None:
+        """Delete tool passages older than their tool's cache TTL (as the tool cache would)."""
+        conn = self._conn()
+        now = time.time()
+        for (source,) in conn.execute("SELECT DISTINCT source FROM chunks").fetchall():
+            if not source.startswith(_DOC_SOURCES):
+                conn.execute("DELETE FROM chunks WHERE source = ? AND added < ?",
+                             (source, now - TOOL_CACHE.ttl_for(source)))
+
+    def _insert(self, source: str, title: str, chunks: Iterable[str]) -> List[tuple]:
+        """Store new passages (ones this source already has are skipped); returns their rows."""
+        rows = []
+        now = time.time()
+        for text in chunks:
+            cursor = self._conn().execute(
+                "INSERT OR IGNORE INTO chunks(hash, source, title, text, added) VALUES (?, ?, ?, ?, ?)",
+                (_hash(text), source, title, text, now),
+            )
+            if cursor.rowcount:
+                rows.append((cursor.lastrowid, source, title, text, now))
+        return rows
+
+    # ---------- writing ----------
+
+    def add(self, source: str, title: str, text: str) -> int:
+        """Index a document (a tool result or a file's text); returns how many new passages it added."""
+        self.load()
+        with self._lock:
+            chunks, refreshed = [], []
+            for chunk in chunk_text(text):
+                pos = self._hashes.get((_hash(chunk), source))
+                if pos is None:
+                    chunks.append(chunk)
+                else:
+                    refreshed.append(pos)  # fetched again: fresh for another TTL
+            if not chunks and not refreshed:
+                return 0
+            now = time.time()
+            conn = self._conn()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._insert(source, title, chunks)
+                for pos in refreshed:
+                    conn.execute("UPDATE chunks SET added = ? WHERE id = ?", (now, self._ids[pos]))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            for pos in refreshed:
+                self._added[pos] = now
+            positions = [self._remember(*row, None) for row in rows]
+        if positions and self.embed_documents is not None:
+            self._embed_later(positions)
+        return len(positions)
+
+    def sync_docs(self) -> None:
+        """Pick up changes in docs_dir now (otherwise they are seen on the next process start)."""
+        with self._lock:
+            self._conn().execute("BEGIN IMMEDIATE")
+            try:
+                self._sync_docs()
+                self._conn().execute("COMMIT")
+            except Exception:
+                self._conn().execute("ROLLBACK")
+                raise
+            self.reload()
+
+    # ---------- embeddings ----------
+
+    def _open_vectors(self) -> None:
+        np = _numpy()
+        dim = self._meta("dim")
+        if np is None or not dim or not os.path.exists(self.vectors_path):
+            return
+        dim = int(dim)
+        rows = os.path.getsize(self.vectors_path) // (4 * dim)
+        if rows:
+            self._vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(rows, dim))
+            self._vector_rows = rows
+
+    def _meta(self, key: str) -> Optional[str]:
+        row = self._conn().execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _embed_later(self, positions: List[int]) -> None:
+        # Embedding is a network call: keep it off the research path.
+        if self._embedder is None:
+            with self._lock:
+                if self._embedder is None:
+                    self._embedder = ThreadPoolExecutor(max_workers=1, thread_name_prefix="local-index-embed")
+        self._embedder.submit(self._embed_positions, positions)
+
+    def _embed_positions(self, positions: List[int]) -> None:
+        np = _numpy()
+        if np is None:
+            return
+        try:
+            vectors = np.asarray(self.embed_documents([self._docs[p][2] for p in positions]), dtype=np.float32)
+        except Exception as e:
+            logger.warning("Local index embedding failed (%s); those passages stay BM25-only.", e)
+            return
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        with self._lock:
+            conn = self._conn()
+            dim = self._meta("dim")
+            if dim is None:
+                conn.execute("INSERT OR REPLACE INTO meta(key, value) VALUES ('dim', ?)", (str(vectors.shape[1]),))
+            elif int(dim) != vectors.shape[1]:
+                logger.warning("Embedding size changed (%s -> %s); not storing vectors.", dim, vectors.shape[1])
+                return
+            # One appending writer per process; rows are addressed by their offset in the file.
+            with open(self.vectors_path, "ab") as f:
+                first = f.tell() // (4 * vectors.shape[1])
+                f.write(vectors.tobytes())
+            for offset, pos in enumerate(positions):
+                conn.execute("UPDATE chunks SET vec_row = ? WHERE id = ?", (first + offset, self._ids[pos]))
+                self._row_to_pos[first + offset] = pos
+            self._open_vectors()
+
+    def _similar(self, query: str, k: int) -> Dict[int, float]:
+        np = _numpy()
+        if self._vectors is None or self.embed_query is None or np is None:
+            return {}
+        try:
+            q = np.asarray(self.embed_query(query), dtype=np.float32)
+        except Exception as e:
+            logger.warning("Local index query embedding failed (%s); using BM25 only.", e)
+            return {}
+        q /= max(float(np.linalg.norm(q)), 1e-12)
+        sims = self._vectors @ q
+        top = np.argsort(-sims)[:k]
+        return {self._row_to_pos[int(r)]: float(sims[r]) for r in top if int(r) in self._row_to_pos}
+
+    # ---------- reading ----------
+
+    def _idf(self, term: str) -> float:
+        df = len(self._postings.get(term, ()))
+        n = len(self._ids)
+        return math.log((n - df + 0.5) / (df + 0.5) + 1.0)
+
+    def _usable(self, pos: int, tool: Optional[str], now: float) -> bool:
+        """Local documents answer any tool; a tool's results answer only that tool, within its TTL."""
+        source = self._docs[pos][0]
+        if tool is None or source.startswith(_DOC_SOURCES):
+            return True
+        return source == tool and (LOCAL_INDEX_OFFLINE or now - self._added[pos] <= TOOL_CACHE.ttl_for(tool))
+
+    def search(self, query: str, k: int = TOP_K, tool: Optional[str] = None) -> tuple:
+        """
+        Top `k` passages and the recall of the query terms they cover, as (hits, recall).
+        With `tool`, only passages that may answer that tool are considered.
+        """
+        self.load()
+        terms = set(tokenize(query))
+        now = time.time()
+        with self._lock:
+            if not self._ids or not terms:
+                return [], 0.0
+            avg_length = self._total_length / len(self._ids)
+            scores: Dict[int, float] = {}
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = self._idf(term)
+                for pos, tf in postings.items():
+                    if not self._usable(pos, tool, now):
+                        continue
+                    norm = K1 * (1 - B + B * self._lengths[pos] / avg_length)
+                    scores[pos] = scores.get(pos, 0.0) + idf * tf * (K1 + 1) / (tf + norm)
+            ranked = sorted(scores, key=scores.get, reverse=True)[:k * 2]
+            similar = {pos: sim for pos, sim in self._similar(query, k * 4).items() if self._usable(pos, tool, now)}
+            if similar:
+                # Reciprocal rank fusion of the BM25 and embedding rankings.
+                fused: Dict[int, float] = {}
+                for ranking in (ranked, sorted(similar, key=similar.get, reverse=True)):
+                    for rank, pos in enumerate(ranking):
+                        fused[pos] = fused.get(pos, 0.0) + 1.0 / (60 + rank)
+                ranked = sorted(fused, key=fused.get, reverse=True)
+            # The same text may be stored for several sources: show it once.
+            top, seen = [], set()
+            for pos in ranked:
+                text = self._docs[pos][2]
+                if text not in seen:
+                    seen.add(text)
+                    top.append(pos)
+                    if len(top) == k:
+                        break
+            hits = [Hit(*self._docs[pos], scores.get(pos, 0.0), similar.get(pos, 0.0)) for pos in top]
+            weights = {t: self._idf(t) for t in terms}
+            covered = {t for t in terms for pos in top if pos in self._postings.get(t, ())}
+            recall = sum(weights[t] for t in covered) / (sum(weights.values()) or 1.0)
+            return hits, recall
+
+    def lookup(self, query: str, force: bool = False, tool: Optional[str] = None) -> Optional[str]:
+        """Formatted local passages if they answer `query` well enough (or any passages with `force`)."""
+        hits, recall = self.search(query, tool=tool)
+        confident = bool(hits) and (recall >= MIN_RECALL or max(h.similarity for h in hits) >= MIN_SIMILARITY)
+        if confident:
+            self.hits += 1
+        else:
+            self.misses += 1
+        if not hits or not (confident or force):
+            return None
+        parts = [f"[local index] {h.source}: {h.title}\n{h.text}" for h in hits]
+        return "\n\n".join(parts)[:MAX_CHARS]
+
+    def stats(self) -> Dict[str, Any]:
+        self.load()
+        with self._lock:
+            return {"passages": len(self._ids), "terms": len(self._postings), "vectors": self._vector_rows,
+                    "hits": self.hits, "misses": self.misses}
+
+    def clear(self) -> None:
+        with self._lock:
+            conn = self._conn()
+            conn.execute("DELETE FROM chunks")
+            conn.execute("DELETE FROM files")
+            conn.execute("DELETE FROM meta")
+            if os.path.exists(self.vectors_path):
+                os.remove(self.vectors_path)
+            self._reset_memory()
+            self._loaded = True  # stays empty until something is added
+
+
+def _migrate(conn: sqlite3.Connection) -> None:
+    """Indexes written before passages were keyed by (hash, source) had a UNIQUE hash column."""
+    def old_schema() -> bool:
+        row = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'chunks'").fetchone()
+        return bool(row and re.search(r"hash\s+TEXT NOT NULL UNIQUE", row[0]))
+
+    if not old_schema():
+        return
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if old_schema():  # another process may have migrated meanwhile
+            conn.execute("DROP INDEX IF EXISTS chunks_source")
+            conn.execute("ALTER TABLE chunks RENAME TO chunks_old")
+            for statement in _SCHEMA.split(";"):
+                if statement.strip():
+                    conn.execute(statement)
+            conn.execute("INSERT INTO chunks SELECT * FROM chunks_old")
+            conn.execute("DROP TABLE chunks_old")
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def _hash(text: str) -> str:
+    return hashlib.sha256(" ".join(text.split()).lower().encode("utf-8")).hexdigest()
+
+
+def _is_result(value: Any) -> bool:
+    # The tool cache's success check; shorter texts carry too little to answer a later query.
+    return is_result(value) and len(value) >= 80
+
+
+def _azure_embeddings():
+    from langchain_openai import AzureOpenAIEmbeddings
+    return AzureOpenAIEmbeddings(
+        azure_deployment=os.getenv("AZURE_EMBEDDING_DEPLOYMENT", "text-embedding-3-small"),
+        api_key=os.getenv("AZURE_API_KEY"),
+        azure_endpoint=os.getenv("AZURE_ENDPOINT"),
+        openai_api_version="2024-08-01-preview",
+    )
+
+
+_INDEX: Optional[LocalIndex] = None
+_INDEX_LOCK = threading.Lock()
+
+
+def get_index() -> LocalIndex:
+    """The process-wide index (passages are loaded on first lookup)."""
+    global _INDEX
+    if _INDEX is None:
+        with _INDEX_LOCK:
+            if _INDEX is None:
+                embed_documents = embed_query = None
+                if os.getenv("LOCAL_INDEX_EMBEDDINGS", "0").lower() in ("1", "true", "on"):
+                    embeddings = _azure_embeddings()
+                    embed_documents, embed_query = embeddings.embed_documents, embeddings.embed_query
+                _INDEX = LocalIndex(
+                    path=os.getenv("LOCAL_INDEX_PATH", os.path.join(".cache", "local_index.sqlite")),
+                    docs_dir=os.getenv("LOCAL_DOCS_DIR", "knowledge"),
+                    embed_documents=embed_documents,
+                    embed_query=embed_query,
+                )
+    return _INDEX
+
+
+def _offline_answer(index: LocalIndex, tool: str, query: str) -> str:
+    return index.lookup(query, force=True, tool=tool) or f"No local knowledge for '{query}' ({tool} is offline)."
+
+
+def local_first(tool: str, query: str, fetch: Callable[[], str]) -> str:
+    """Answer from the local index when recall is high enough; otherwise fetch and index the result."""
+    if not LOCAL_INDEX_ENABLED:
+        return fetch()
+    index = get_index()
+    try:
+        local = index.lookup(query, tool=tool)
+    except sqlite3.Error as e:
+        logger.warning("Local index unavailable (%s); calling %s directly.", e, tool)
+        return fetch()
+    if local is not None:
+        note_cache_hit("local")
+        return local
+    if LOCAL_INDEX_OFFLINE:
+        return _offline_answer(index, tool, query)
+    value = fetch()
+    if _is_result(value):
+        try:
+            index.add(tool, query, value)
+        except sqlite3.Error as e:
+            logger.warning("Local index write failed: %s", e)
+    return value
+
+
+async def alocal_first(tool: str, query: str, afetch: Callable[[], Awaitable[str]]) -> str:
+    """Async `local_first`: index reads and writes run in a worker thread."""
+    if not LOCAL_INDEX_ENABLED:
+        return await afetch()
+    index = get_index()
+    try:
+        local = await asyncio.to_thread(copy_context().run, index.lookup, query, False, tool)
+    except sqlite3.Error as e:
+        logger.warning("Local index unavailable (%s); calling %s directly.", e, tool)
+        return await afetch()
+    if local is not None:
+        note_cache_hit("local")
+        return local
+    if LOCAL_INDEX_OFFLINE:
+        return await asyncio.to_thread(_offline_answer, index, tool, query)
+    value = await afetch()
+    if _is_result(value):
+        try:
+            await asyncio.to_thread(index.add, tool, query, value)
+        except sqlite3.Error as e:
+            logger.warning("Local index write failed: %s", e)
+    return value
+
+
+def _main(argv: Optional[Sequence[str]] = None) -> None:
+    import argparse
+
+    ap = argparse.ArgumentParser(prog="python -m tools.local_index", description="Manage the local knowledge index.")
+    sub = ap.add_subparsers(dest="command", required=True)
+    ingest = sub.add_parser("ingest", help="index text/markdown files (a file or a folder)")
+    ingest.add_argument("paths", nargs="+")
+    query = sub.add_parser("query", help="show what a lookup would return")
+    query.add_argument("text")
+    sub.add_parser("stats")
+    sub.add_parser("sync", help="re-read LOCAL_DOCS_DIR")
+    args = ap.parse_args(argv)
+
+    index = get_index()
+    if args.command == "ingest":
+        added = 0
+        for path in args.paths:
+            files = [path] if os.path.isfile(path) else [
+                os.path.join(root, name) for root, _dirs, names in os.walk(path)
+                for name in names if name.lower().endswith(DOC_SUFFIXES)]
+            for name in files:
+                with open(name, encoding="utf-8", errors="replace") as f:
+                    added += index.add(f"file:{name}", os.path.splitext(os.path.basename(name))[0], f.read())
+        print(f"added {added} passages")
+    elif args.command == "query":
+        hits, recall = index.search(args.text)
+        print(f"recall {recall:.2f} (threshold {MIN_RECALL}); answered locally: {index.lookup(args.text) is not None}")
+        for h in hits:
+            print(f"- {h.score:6.2f} sim={h.similarity:.2f} {h.source}: {h.title}\n  {h.text[:200]}")
+    elif args.command == "sync":
+        index.sync_docs()
+    print(index.stats())
+    if index._embedder is not None:
+        index._embedder.shutdown(wait=True)
+
+
+if __name__ == "__main__":
+    _main()
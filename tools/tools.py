@@ -1,11 +1,81 @@
 # tools.py
+import asyncio
+import threading
 from langchain_core.tools import tool
-from langchain_tavily import TavilySearch
+from cassettes import atool_call, tool_call
 from llm_config import TAVILY_API_KEY
+from tools.cache import acached_call, cached_call
+from tools.compress import compress
+from tools.local_index import alocal_first, local_first
 
-@tool
-def wikipedia_search(query: str) -> str:
-    """Search Wikipedia and return a short summary."""
+# ---------- Process-wide clients, built on first use ----------
+_CLIENTS = {}
+_CLIENTS_LOCK = threading.Lock()
+# arXiv asks for one request every few seconds; its client enforces that, but not across threads.
+_ARXIV_LOCK = threading.Lock()
+
+ARXIV_TOP_K = 3
+ARXIV_MAX_QUERY_LENGTH = 300
+ARXIV_MAX_CHARS = 4000
+
+def _client(name, factory):
+    client = _CLIENTS.get(name)
+    if client is None:
+        with _CLIENTS_LOCK:
+            client = _CLIENTS.get(name)
+            if client is None:
+                client = _CLIENTS[name] = factory()
+    return client
+
+def _tavily():
+    # Imported on first search: langchain_tavily pulls in aiohttp and is slow to import.
+    from langchain_tavily import TavilySearch
+    return _client("tavily", lambda: TavilySearch(max_results=3, tavily_api_key=TAVILY_API_KEY))
+
+def _arxiv():
+    # arxiv.Client keeps one requests.Session, so repeated searches reuse the TLS connection.
+    import arxiv
+    return _client("arxiv", lambda: arxiv.Client(page_size=ARXIV_TOP_K, num_retries=2))
+
+def _arxiv_run(query: str) -> str:
+    import arxiv
+    search = arxiv.Search(query=query[:ARXIV_MAX_QUERY_LENGTH], max_results=ARXIV_TOP_K)
+    with _ARXIV_LOCK:
+        results = list(_arxiv().results(search))
+    docs = [
+        f"Published: {r.updated.date()}\n"
+        f"Title: {r.title}\n"
+        f"Authors: {', '.join(a.name for a in r.authors)}\n"
+        f"Summary: {r.summary}"
+        for r in results
+    ]
+    if docs:
+        return "\n\n".join(docs)[:ARXIV_MAX_CHARS]
+    return "No good Arxiv Result was found"
+
+# Each tool first asks the local knowledge index (tools/local_index.py); only when
+# it can't answer does the fetch go through the shared on-disk cache (tools/cache.py)
+# to the network. Fetch functions raise on transport errors so failures are never cached.
+# Both keep the raw result; what the model reads is compressed (tools/compress.py).
+# Under CASSETTE_MODE the raw result is recorded or replayed (cassettes.py).
+
+def _research(tool_name: str, query: str, fetch) -> str:
+    return compress(query, tool_call(tool_name, query, lambda: local_first(
+        tool_name, query, lambda: cached_call(tool_name, query, fetch))))
+
+async def _aresearch(tool_name: str, query: str, afetch) -> str:
+    result = await atool_call(tool_name, query, lambda: alocal_first(
+        tool_name, query, lambda: acached_call(tool_name, query, afetch)))
+    return compress(query, result)
+
+def _tavily_result(result) -> str:
+    # TavilySearch returns {"error": e} instead of raising; raise it so the failure is not cached.
+    if isinstance(result, dict) and "error" in result:
+        error = result["error"]
+        raise error if isinstance(error, Exception) else RuntimeError(str(error))
+    return str(result)
+
+def _wikipedia_fetch(query: str) -> str:
     import wikipedia
     try:
         return wikipedia.summary(query, sentences=3)
@@ -13,29 +83,63 @@ def wikipedia_search(query: str) -> str:
         return "No Wikipedia results found."
     except wikipedia.exceptions.DisambiguationError as e:
         return f"Disambiguation error. Try a more specific query from this list: {e.options}"
+
+@tool
+def wikipedia_search(query: str) -> str:
+    """Search Wikipedia and return a short summary."""
+    try:
+        return _research("wikipedia_search", query, lambda: _wikipedia_fetch(query))
     except Exception as e:
         return f"An unexpected error occurred: {str(e)}"
 
 @tool
 def tavily_search(query: str) -> str:
     """Perform a Tavily web search and return a brief summary of top results."""
-    tavily = TavilySearch(max_results=3, tavily_api_key=TAVILY_API_KEY)
+    def fetch() -> str:
+        return _tavily_result(_tavily().run(query))
+
     try:
-        return tavily.run(query)
+        return _research("tavily_search", query, fetch)
     except Exception as e:
         return f"An error occurred with Tavily search: {str(e)}"
 
 @tool
 def arxiv_search(query: str) -> str:
     """Search arXiv for related papers and return a brief summary."""
-    from langchain_community.tools import ArxivQueryRun
-    from langchain_community.utilities import ArxivAPIWrapper
-    arxiv = ArxivQueryRun(api_wrapper=ArxivAPIWrapper())
     try:
-        return arxiv.run(query)
+        return _research("arxiv_search", query, lambda: _arxiv_run(query))
     except Exception as e:
         return f"An error occurred with Arxiv search: {str(e)}"
 
+# ---------- Async variants (used by tool.ainvoke on the async graph path) ----------
+# Tavily has a native async client; the wikipedia and arxiv libraries are blocking,
+# so their fetches run in a worker thread instead of on the event loop.
+
+async def _awikipedia_search(query: str) -> str:
+    try:
+        return await _aresearch("wikipedia_search", query, lambda: asyncio.to_thread(_wikipedia_fetch, query))
+    except Exception as e:
+        return f"An unexpected error occurred: {str(e)}"
+
+async def _atavily_search(query: str) -> str:
+    async def fetch() -> str:
+        return _tavily_result(await _tavily().arun(query))
+
+    try:
+        return await _aresearch("tavily_search", query, fetch)
+    except Exception as e:
+        return f"An error occurred with Tavily search: {str(e)}"
+
+async def _aarxiv_search(query: str) -> str:
+    try:
+        return await _aresearch("arxiv_search", query, lambda: asyncio.to_thread(_arxiv_run, query))
+    except Exception as e:
+        return f"An error occurred with Arxiv search: {str(e)}"
+
+wikipedia_search.coroutine = _awikipedia_search
+tavily_search.coroutine = _atavily_search
+arxiv_search.coroutine = _aarxiv_search
+
 # Exported tool lists for robust imports
 TOOLS = [wikipedia_search, tavily_search, arxiv_search]
 
@@ -0,0 +1,364 @@
+# tracing.py
+"""
+Structured tracing and latency metrics.
+
+Spans are recorded around every graph node (`traced_node`, applied in build_graph)
+and, through a LangChain callback handler registered for every run, around every
+LLM and tool call. Each span carries its duration, the node it ran in, token
+counts, cache hits and errors, and is fanned out to the configured sinks:
+
+    TRACE_SINK=ring                 in-memory ring buffer (default)
+    TRACE_SINK=ring,jsonl:traces.jsonl
+    TRACE_SINK=none
+
+Per-name latency histograms are always kept (`histograms()`), and per model tier
+for LLM spans (`histograms("tier")`).
+AGENT_VERBOSE=1 turns the old step-by-step console output back on.
+"""
+
+import atexit
+import inspect
+import json
+import logging
+import math
+import os
+import queue
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.runnables import RunnableConfig, RunnableLambda
+from langchain_core.tracers.context import register_configure_hook
+from langgraph.errors import GraphBubbleUp
+
+VERBOSE = os.getenv("AGENT_VERBOSE", "0").lower() in ("1", "true", "on")
+
+logger = logging.getLogger("tracing")
+
+# Graph node currently executing in this context (copied into research threads).
+CURRENT_NODE: ContextVar[Optional[str]] = ContextVar("current_node", default=None)
+
+
+# ---------- Sinks ----------
+
+class RingBufferSink:
+    """Keeps the most recent spans in memory."""
+
+    def __init__(self, maxlen: int = 2000):
+        self.spans: deque = deque(maxlen=maxlen)
+
+    def emit(self, span: Dict[str, Any]) -> None:
+        self.spans.append(span)
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        return list(self.spans)
+
+
+class JsonlSink:
+    """Appends spans to a JSONL file from a background thread, so callers never block on I/O."""
+
+    def __init__(self, path: str, flush_every_s: float = 1.0):
+        self.path = path
+        self.flush_every_s = flush_every_s
+        self._queue: "queue.SimpleQueue[Optional[Dict[str, Any]]]" = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="trace-jsonl", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def emit(self, span: Dict[str, Any]) -> None:
+        self._queue.put(span)
+
+    def _run(self) -> None:
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as fh:
+            while True:
+                try:
+                    span = self._queue.get(timeout=self.flush_every_s)
+                except queue.Empty:
+                    fh.flush()
+                    continue
+                if span is None:
+                    fh.flush()
+                    return
+                fh.write(json.dumps(span, default=str) + "\n")
+
+    def close(self) -> None:
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout=5)
+
+
+# ---------- Histograms ----------
+
+class LatencyHistogram:
+    """Log-spaced buckets from 0.1 ms to ~2 h; percentiles are bucket upper bounds."""
+
+    GROWTH = 1.2
+    BASE_MS = 0.1
+
+    def __init__(self):
+        self.counts: Dict[int, int] = {}
+        self.n = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def _bucket(self, ms: float) -> int:
+        return 0 if ms <= self.BASE_MS else int(math.ceil(math.log(ms / self.BASE_MS, self.GROWTH)))
+
+    def add(self, ms: float) -> None:
+        b = self._bucket(ms)
+        self.counts[b] = self.counts.get(b, 0) + 1
+        self.n += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, p: float) -> float:
+        if not self.n:
+            return 0.0
+        target = p / 100 * self.n
+        seen = 0
+        for b in sorted(self.counts):
+            seen += self.counts[b]
+            if seen >= target:
+                return min(self.BASE_MS * self.GROWTH ** b, self.max_ms)
+        return self.max_ms
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.n,
+            "mean_ms": self.total_ms / self.n if self.n else 0.0,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99),
+            "max_ms": self.max_ms,
+        }
+
+
+_SINKS: List[Any] = []
+_HISTOGRAMS: Dict[str, LatencyHistogram] = {}
+_HIST_LOCK = threading.Lock()
+RING: Optional[RingBufferSink] = None
+
+
+def add_sink(sink) -> None:
+    _SINKS.append(sink)
+
+
+def remove_sink(sink) -> None:
+    if sink in _SINKS:
+        _SINKS.remove(sink)
+
+
+def _configure_from_env() -> None:
+    global RING
+    for spec in os.getenv("TRACE_SINK", "ring").split(","):
+        spec = spec.strip()
+        if spec == "ring":
+            RING = RingBufferSink(int(os.getenv("TRACE_RING_SIZE", "2000")))
+            add_sink(RING)
+        elif spec.startswith("jsonl:"):
+            add_sink(JsonlSink(spec[len("jsonl:"):]))
+        elif spec and spec != "none":
+            logger.warning("Unknown TRACE_SINK entry %r ignored", spec)
+
+
+def record(span: Dict[str, Any]) -> None:
+    keys = [f"{span['kind']}:{span['name']}"]
+    if span.get("tier"):
+        keys.append(f"tier:{span['tier']}")
+    with _HIST_LOCK:
+        for key in keys:
+            hist = _HISTOGRAMS.get(key)
+            if hist is None:
+                hist = _HISTOGRAMS[key] = LatencyHistogram()
+            hist.add(span["duration_ms"])
+    for sink in list(_SINKS):
+        try:
+            sink.emit(span)
+        except Exception as e:  # a broken sink must never break a turn
+            logger.warning("Trace sink %r failed: %s", sink, e)
+
+
+def histograms(kind: Optional[str] = None) -> Dict[str, Dict[str, float]]:
+    with _HIST_LOCK:
+        return {k: h.summary() for k, h in _HISTOGRAMS.items() if kind is None or k.startswith(kind + ":")}
+
+
+def reset_histograms() -> None:
+    with _HIST_LOCK:
+        _HISTOGRAMS.clear()
+
+
+@contextmanager
+def span(name: str, kind: str, **attrs: Any):
+    """Record a span around a block; the yielded dict can be filled with extra attributes."""
+    start = time.time()
+    t0 = time.perf_counter()
+    attrs.setdefault("node", CURRENT_NODE.get())
+    try:
+        yield attrs
+    except GraphBubbleUp:  # interrupt()/Command control flow, not a failure
+        attrs["interrupted"] = True
+        raise
+    except BaseException as e:
+        attrs["error"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        record({"name": name, "kind": kind, "start": start,
+                "duration_ms": (time.perf_counter() - t0) * 1000, **attrs})
+
+
+# ---------- Graph nodes ----------
+
+@contextmanager
+def _allocations(attrs: Dict[str, Any]):
+    """While tracemalloc runs (profiling.py), note the net traced memory change over the block."""
+    if not tracemalloc.is_tracing():
+        yield
+        return
+    before = tracemalloc.get_traced_memory()[0]
+    try:
+        yield
+    finally:
+        attrs["alloc_kb"] = round((tracemalloc.get_traced_memory()[0] - before) / 1024, 1)
+
+
+def traced_node(name: str, fn: Callable, afn: Optional[Callable] = None) -> RunnableLambda:
+    """
+    Wrap a graph node so each run is a 'node' span and CURRENT_NODE is set while it runs.
+    `afn` is the node's async twin, used by ainvoke/astream; without one the sync
+    function runs directly on the event loop, so only non-blocking nodes may omit it.
+    """
+    takes_config = "config" in inspect.signature(fn).parameters
+    atakes_config = afn is not None and "config" in inspect.signature(afn).parameters
+
+    def node(state, config: RunnableConfig):
+        token = CURRENT_NODE.set(name)
+        try:
+            thread_id = (config.get("configurable") or {}).get("thread_id")
+            with span(name, "node", thread_id=thread_id) as attrs, _allocations(attrs):
+                return fn(state, config) if takes_config else fn(state)
+        finally:
+            CURRENT_NODE.reset(token)
+
+    async def anode(state, config: RunnableConfig):
+        if afn is None:
+            return node(state, config)
+        token = CURRENT_NODE.set(name)
+        try:
+            thread_id = (config.get("configurable") or {}).get("thread_id")
+            with span(name, "node", thread_id=thread_id) as attrs, _allocations(attrs):
+                return await (afn(state, config) if atakes_config else afn(state))
+        finally:
+            CURRENT_NODE.reset(token)
+
+    return RunnableLambda(node, afunc=anode, name=name)
+
+
+# ---------- LLM / tool calls ----------
+
+def token_usage(response) -> Dict[str, int]:
+    """{"input_tokens", "output_tokens"} of an LLMResult, or {} when the provider reported none."""
+    try:
+        message = response.generations[0][0].message
+        usage = getattr(message, "usage_metadata", None)
+        if usage:
+            return {"input_tokens": usage.get("input_tokens", 0), "output_tokens": usage.get("output_tokens", 0)}
+    except (AttributeError, IndexError, TypeError):
+        pass
+    token_usage = (response.llm_output or {}).get("token_usage") or {}
+    if token_usage:
+        return {"input_tokens": token_usage.get("prompt_tokens", 0),
+                "output_tokens": token_usage.get("completion_tokens", 0)}
+    return {}
+
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """Turns LangChain LLM/tool callbacks into spans."""
+
+    # Run in the caller's context even under async callback managers, so the
+    # node and cache-hit context vars of the calling task are the ones read.
+    run_inline = True
+
+    def __init__(self):
+        self._open: Dict[UUID, tuple] = {}
+        self._lock = threading.Lock()
+
+    def _start(self, run_id: UUID, name: str, kind: str, metadata: Optional[dict]) -> None:
+        metadata = metadata or {}
+        node = metadata.get("langgraph_node") or CURRENT_NODE.get()
+        extra = {"tier": metadata["llm_tier"]} if metadata.get("llm_tier") else {}
+        with self._lock:
+            self._open[run_id] = (name, kind, time.time(), time.perf_counter(), node, extra)
+
+    def _end(self, run_id: UUID, **attrs: Any) -> None:
+        with self._lock:
+            opened = self._open.pop(run_id, None)
+        if opened is None:
+            return
+        name, kind, start, t0, node, extra = opened
+        record({"name": name, "kind": kind, "start": start, "node": node,
+                "duration_ms": (time.perf_counter() - t0) * 1000, **extra, **attrs})
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        from llm_cache import consume_cache_hit
+        consume_cache_hit()  # clear a flag left by an earlier call in this context
+        name = kwargs.get("name") or (serialized or {}).get("name") or "chat_model"
+        self._start(run_id, name, "llm", metadata)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, metadata=None, **kwargs):
+        self._start(run_id, kwargs.get("name") or (serialized or {}).get("name") or "llm", "llm", metadata)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        from llm_cache import consume_cache_hit
+        self._end(run_id, cache_hit=consume_cache_hit(), **token_usage(response))
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=f"{type(error).__name__}: {error}")
+
+    def on_tool_start(self, serialized, input_str, *, run_id, metadata=None, **kwargs):
+        from tools.cache import start_cache_scope
+        from tools.compress import start_compression_scope
+        start_cache_scope()
+        start_compression_scope()
+        self._start(run_id, kwargs.get("name") or (serialized or {}).get("name") or "tool", "tool", metadata)
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        from tools.cache import consume_cache_hit
+        from tools.compress import consume_compression_stats
+        sizes = {k: v for k, v in consume_compression_stats().items() if k in ("raw_tokens", "tokens")}
+        self._end(run_id, cache_hit=consume_cache_hit(), output_chars=len(str(output)), **sizes)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=f"{type(error).__name__}: {error}")
+
+
+TRACER = TracingCallbackHandler()
+
+# A context var whose default is the handler: LangChain adds it to every callback
+# manager it configures, in every thread, without threading it through configs.
+_TRACER_VAR: ContextVar[Optional[BaseCallbackHandler]] = ContextVar("tracing_handler", default=TRACER)
+register_configure_hook(_TRACER_VAR, inheritable=True)
+
+_configure_from_env()
+
+
+# This project's loggers; AGENT_VERBOSE=1 turns only these up to DEBUG (never httpx, openai, langchain...).
+PROJECT_LOGGERS = ("agents", "tools", "tracing", "budgets", "batch", "cassettes", "checkpointing", "graph_builder",
+                   "llm_cache", "llm_client", "llm_config", "profiling", "service", "speculation", "streaming",
+                   "transcript_archive")
+
+
+def configure_logging() -> None:
+    """Console logging for entry points: step-by-step detail only with AGENT_VERBOSE=1."""
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s %(name)s: %(message)s")
+    if VERBOSE:
+        for name in PROJECT_LOGGERS:
+            logging.getLogger(name).setLevel(logging.DEBUG)
@@ -0,0 +1,130 @@
+# transcript_archive.py
+"""
+Bounded in-state transcript with an on-disk archive of older messages.
+
+Graph nodes return only the messages they add, and `state['messages']` keeps at
+most about CHAT_HISTORY_WINDOW messages: once the transcript is CHAT_ARCHIVE_BATCH
+messages past the window, the node that takes in the turn's user message (intake,
+or await_reply on a confirmation) moves the oldest ones to a per-session
+gzip-compressed JSON-lines file and drops them from the state with RemoveMessage.
+The reducer, the checkpoint and every node then work on a window of constant size,
+however long the session runs. `state['archived_messages']` counts what was moved
+out; `load_archive` / `full_transcript` bring the older turns back on demand.
+
+Messages the rolling context summary has not folded in yet stay in the state
+(agents/context_builder.py decides what can go), unless the transcript has grown
+to twice the window without a summary update.
+"""
+
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from typing import List, Optional, Sequence
+
+from langchain_core.messages import BaseMessage, RemoveMessage, messages_from_dict, messages_to_dict
+from langchain_core.runnables import RunnableConfig
+
+from agents.context_builder import archivable
+
+logger = logging.getLogger(__name__)
+
+HISTORY_WINDOW = int(os.getenv("CHAT_HISTORY_WINDOW", "60"))  # 0 keeps the whole transcript in the state
+ARCHIVE_BATCH = int(os.getenv("CHAT_ARCHIVE_BATCH", "20"))
+ARCHIVE_DIR = os.getenv("CHAT_ARCHIVE_DIR", os.path.join(".cache", "transcripts"))
+
+_WRITE_LOCK = threading.Lock()
+
+
+def archive_path(thread_id: str) -> str:
+    """Archive file of a session (ids that are not plain file names are hashed)."""
+    name = thread_id if re.fullmatch(r"[\w.-]{1,100}", thread_id) else hashlib.sha256(thread_id.encode()).hexdigest()
+    return os.path.join(ARCHIVE_DIR, f"{name}.jsonl.gz")
+
+
+def _spill_count(state) -> int:
+    """How many of the oldest messages to move out now (0 while within window + batch)."""
+    msgs: Sequence[BaseMessage] = state.get("messages", [])
+    if HISTORY_WINDOW <= 0 or len(msgs) < HISTORY_WINDOW + ARCHIVE_BATCH:
+        return 0
+    excess = len(msgs) - HISTORY_WINDOW
+    if len(msgs) >= 2 * HISTORY_WINDOW:
+        return excess
+    return archivable(state, excess)
+
+
+def _write(thread_id: str, msgs: Sequence[BaseMessage]) -> None:
+    """Append `msgs` to the session archive (each append is a gzip member; readers see one stream)."""
+    path = archive_path(thread_id)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    lines = "".join(json.dumps(d, ensure_ascii=False) + "\n" for d in messages_to_dict(list(msgs)))
+    with _WRITE_LOCK, gzip.open(path, "at", encoding="utf-8", compresslevel=6) as f:
+        f.write(lines)
+
+
+def _update(state, count: int) -> dict:
+    old = state["messages"][:count]
+    return {"messages": [RemoveMessage(id=m.id) for m in old],
+            "archived_messages": (state.get("archived_messages") or 0) + count}
+
+
+def _thread_id(config: Optional[RunnableConfig]) -> Optional[str]:
+    return ((config or {}).get("configurable") or {}).get("thread_id")
+
+
+def archive_update(state, config: Optional[RunnableConfig]) -> dict:
+    """State update that moves the oldest messages to the session's archive; {} when nothing is due."""
+    thread_id = _thread_id(config)
+    count = _spill_count(state) if thread_id else 0
+    if not count:
+        return {}
+    try:
+        _write(thread_id, state["messages"][:count])
+    except OSError as e:
+        logger.warning("Transcript archive write failed (%s); keeping %d messages in the state.", e, count)
+        return {}
+    logger.debug("Archived %d messages of session %s.", count, thread_id)
+    return _update(state, count)
+
+
+async def aarchive_update(state, config: Optional[RunnableConfig]) -> dict:
+    """Async `archive_update`: the file write runs in a worker thread."""
+    thread_id = _thread_id(config)
+    count = _spill_count(state) if thread_id else 0
+    if not count:
+        return {}
+    try:
+        await asyncio.to_thread(_write, thread_id, state["messages"][:count])
+    except OSError as e:
+        logger.warning("Transcript archive write failed (%s); keeping %d messages in the state.", e, count)
+        return {}
+    logger.debug("Archived %d messages of session %s.", count, thread_id)
+    return _update(state, count)
+
+
+def load_archive(thread_id: str) -> List[BaseMessage]:
+    """Archived messages of a session, oldest first ([] if none were archived)."""
+    path = archive_path(thread_id)
+    if not os.path.exists(path):
+        return []
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        msgs = messages_from_dict([json.loads(line) for line in f if line.strip()])
+    # A run that failed after its archive write is archived again by the next turn.
+    seen, unique = set(), []
+    for m in msgs:
+        if m.id not in seen:
+            seen.add(m.id)
+            unique.append(m)
+    return unique
+
+
+def full_transcript(thread_id: str, messages: Sequence[BaseMessage]) -> List[BaseMessage]:
+    """The whole session: archived messages followed by the in-state window."""
+    archived = load_archive(thread_id)
+    kept = {m.id for m in messages}
+    return [m for m in archived if m.id not in kept] + list(messages)
+